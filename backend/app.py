@@ -1,10 +1,23 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from solver import ScheduleSolver
+from repair import ScheduleRepairer
 from config import Config
+from cache import ScheduleCache, cache_hit_diagnostics, make_cache_key
+from decomposition import wants_decomposition
+from jobs import JobManager, QueueFullError, FINISHED_STATES, JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED
+import metrics
+from worker_budget import core_budget, payload_cells
+from schedule_store import FirestoreScheduleRepository, InMemoryScheduleRepository
+from statistics_service import StatisticsService
+from swap_checker import SwapChecker, SwapCheckerCache, check_swap_types
+from wire_format import compress, decode_compact, encode_compact, etag_matches, is_compact, make_etag, negotiate_encoding
 import firebase_admin
-from firebase_admin import credentials, firestore
+from firebase_admin import auth as firebase_auth, credentials, exceptions as firebase_exceptions, firestore
+import datetime
+import json
 import os
+import time
 import traceback
 
 app = Flask(__name__)
@@ -22,38 +35,325 @@ except Exception as e:
     print(f"Error initializing Firebase: {e}")
     db = None
 
+if config.SCHEDULE_STORE == 'memory':
+    schedule_repository = InMemoryScheduleRepository()
+elif db:
+    schedule_repository = FirestoreScheduleRepository(db)
+else:
+    schedule_repository = None
+
+schedule_cache = ScheduleCache()
+statistics_service = StatisticsService(schedule_repository)
+swap_checkers = SwapCheckerCache(schedule_repository) if schedule_repository else None
+job_manager = JobManager(cache=schedule_cache, core_budget=core_budget)
+
+def validate_schedule_payload(data):
+    if not data:
+        return 'No data provided'
+    
+    required_fields = ['nurses', 'wardId', 'startDate', 'endDate', 'requiredNurses']
+    for field in required_fields:
+        if field not in data:
+            return f'Missing required field: {field}'
+    
+    if not data['nurses']:
+        return 'No nurses provided'
+    
+    for field, minimum in (('alternatives', 0), ('alternativeMinDistance', 1)):
+        value = data.get(field)
+        if value is not None and (type(value) is not int or value < minimum):
+            return f'{field} must be an integer >= {minimum}'
+    
+    time_limit = data.get('alternativesTimeLimit')
+    if time_limit is not None and (type(time_limit) not in (int, float) or time_limit <= 0):
+        return 'alternativesTimeLimit must be a positive number'
+    
+    if (data.get('alternatives') or 0) > 1:
+        if data.get('engine') == 'heuristic':
+            return 'alternatives are not supported with engine heuristic'
+        if wants_decomposition(data):
+            return 'alternatives are not supported with decomposition'
+    
+    return None
+
+def wants_compact():
+    return request.args.get('format') == 'compact'
+
+def send_json(payload, endpoint, status=200, headers=None, etag=False):
+    response_format = 'compact' if wants_compact() else 'full'
+    serialize_started = time.perf_counter()
+    body = app.json.dumps(encode_compact(payload) if response_format == 'compact' else payload,
+                          separators=(',', ':')).encode('utf-8')
+    metrics.http_phase_seconds.observe(time.perf_counter() - serialize_started, endpoint=endpoint, phase='serialize')
+    
+    response_headers = dict(headers or {})
+    response_headers['Vary'] = 'Accept-Encoding'
+    if etag:
+        response_headers['ETag'] = make_etag(body)
+        if etag_matches(request.headers.get('If-None-Match'), response_headers['ETag']):
+            return Response(status=304, headers=response_headers)
+    
+    encoding = None
+    if len(body) >= config.WIRE_COMPRESS_MIN_BYTES:
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    if encoding:
+        compress_started = time.perf_counter()
+        body = compress(body, encoding)
+        metrics.http_phase_seconds.observe(time.perf_counter() - compress_started, endpoint=endpoint, phase='compress')
+        response_headers['Content-Encoding'] = encoding
+    metrics.http_response_bytes.observe(len(body), endpoint=endpoint, format=response_format,
+                                        encoding=encoding or 'identity')
+    return Response(body, status=status, headers=response_headers, mimetype='application/json')
+
+def swap_checker_for(data, swap):
+    schedule = data.get('schedule')
+    if schedule:
+        return SwapChecker.from_shift_dict(decode_compact(schedule).get('shifts') or {})
+    if schedule is None and data.get('wardId') and swap_checkers:
+        return swap_checkers.get(data['wardId'], data.get('month') or str(swap.get('fromDate', ''))[:7])
+    return None
+
+def caller_uid():
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return None
+    try:
+        return firebase_auth.verify_id_token(token)['uid']
+    except (ValueError, firebase_exceptions.FirebaseError):
+        return None
+
+def resolve_hint_job(data):
+    if is_compact(data.get('hintSchedule')):
+        data['hintSchedule'] = decode_compact(data['hintSchedule'])
+    
+    hint_job_id = data.get('hintJobId')
+    if not hint_job_id or data.get('hintSchedule'):
+        return None
+    
+    job = job_manager.get(hint_job_id)
+    if not job or job.status != JOB_COMPLETED:
+        return f'Hint job has no completed schedule: {hint_job_id}'
+    
+    data['hintSchedule'] = job.result
+    return None
+
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({'status': 'healthy', 'service': 'nurse-scheduler-backend'})
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    job_stats = job_manager.stats()
+    metrics.jobs_in_state.set(job_stats['queued'], state='queued')
+    metrics.jobs_in_state.set(job_stats['running'], state='running')
+    allocation = core_budget.snapshot()
+    metrics.solver_cores.set(allocation['allocated'], state='allocated')
+    metrics.solver_cores.set(allocation['free'], state='free')
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/generate-schedule', methods=['POST'])
 def generate_schedule():
     try:
+        parse_started = time.perf_counter()
         data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
+        metrics.http_phase_seconds.observe(time.perf_counter() - parse_started,
+                                           endpoint='generate-schedule', phase='parse')
+        payload_error = validate_schedule_payload(data) or resolve_hint_job(data)
+        if payload_error:
+            return jsonify({'error': payload_error}), 400
         
-        required_fields = ['nurses', 'wardId', 'startDate', 'endDate', 'requiredNurses']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
+        cache_key = make_cache_key(data)
+        cached, cache_age = schedule_cache.lookup(cache_key)
+        metrics.cache_lookups_total.inc(ward=data['wardId'], result='hit' if cached is not None else 'miss')
+        if cached is not None:
+            if data.get('diagnostics'):
+                cached['diagnostics'] = cache_hit_diagnostics(cache_key, cache_age)
+            return send_json(cached, 'generate-schedule', headers={'X-Schedule-Cache': 'hit'})
         
-        if not data['nurses']:
-            return jsonify({'error': 'No nurses provided'}), 400
+        allocation = core_budget.acquire(payload_cells(data), f"sync:{data['wardId']}",
+                                         timeout=config.SOLVER_ACQUIRE_TIMEOUT)
+        if allocation is None:
+            return jsonify({'error': 'Solver capacity exhausted, please retry later',
+                            'allocation': core_budget.snapshot()}), 429, {'Retry-After': '10'}
         
-        solver = ScheduleSolver()
-        result = solver.solve_schedule(data)
+        try:
+            solver = ScheduleSolver(num_workers=allocation.workers)
+            result = solver.solve_schedule(data)
+        finally:
+            core_budget.release(allocation)
         
-        if 'error' in result:
-            return jsonify(result), 400
+        diagnostics = result.pop('diagnostics', None)
+        if diagnostics:
+            metrics.observe_solve(data['wardId'], diagnostics)
         
-        return jsonify(result), 200
+        if 'error' not in result:
+            schedule_cache.put(cache_key, result)
+        if diagnostics and data.get('diagnostics'):
+            result['diagnostics'] = dict(diagnostics, cacheHit=False)
+        
+        if 'error' in result:
+            return send_json(result, 'generate-schedule', status=400)
+        return send_json(result, 'generate-schedule', headers={'X-Schedule-Cache': 'miss'})
         
     except Exception as e:
         print(f"Error in generate_schedule: {str(e)}")
         print(traceback.format_exc())
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
+@app.route('/repair-schedule', methods=['POST'])
+def repair_schedule():
+    try:
+        data = request.get_json()
+        payload_error = validate_schedule_payload(data)
+        if not payload_error and not data.get('changeDate'):
+            payload_error = 'Missing required field: changeDate'
+        if payload_error:
+            return jsonify({'error': payload_error}), 400
+        
+        if not data.get('publishedSchedule'):
+            if not schedule_repository:
+                return jsonify({'error': 'Database not initialized'}), 500
+            data['publishedSchedule'] = schedule_repository.get(data['wardId'], data.get('month') or data['startDate'][:7])
+            if not data['publishedSchedule']:
+                return jsonify({'error': 'No published schedule to repair'}), 404
+        
+        remaining_payload = dict(data, startDate=max(data['startDate'], data['changeDate']))
+        allocation = core_budget.acquire(payload_cells(remaining_payload), f"repair:{data['wardId']}",
+                                         timeout=config.SOLVER_ACQUIRE_TIMEOUT)
+        if allocation is None:
+            return jsonify({'error': 'Solver capacity exhausted, please retry later',
+                            'allocation': core_budget.snapshot()}), 429, {'Retry-After': '10'}
+        
+        try:
+            result = ScheduleRepairer(ScheduleSolver(num_workers=allocation.workers)).repair(data)
+        finally:
+            core_budget.release(allocation)
+        
+        diagnostics = result.pop('diagnostics', None)
+        if diagnostics:
+            metrics.observe_solve(data['wardId'], diagnostics)
+            if data.get('diagnostics'):
+                result['diagnostics'] = diagnostics
+        
+        if 'error' in result:
+            return send_json(result, 'repair-schedule', status=400)
+        return send_json(result, 'repair-schedule')
+        
+    except Exception as e:
+        print(f"Error in repair_schedule: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    try:
+        data = request.get_json()
+        payload_error = validate_schedule_payload(data) or resolve_hint_job(data)
+        if payload_error:
+            return jsonify({'error': payload_error}), 400
+        
+        job = job_manager.submit(data)
+        return jsonify(job.to_dict()), 202
+        
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 429
+    except Exception as e:
+        print(f"Error in submit_job: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    return jsonify(job_manager.stats()), 200
+
+@app.route('/solver/allocation', methods=['GET'])
+def get_solver_allocation():
+    return jsonify({'cores': core_budget.snapshot(), 'jobs': job_manager.stats()}), 200
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict()), 200
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    if job.status == JOB_COMPLETED:
+        return send_json(job.result, 'job-result', etag=True)
+    if job.status == JOB_FAILED:
+        failure = dict(job.result or {'error': job.error}, job=job.to_dict())
+        if job.diagnostics and job.include_diagnostics:
+            failure['diagnostics'] = job.diagnostics
+        return jsonify(failure), 400
+    if job.status == JOB_CANCELLED:
+        return jsonify({'error': 'Job was cancelled', 'job': job.to_dict()}), 409
+    return jsonify(job.to_dict()), 202
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    job = job_manager.cancel(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict()), 200
+
+@app.route('/jobs/<job_id>/stop', methods=['POST'])
+def stop_job(job_id):
+    job = job_manager.stop(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict()), 200
+
+def format_sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    def generate():
+        sent = 0
+        last_message = time.time()
+        while True:
+            finished = job.status in FINISHED_STATES
+            events, latest_schedule = job_manager.drain_progress(job)
+            for index, event in enumerate(events[sent:], start=sent):
+                if latest_schedule is not None and index == len(events) - 1:
+                    event = dict(event, schedule=latest_schedule)
+                yield format_sse('incumbent', event)
+                last_message = time.time()
+            sent = len(events)
+            
+            if finished:
+                yield format_sse('done', job.to_dict())
+                return
+            
+            if time.time() - last_message >= config.STREAM_KEEPALIVE_INTERVAL:
+                yield ': keep-alive\n\n'
+                last_message = time.time()
+            time.sleep(config.STREAM_POLL_INTERVAL)
+    
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=headers)
+
+@app.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify(dict(schedule_cache.stats(), statistics=statistics_service.stats(),
+                        swapCheckers=swap_checkers.stats() if swap_checkers else None)), 200
+
+@app.route('/cache', methods=['DELETE'])
+def clear_cache():
+    if not caller_uid():
+        return jsonify({'error': 'Missing or invalid ID token'}), 401
+    schedule_cache.clear()
+    return jsonify(schedule_cache.stats()), 200
+
 @app.route('/validate-swap', methods=['POST'])
 def validate_swap():
     try:
@@ -64,54 +364,147 @@ def validate_swap():
             if field not in data:
                 return jsonify({'error': f'Missing field: {field}'}), 400
         
-        from_shift = data['fromShift']
-        to_shift = data['toShift']
-        
-        if from_shift == 0 and to_shift == 0:
-            return jsonify({'valid': False, 'reason': 'ไม่สามารถแลกวันหยุดกับวันหยุดได้'})
+        try:
+            reason = check_swap_types(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if reason:
+            return jsonify({'valid': False, 'reason': reason})
         
-        if from_shift != 0 and to_shift != 0 and from_shift != to_shift:
-            return jsonify({'valid': False, 'reason': 'ต้องแลกเวรประเภทเดียวกันเท่านั้น'})
+        checker = swap_checker_for(data, data)
+        if checker is None:
+            return jsonify({'valid': True, 'rulesChecked': False})
         
-        return jsonify({'valid': True})
+        try:
+            result = checker.check(data)
+        except ValueError as e:
+            return jsonify({'valid': False, 'reason': str(e)})
+        return jsonify(dict(result, rulesChecked=True))
         
     except Exception as e:
         print(f"Error in validate_swap: {str(e)}")
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
-@app.route('/statistics/<ward_id>/<month>', methods=['GET'])
-def get_statistics(ward_id, month):
+@app.route('/validate-swaps', methods=['POST'])
+def validate_swaps():
+    try:
+        data = request.get_json() or {}
+        swaps = data.get('swaps')
+        if not isinstance(swaps, list) or not swaps:
+            return jsonify({'error': 'No swaps provided'}), 400
+        
+        checker = swap_checker_for(data, swaps[0])
+        if checker is None:
+            return jsonify({'error': 'Schedule not found'}), 404
+        
+        results, ranking = checker.check_many(swaps, rank=data.get('rank', False))
+        response = {'results': results}
+        if ranking is not None:
+            response['ranking'] = ranking
+        return send_json(response, 'validate-swaps')
+        
+    except Exception as e:
+        print(f"Error in validate_swaps: {str(e)}")
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+@app.route('/schedules', methods=['POST'])
+def save_schedule():
     try:
-        if not db:
+        if not schedule_repository:
             return jsonify({'error': 'Database not initialized'}), 500
         
-        schedules_ref = db.collection('schedules')
-        query = schedules_ref.where('wardId', '==', ward_id).where('month', '==', month).limit(1)
-        docs = query.stream()
+        uid = caller_uid()
+        if not uid:
+            return jsonify({'error': 'Missing or invalid ID token'}), 401
         
-        schedule_doc = None
-        for doc in docs:
-            schedule_doc = doc.to_dict()
-            break
+        data = request.get_json() or {}
+        schedule = data.get('schedule')
+        if not schedule or not data.get('wardId') or not data.get('month'):
+            return jsonify({'error': 'Missing schedule, wardId or month'}), 400
         
-        if not schedule_doc:
-            return jsonify({'error': 'Schedule not found'}), 404
+        schedule = decode_compact(schedule)
+        nurse_ids = data.get('nurseIds') or list(schedule.get('shifts', {}))
+        carry_over_flags = schedule.get('nextCarryOverFlags') or {}
+        
+        users = schedule_repository.get_users([uid, *nurse_ids, *carry_over_flags])
+        caller = users.get(uid) or {}
+        if not caller.get('isAdmin') or caller.get('currentWard') != data['wardId']:
+            return jsonify({'error': f"Not an admin of ward {data['wardId']}"}), 403
         
-        stats = schedule_doc.get('statistics', {})
+        unknown = [nurse_id for nurse_id in dict.fromkeys([*nurse_ids, *carry_over_flags]) if nurse_id not in users]
+        if unknown:
+            return jsonify({'error': 'Unknown nurse IDs', 'nurseIds': unknown}), 400
+        other_ward = [nurse_id for nurse_id in dict.fromkeys([*nurse_ids, *carry_over_flags])
+                      if users[nurse_id].get('currentWard') != data['wardId']]
+        if other_ward:
+            return jsonify({'error': f"Nurses are not in ward {data['wardId']}", 'nurseIds': other_ward}), 400
         
-        summary = {
-            'total_nurses': len(stats),
-            'avg_shifts': sum(s['total'] for s in stats.values()) / len(stats) if stats else 0,
-            'avg_off_days': sum(s['off'] for s in stats.values()) / len(stats) if stats else 0,
-            'total_overtime': sum(s['overtime'] for s in stats.values()),
-            'by_nurse': stats
-        }
+        schedule.update({
+            'wardId': data['wardId'],
+            'month': data['month'],
+            'createdAt': datetime.datetime.now(datetime.timezone.utc),
+            'createdBy': uid,
+            'nurseIds': nurse_ids
+        })
         
-        return jsonify(summary), 200
+        saved = schedule_repository.save_with_carry_over(schedule, carry_over_flags)
+        metrics.schedule_save_seconds.observe(saved['writeSeconds'], ward=data['wardId'])
+        metrics.schedule_save_batches.observe(saved['batches'], ward=data['wardId'])
+        statistics_service.invalidate(data['wardId'], data['month'])
+        if swap_checkers:
+            swap_checkers.invalidate(data['wardId'], data['month'])
+        return jsonify(saved), 201
+        
+    except Exception as e:
+        print(f"Error in save_schedule: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+@app.route('/statistics/<ward_id>/<month>', methods=['GET'])
+def get_statistics(ward_id, month):
+    try:
+        if not schedule_repository:
+            return jsonify({'error': 'Database not initialized'}), 500
+        
+        summary = statistics_service.get(ward_id, month)
+        if summary is None:
+            return jsonify({'error': 'Schedule not found'}), 404
+        
+        return send_json(summary, 'statistics', etag=True)
         
     except Exception as e:
         print(f"Error in get_statistics: {str(e)}")
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
+@app.route('/statistics/<ward_id>/<month>', methods=['DELETE'])
+def invalidate_statistics(ward_id, month):
+    if not caller_uid():
+        return jsonify({'error': 'Missing or invalid ID token'}), 401
+    return jsonify({'invalidated': statistics_service.invalidate(ward_id, month)}), 200
+
+@app.route('/statistics/batch', methods=['POST'])
+def get_statistics_batch():
+    try:
+        if not schedule_repository:
+            return jsonify({'error': 'Database not initialized'}), 500
+        
+        data = request.get_json() or {}
+        keys = [(item.get('wardId'), item.get('month')) for item in data.get('keys') or []]
+        keys += [(ward_id, month) for ward_id in data.get('wardIds') or [] for month in data.get('months') or []]
+        if not keys:
+            return jsonify({'error': 'No wards or months provided'}), 400
+        if len(keys) > config.STATISTICS_BATCH_LIMIT:
+            return jsonify({'error': f'Too many ward/month pairs (max {config.STATISTICS_BATCH_LIMIT})'}), 400
+        
+        found = statistics_service.get_many(keys)
+        statistics = {}
+        for ward_id, month in keys:
+            statistics.setdefault(ward_id, {})[month] = found.get((ward_id, month))
+        return send_json({'statistics': statistics}, 'statistics-batch')
+        
+    except Exception as e:
+        print(f"Error in get_statistics_batch: {str(e)}")
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=config.PORT, debug=config.DEBUG)
\ No newline at end of file
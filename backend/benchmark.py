@@ -0,0 +1,290 @@
+import argparse
+import copy
+import datetime
+import gzip
+import json
+import multiprocessing
+import random
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from faker import Faker
+
+from config import Config
+from solver import ScheduleSolver
+from wire_format import decode_compact, encode_compact
+
+REQUIRED_MIXES = {
+    'balanced': {Config.SHIFT_MORNING: 1 / 3, Config.SHIFT_AFTERNOON: 1 / 3, Config.SHIFT_NIGHT: 1 / 3},
+    'day-heavy': {Config.SHIFT_MORNING: 0.4, Config.SHIFT_AFTERNOON: 0.3, Config.SHIFT_NIGHT: 0.3},
+    'night-light': {Config.SHIFT_MORNING: 0.375, Config.SHIFT_AFTERNOON: 0.375, Config.SHIFT_NIGHT: 0.25}
+}
+
+SOFT_REQUEST_TYPES = ['no_specific_days', 'request_specific_shifts', 'no_morning_shifts',
+                      'no_afternoon_shifts', 'no_night_shifts', 'no_night_afternoon_double']
+
+
+def required_nurses_for(num_nurses, mix, coverage):
+    total = max(len(Config.SHIFTS), round(num_nurses * coverage))
+    shares = REQUIRED_MIXES[mix]
+    required = {s: max(1, int(total * shares[s])) for s in Config.SHIFTS}
+    for s in sorted(Config.SHIFTS, key=lambda s: -shares[s]):
+        if sum(required.values()) >= total:
+            break
+        required[s] += 1
+    return {str(s): count for s, count in required.items()}
+
+
+def generate_ward(num_nurses, num_days=30, start_date='2026-01-01', seed=0, mix='balanced',
+                  request_density=1.0, hard_share=0.2, coverage=0.6, time_limit=30):
+    rng = random.Random(seed)
+    fake = Faker('th_TH')
+    fake.seed_instance(seed)
+
+    start = datetime.date.fromisoformat(start_date)
+    days = [start + datetime.timedelta(days=d) for d in range(num_days)]
+    nurses = [{
+        'id': f'nurse-{seed}-{i:03d}',
+        'firstName': fake.first_name(),
+        'lastName': fake.last_name(),
+        'isGovernmentOfficial': rng.random() < 0.4
+    } for i in range(num_nurses)]
+
+    hard_requests = []
+    monthly_requests = {}
+    for nurse in nurses:
+        count = int(request_density) + (1 if rng.random() < request_density % 1 else 0)
+        for _ in range(count):
+            if rng.random() < hard_share:
+                hard_requests.append({'nurseId': nurse['id'], 'date': rng.choice(days).isoformat()})
+                continue
+
+            req_type = rng.choice(SOFT_REQUEST_TYPES)
+            req = {'type': req_type, 'is_high_priority': rng.random() < 0.25}
+            if req_type == 'no_specific_days':
+                req['value'] = sorted({rng.choice(days).day for _ in range(rng.randint(1, 3))})
+            elif req_type == 'request_specific_shifts':
+                req['value'] = [{'day': rng.choice(days).day, 'shift_type': rng.choice(Config.SHIFTS)}
+                                for _ in range(rng.randint(1, 3))]
+            monthly_requests.setdefault(nurse['id'], []).append(req)
+
+    return {
+        'wardId': f'bench-{num_nurses}-{seed}',
+        'nurses': nurses,
+        'startDate': days[0].isoformat(),
+        'endDate': days[-1].isoformat(),
+        'requiredNurses': required_nurses_for(num_nurses, mix, coverage),
+        'targetOffDays': round(num_days * 8 / 30),
+        'solverTimeLimit': time_limit,
+        'monthlyRequests': monthly_requests,
+        'hardRequests': hard_requests,
+        'carryOverFlags': {nurse['id']: rng.random() < 0.1 for nurse in nurses}
+    }
+
+
+def perturb_ward(payload, seed):
+    rng = random.Random(seed)
+    perturbed = copy.deepcopy(payload)
+    nurse_ids = [nurse_id for nurse_id, requests in perturbed['monthlyRequests'].items() if requests]
+    if nurse_ids:
+        requests = perturbed['monthlyRequests'][rng.choice(nurse_ids)]
+        requests.pop(rng.randrange(len(requests)))
+    return perturbed
+
+
+def interchangeable_ward(payload, share, seed):
+    rng = random.Random(seed)
+    ward = copy.deepcopy(payload)
+    nurse_ids = [nurse['id'] for nurse in ward['nurses']]
+    cleared = set(rng.sample(nurse_ids, round(len(nurse_ids) * share)))
+    ward['monthlyRequests'] = {nurse_id: requests for nurse_id, requests in ward['monthlyRequests'].items()
+                               if nurse_id not in cleared}
+    ward['hardRequests'] = [req for req in ward['hardRequests'] if req['nurseId'] not in cleared]
+    return ward
+
+
+def run_case(payload):
+    started = time.perf_counter()
+    result = ScheduleSolver().solve_schedule(payload)
+    wall_seconds = time.perf_counter() - started
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    record = {'wallSeconds': wall_seconds, 'peakRssMb': peak_rss_kb / 1024}
+    if 'error' in result:
+        record['status'] = result['error']
+        if 'hardViolations' in result:
+            record.update({'engine': result.get('engine'), 'hardViolations': result['hardViolations']})
+        return record, None
+
+    timings = result.get('solveTimings', {})
+    objective = result['objectiveValue']
+    bound = result.get('objectiveBound')
+    record.update({
+        'status': result['solverStatus'],
+        'engine': result.get('engine', 'cpsat'),
+        'objective': objective,
+        'bound': bound,
+        'gap': abs(objective - bound) / max(1.0, abs(objective)) if bound is not None else None,
+        'hardViolations': result.get('hardViolations', 0),
+        'symmetryPairs': result.get('diagnostics', {}).get('formulation', {}).get('symmetryPairs'),
+        'requestCompileSeconds': timings.get('requestCompileSeconds'),
+        'modelBuildSeconds': timings.get('modelBuildSeconds'),
+        'firstFeasibleSeconds': timings.get('firstFeasibleSeconds'),
+        'finalObjectiveSeconds': timings.get('finalObjectiveSeconds'),
+        'solveSeconds': timings.get('solveSeconds')
+    })
+    return record, result
+
+
+def _timed(function, repeats):
+    started = time.perf_counter()
+    for _ in range(repeats):
+        value = function()
+    return value, (time.perf_counter() - started) / repeats
+
+
+def measure_wire_format(result, repeats=5):
+    result = {key: value for key, value in result.items() if key != 'diagnostics'}
+    measurement = {}
+    for name, encode, decode in (('full', lambda: result, lambda parsed: parsed),
+                                 ('compact', lambda: encode_compact(result), decode_compact)):
+        body, serialize_seconds = _timed(lambda: json.dumps(encode(), separators=(',', ':')).encode('utf-8'), repeats)
+        _, parse_seconds = _timed(lambda: decode(json.loads(body)), repeats)
+        measurement[name] = {
+            'bytes': len(body),
+            'gzipBytes': len(gzip.compress(body, compresslevel=Config.WIRE_GZIP_LEVEL)),
+            'serializeSeconds': serialize_seconds,
+            'parseSeconds': parse_seconds
+        }
+    return measurement
+
+
+def run_isolated(executor_context, payload):
+    with ProcessPoolExecutor(max_workers=1, mp_context=executor_context) as executor:
+        return executor.submit(run_case, payload).result()
+
+
+def _median(records, field):
+    values = [record[field] for record in records if record.get(field) is not None]
+    return statistics.median(values) if values else None
+
+
+def summarize(records, latency_budget):
+    by_size = {}
+    for record in records:
+        by_size.setdefault(record['nurses'], []).append(record)
+
+    summary = []
+    over_budget_at = None
+    for size in sorted(by_size):
+        size_records = by_size[size]
+        row = {
+            'nurses': size,
+            'runs': len(size_records),
+            'solved': sum(1 for record in size_records if record['status'] in ('OPTIMAL', 'FEASIBLE')),
+            'modelBuildSeconds': _median(size_records, 'modelBuildSeconds'),
+            'firstFeasibleSeconds': _median(size_records, 'firstFeasibleSeconds'),
+            'finalObjectiveSeconds': _median(size_records, 'finalObjectiveSeconds'),
+            'objective': _median(size_records, 'objective'),
+            'gap': _median(size_records, 'gap'),
+            'symmetryPairs': _median(size_records, 'symmetryPairs'),
+            'peakRssMb': max(record['peakRssMb'] for record in size_records)
+        }
+        summary.append(row)
+        first_feasible = row['firstFeasibleSeconds']
+        if over_budget_at is None and latency_budget and (first_feasible is None or first_feasible > latency_budget):
+            over_budget_at = size
+
+    return {'bySize': summary, 'latencyBudgetSeconds': latency_budget, 'overBudgetAtNurses': over_budget_at}
+
+
+def _int_list(value):
+    return [int(item) for item in value.split(',') if item]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Synthetic-ward benchmark for ScheduleSolver')
+    parser.add_argument('--nurses', type=_int_list, default=[10, 20, 40, 80, 150])
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--start-date', default='2026-01-01')
+    parser.add_argument('--mix', choices=sorted(REQUIRED_MIXES), default='balanced')
+    parser.add_argument('--coverage', type=float, default=0.6,
+                        help='nurse-shifts required per day as a fraction of ward size')
+    parser.add_argument('--request-density', type=float, default=1.0, help='requests per nurse')
+    parser.add_argument('--hard-share', type=float, default=0.2, help='share of requests that are hard day-off')
+    parser.add_argument('--seeds', type=_int_list, default=[1, 2, 3])
+    parser.add_argument('--time-limit', type=float, default=30)
+    parser.add_argument('--latency-budget', type=float, default=None)
+    parser.add_argument('--warm-start', action='store_true',
+                        help='also re-solve a one-request change cold and with hints from the first solve')
+    parser.add_argument('--wire-format', action='store_true',
+                        help='measure response bytes and serialize/parse time for the full and compact formats')
+    parser.add_argument('--engines', action='store_true',
+                        help='also solve each ward with the heuristic engine and with the heuristic-hinted hybrid')
+    parser.add_argument('--decomposition', action='store_true',
+                        help='also solve each ward with rolling-horizon week blocks and LNS refinement')
+    parser.add_argument('--lean', action='store_true',
+                        help='also solve each ward with the lean formulation and symmetry breaking')
+    parser.add_argument('--interchangeable-share', type=float, default=0.5,
+                        help='with --lean, share of nurses stripped of requests for the symmetric-* scenarios')
+    parser.add_argument('--output', help='write JSON lines here instead of stdout')
+    args = parser.parse_args(argv)
+
+    context = multiprocessing.get_context('spawn')
+    output = open(args.output, 'w') if args.output else sys.stdout
+    records = []
+    try:
+        for num_nurses in args.nurses:
+            for seed in args.seeds:
+                case = {
+                    'nurses': num_nurses, 'days': args.days, 'seed': seed, 'mix': args.mix,
+                    'coverage': args.coverage, 'requestDensity': args.request_density, 'hardShare': args.hard_share
+                }
+                payload = generate_ward(num_nurses, args.days, args.start_date, seed, args.mix,
+                                        args.request_density, args.hard_share, args.coverage, args.time_limit)
+                scenarios = [('cold', payload)]
+                record, result = run_isolated(context, payload)
+                if args.wire_format and result is not None:
+                    record['wireFormat'] = measure_wire_format(result)
+                if args.warm_start and result is not None:
+                    perturbed = perturb_ward(payload, seed)
+                    hinted = dict(perturbed, hintSchedule=result)
+                    scenarios += [('perturbed-cold', perturbed), ('perturbed-hinted', hinted)]
+                if args.engines:
+                    scenarios += [(engine, dict(payload, engine=engine)) for engine in ('heuristic', 'hybrid')]
+                if args.decomposition:
+                    scenarios.append(('decomposed', dict(payload, decomposition='blocks')))
+                if args.lean:
+                    symmetric = interchangeable_ward(payload, args.interchangeable_share, seed)
+                    scenarios += [('lean', dict(payload, formulation='lean')),
+                                  ('symmetric-standard', symmetric),
+                                  ('symmetric-lean', dict(symmetric, formulation='lean'))]
+
+                for scenario, scenario_payload in scenarios:
+                    if scenario != 'cold':
+                        record, _ = run_isolated(context, scenario_payload)
+                    record = dict(case, scenario=scenario, **record)
+                    records.append(record)
+                    output.write(json.dumps(record) + '\n')
+                    output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    cold_records = [record for record in records if record['scenario'] == 'cold']
+    summary = summarize(cold_records, args.latency_budget)
+    compared = (['heuristic', 'hybrid'] if args.engines else []) + (['decomposed'] if args.decomposition else [])
+    compared += ['lean', 'symmetric-standard', 'symmetric-lean'] if args.lean else []
+    if compared:
+        summary = {'cpsat': summary}
+        for scenario in compared:
+            summary[scenario] = summarize([record for record in records if record['scenario'] == scenario],
+                                          args.latency_budget)
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
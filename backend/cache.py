@@ -0,0 +1,198 @@
+import collections
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+
+from config import Config
+
+CACHE_KEY_VERSION = 6
+CACHE_KEY_CONFIG_PREFIXES = ('PENALTY_', 'BONUS_', 'MAX_CONSECUTIVE_', 'MIN_OFF_', 'WINDOW_', 'HEURISTIC_')
+SOFT_REQUEST_FIELDS = ('type', 'value', 'is_high_priority')
+PER_REQUEST_FIELDS = ('diagnostics', 'modelStats')
+
+
+def _canonical(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+def _normalize_payload(data):
+    nurses = sorted(data.get('nurses', []), key=lambda nurse: str(nurse.get('id')))
+    nurse_ids = {nurse.get('id') for nurse in nurses}
+
+    monthly_requests = {}
+    for nurse_id, requests in (data.get('monthlyRequests') or {}).items():
+        if nurse_id not in nurse_ids:
+            continue
+        normalized = [{field: req.get(field) for field in SOFT_REQUEST_FIELDS} for req in requests if req.get('type')]
+        if normalized:
+            monthly_requests[nurse_id] = sorted(normalized, key=_canonical)
+
+    hard_requests = sorted({(req.get('nurseId'), req.get('date')) for req in data.get('hardRequests') or []
+                            if req.get('nurseId') in nurse_ids}, key=str)
+
+    absences = sorted({(absence.get('nurseId'), absence.get('startDate'), absence.get('endDate'))
+                       for absence in data.get('absences') or [] if absence.get('nurseId') in nurse_ids}, key=str)
+
+    carry_over = sorted(nurse_id for nurse_id, flag in (data.get('carryOverFlags') or {}).items()
+                        if flag and nurse_id in nurse_ids)
+
+    return {
+        'version': CACHE_KEY_VERSION,
+        'nurses': nurses,
+        'startDate': data.get('startDate'),
+        'endDate': data.get('endDate'),
+        'requiredNurses': {str(k): v for k, v in (data.get('requiredNurses') or {}).items()},
+        'targetOffDays': data.get('targetOffDays', 8),
+        'solverTimeLimit': data.get('solverTimeLimit', 120),
+        'previousSchedule': data.get('previousSchedule'),
+        'monthlyRequests': monthly_requests,
+        'hardRequests': hard_requests,
+        'absences': absences,
+        'carryOverFlags': carry_over,
+        'hintSchedule': (data.get('hintSchedule') or {}).get('shifts'),
+        'stabilityPenalty': data.get('stabilityPenalty'),
+        'engine': data.get('engine', 'cpsat'),
+        'heuristicTimeLimit': data.get('heuristicTimeLimit'),
+        'heuristicSeed': data.get('heuristicSeed', 0),
+        'decomposition': data.get('decomposition'),
+        'blockDays': data.get('blockDays'),
+        'lnsTimeLimit': data.get('lnsTimeLimit', 0),
+        'incumbentSchedule': (data.get('incumbentSchedule') or {}).get('shifts'),
+        'lnsFocusDays': data.get('lnsFocusDays', []),
+        'lnsSeed': data.get('lnsSeed', 0),
+        'formulation': data.get('formulation', 'standard'),
+        'alternatives': data.get('alternatives'),
+        'alternativeMinDistance': data.get('alternativeMinDistance'),
+        'alternativesTimeLimit': data.get('alternativesTimeLimit'),
+        'config': {name: value for name, value in vars(Config).items() if name.startswith(CACHE_KEY_CONFIG_PREFIXES)}
+    }
+
+
+def make_cache_key(data):
+    return hashlib.sha256(_canonical(_normalize_payload(data)).encode('utf-8')).hexdigest()
+
+
+def cache_hit_diagnostics(key, age):
+    return {'cacheHit': True, 'cacheKey': key, 'cacheAgeSeconds': round(age, 3)}
+
+
+class ScheduleCache:
+    def __init__(self, max_entries=None, ttl=None, disk_dir=None):
+        self.max_entries = max_entries if max_entries is not None else Config.SCHEDULE_CACHE_SIZE
+        self.ttl = ttl if ttl is not None else Config.SCHEDULE_CACHE_TTL
+        self.disk_dir = disk_dir if disk_dir is not None else Config.SCHEDULE_CACHE_DIR
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = collections.Counter()
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def get(self, key):
+        entry = self._lookup(key)
+        return entry[1] if entry is not None else None
+
+    def lookup(self, key):
+        entry = self._lookup(key)
+        return (entry[1], time.time() - entry[0]) if entry is not None else (None, None)
+
+    def _lookup(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, result = entry
+                if now - stored_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self._counters['hits'] += 1
+                    return stored_at, copy.deepcopy(result)
+                del self._entries[key]
+                self._counters['expirations'] += 1
+
+        entry = self._read_disk(key, now)
+        with self._lock:
+            if entry is None:
+                self._counters['misses'] += 1
+                return None
+            self._counters['hits'] += 1
+            self._counters['diskHits'] += 1
+            self._store_memory(key, entry[0], entry[1])
+            return entry[0], copy.deepcopy(entry[1])
+
+    def put(self, key, result):
+        if result.get('hardViolations'):
+            return
+        stored_at = time.time()
+        result = copy.deepcopy({field: value for field, value in result.items() if field not in PER_REQUEST_FIELDS})
+        with self._lock:
+            self._store_memory(key, stored_at, result)
+            self._counters['stores'] += 1
+        self._write_disk(key, stored_at, result)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.disk_dir:
+            for name in os.listdir(self.disk_dir):
+                if name.endswith('.json'):
+                    os.remove(os.path.join(self.disk_dir, name))
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                'entries': len(self._entries),
+                'maxEntries': self.max_entries,
+                'ttlSeconds': self.ttl,
+                'diskEnabled': bool(self.disk_dir),
+                'hits': self._counters['hits'],
+                'diskHits': self._counters['diskHits'],
+                'misses': self._counters['misses'],
+                'stores': self._counters['stores'],
+                'evictions': self._counters['evictions'],
+                'expirations': self._counters['expirations'],
+                'hitRate': self._counters['hits'] / lookups if lookups else 0
+            }
+
+    def _store_memory(self, key, stored_at, result):
+        self._entries[key] = (stored_at, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters['evictions'] += 1
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f'{key}.json')
+
+    def _read_disk(self, key, now):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if now - entry['storedAt'] > self.ttl:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            with self._lock:
+                self._counters['expirations'] += 1
+            return None
+        return entry['storedAt'], entry['result']
+
+    def _write_disk(self, key, stored_at, result):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'storedAt': stored_at, 'result': result}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error writing schedule cache entry: {e}")
@@ -9,6 +9,49 @@ class Config:
     DEBUG = FLASK_ENV == 'development'
     PORT = int(os.environ.get('PORT', 5000))
     
+    JOB_MAX_WORKERS = int(os.environ.get('JOB_MAX_WORKERS', 2))
+    JOB_QUEUE_SIZE = int(os.environ.get('JOB_QUEUE_SIZE', 20))
+    JOB_HISTORY_SIZE = int(os.environ.get('JOB_HISTORY_SIZE', 200))
+    STOP_POLL_INTERVAL = 0.25
+    
+    SOLVER_NUM_WORKERS = 4
+    SOLVER_CORE_BUDGET = int(os.environ.get('SOLVER_CORE_BUDGET', os.cpu_count() or 4))
+    SOLVER_MIN_WORKERS = int(os.environ.get('SOLVER_MIN_WORKERS', 1))
+    SOLVER_WORKER_TIERS = [(1500, 2), (6000, 4), (None, 8)]
+    SOLVER_ACQUIRE_TIMEOUT = float(os.environ.get('SOLVER_ACQUIRE_TIMEOUT', 0))
+    CONFLICT_SHRINK_TIME_LIMIT = 10
+    CONFLICT_SHRINK_MAX_REQUESTS = 40
+    HEURISTIC_TIME_LIMIT = 0.8
+    HEURISTIC_HARD_PENALTY = 10000
+    HEURISTIC_START_TEMPERATURE = 20
+    DECOMPOSITION_MIN_CELLS = 3000
+    DECOMPOSITION_BLOCK_DAYS = 7
+    DECOMPOSITION_BLOCK_SHARE = 0.5
+    LNS_ITERATION_TIME_LIMIT = 2
+    LNS_NEIGHBOURHOOD_NURSES = 12
+    LNS_NEIGHBOURHOOD_DAYS = 7
+    SYMMETRY_BREAKING_DAYS = 7
+    ALTERNATIVE_MIN_DISTANCE = 12
+    ALTERNATIVE_POOL_SIZE = 50
+    ALTERNATIVE_TIME_LIMIT = 10
+    WIRE_COMPRESS_MIN_BYTES = 1024
+    WIRE_GZIP_LEVEL = 6
+    WIRE_BROTLI_QUALITY = 5
+    STREAM_POLL_INTERVAL = 0.25
+    STREAM_KEEPALIVE_INTERVAL = 15
+    
+    SCHEDULE_CACHE_SIZE = int(os.environ.get('SCHEDULE_CACHE_SIZE', 128))
+    SCHEDULE_CACHE_TTL = int(os.environ.get('SCHEDULE_CACHE_TTL', 6 * 60 * 60))
+    SCHEDULE_CACHE_DIR = os.environ.get('SCHEDULE_CACHE_DIR')
+    SCHEDULE_STORE = os.environ.get('SCHEDULE_STORE', 'firestore')
+    STATISTICS_CACHE_SIZE = int(os.environ.get('STATISTICS_CACHE_SIZE', 256))
+    STATISTICS_CACHE_TTL = int(os.environ.get('STATISTICS_CACHE_TTL', 5 * 60))
+    SWAP_CHECKER_CACHE_SIZE = int(os.environ.get('SWAP_CHECKER_CACHE_SIZE', 64))
+    SWAP_CHECKER_CACHE_TTL = int(os.environ.get('SWAP_CHECKER_CACHE_TTL', 5 * 60))
+    STATISTICS_BATCH_LIMIT = 200
+    FIRESTORE_IN_QUERY_LIMIT = 30
+    FIRESTORE_BATCH_LIMIT = 500
+    
     MAX_CONSECUTIVE_SHIFTS = 6
     MAX_CONSECUTIVE_SAME_SHIFT = 2
     MAX_CONSECUTIVE_OFF_DAYS = 2
@@ -25,6 +68,9 @@ class Config:
     PENALTY_BASE_SOFT_VIOLATION = 15
     BONUS_HIGH_PRIORITY = 15
     BONUS_CARRY_OVER = 5
+    PENALTY_SCHEDULE_CHANGE = 0
+    REPAIR_CHANGE_PENALTY = 20
+    REPAIR_TIME_LIMIT = 10
     
     SHIFT_MORNING = 1
     SHIFT_AFTERNOON = 2
@@ -0,0 +1,193 @@
+import datetime
+import time
+
+from config import Config
+from heuristic import HeuristicScheduler
+from request_compiler import compile_requests, trim_monthly_requests
+from schedule_matrix import ScheduleMatrix
+from worker_budget import payload_cells
+
+
+def wants_decomposition(data):
+    mode = data.get('decomposition')
+    if mode == 'auto':
+        return payload_cells(data) >= Config.DECOMPOSITION_MIN_CELLS
+    return mode == 'blocks'
+
+
+def plan_blocks(days, block_days):
+    blocks = [days[i:i + block_days] for i in range(0, len(days), block_days)]
+    if len(blocks) > 1 and len(blocks[-1]) < (block_days + 1) // 2:
+        tail = blocks.pop()
+        blocks[-1] = blocks[-1] + tail
+    return blocks
+
+
+def boundary_state(schedule_shifts, nurse_ids, dates, previous_schedule=None):
+    previous_schedule = previous_schedule or {}
+    prev_last = previous_schedule.get('lastDayShifts', {})
+    prev_consecutive = previous_schedule.get('consecutiveShifts', {})
+    prev_recent = previous_schedule.get('recentShifts', {})
+    keep = max(Config.MAX_CONSECUTIVE_OFF_DAYS, Config.MAX_CONSECUTIVE_SAME_SHIFT, 1)
+
+    state = {'lastDayShifts': {}, 'consecutiveShifts': {}, 'recentShifts': {}}
+    for nurse_id in nurse_ids:
+        nurse_shifts = schedule_shifts.get(nurse_id) or {}
+        day_shifts = [sorted(int(s) for s in nurse_shifts.get(date) or []) for date in dates]
+        recent = list(prev_recent.get(nurse_id) or ([prev_last[nurse_id]] if nurse_id in prev_last else []))
+
+        consecutive = 0
+        for shifts in reversed(day_shifts):
+            if not shifts:
+                break
+            consecutive += len(shifts)
+        else:
+            consecutive += prev_consecutive.get(nurse_id, 0)
+
+        state['lastDayShifts'][nurse_id] = day_shifts[-1] if day_shifts else list(prev_last.get(nurse_id, []))
+        state['consecutiveShifts'][nurse_id] = consecutive
+        state['recentShifts'][nurse_id] = (recent + day_shifts)[-keep:]
+    return state
+
+
+class DecomposedSolver:
+    def __init__(self, solver):
+        self.solver = solver
+        self.config = Config
+        self.block_solver = type(solver)(stop_event=solver.stop_event, num_workers=solver.num_workers)
+
+    def solve(self, data):
+        started = time.perf_counter()
+        deadline = started + data.get('solverTimeLimit', 120)
+        nurses = data['nurses']
+        nurse_ids = [nurse['id'] for nurse in nurses]
+        start_date = datetime.date.fromisoformat(data['startDate'])
+        end_date = datetime.date.fromisoformat(data['endDate'])
+        days = [start_date + datetime.timedelta(days=d) for d in range((end_date - start_date).days + 1)]
+        blocks = plan_blocks(days, data.get('blockDays', self.config.DECOMPOSITION_BLOCK_DAYS))
+        target_off_days = data.get('targetOffDays', 8)
+        base = dict(data, decomposition=None, engine='cpsat', streamSchedules=False, explainInfeasibility=False)
+
+        preview = self.block_solver.solve_schedule(dict(base, engine='heuristic', allowHardViolations=True))
+        if 'error' in preview:
+            return preview
+        if data.get('hintSchedule'):
+            hint_schedule = data['hintSchedule']
+            stability_penalty = data.get('stabilityPenalty', self.config.PENALTY_SCHEDULE_CHANGE)
+        else:
+            hint_schedule, stability_penalty = preview, 0
+
+        report = {'blocks': [], 'previewObjective': preview['objectiveValue']}
+        shifts = {nurse_id: {} for nurse_id in nurse_ids}
+        state = data.get('previousSchedule')
+        build_seconds = 0
+        block_deadline = time.perf_counter() + (deadline - time.perf_counter()) * self.config.DECOMPOSITION_BLOCK_SHARE
+        for i, block in enumerate(blocks):
+            dates = [day.isoformat() for day in block]
+            remaining_days = sum(len(later) for later in blocks[i:])
+            block_started = time.perf_counter()
+            block_payload = dict(
+                base,
+                startDate=dates[0],
+                endDate=dates[-1],
+                previousSchedule=state,
+                hardRequests=[req for req in data.get('hardRequests') or [] if req.get('date') in dates],
+                monthlyRequests=trim_monthly_requests(data.get('monthlyRequests'), {day.day for day in block}),
+                targetOffDays=round(target_off_days * len(block) / len(days)) if target_off_days >= 0 else target_off_days,
+                hintSchedule=hint_schedule,
+                stabilityPenalty=stability_penalty,
+                skipFeasibilityCheck=True
+            )
+            for attempt_deadline in (block_deadline, deadline):
+                time_limit = (attempt_deadline - time.perf_counter()) * len(block) / remaining_days
+                result = self.block_solver.solve_schedule(dict(block_payload, solverTimeLimit=max(time_limit, 1)))
+                if result.get('diagnostics', {}).get('status') != 'UNKNOWN' or result.get('stoppedEarly'):
+                    break
+            block_report = {
+                'startDate': dates[0],
+                'endDate': dates[-1],
+                'status': result.get('solverStatus') or result.get('diagnostics', {}).get('status'),
+                'objective': result.get('objectiveValue'),
+                'seconds': time.perf_counter() - block_started
+            }
+            report['blocks'].append(block_report)
+            if 'error' in result:
+                report['failedBlock'] = i + 1
+                block_error = f"ช่วงที่ {i + 1} ({dates[0]} ถึง {dates[-1]}) จัดตารางไม่ได้: {result['error']}"
+                stopped = self.solver.stop_event is not None and self.solver.stop_event.is_set()
+                if stopped or deadline - time.perf_counter() < 1:
+                    return dict(result, error=block_error, decomposition=report)
+                return self._solve_whole(data, base, hint_schedule, stability_penalty, deadline, block_error, report)
+            build_seconds += result['solveTimings'].get('modelBuildSeconds', 0)
+            for nurse_id in nurse_ids:
+                shifts[nurse_id].update(result['shifts'].get(nurse_id, {}))
+            state = boundary_state(result['shifts'], nurse_ids, dates, state)
+
+        rows = ScheduleMatrix.from_shift_dict(shifts, nurse_ids, days).codes.tolist()
+        compiled_requests = compile_requests(nurses, days, data.get('hardRequests', []),
+                                             data.get('monthlyRequests', {}), data.get('carryOverFlags', {}),
+                                             data.get('absences'))
+        stitched_hard, stitched_objective = HeuristicScheduler(nurses, days, data['requiredNurses'], compiled_requests,
+                                                   target_off_days, data.get('previousSchedule'),
+                                                   data.get('hintSchedule'), stability_penalty).evaluate(rows)
+        report['stitchedObjective'] = stitched_objective
+        report['stitchedHardViolations'] = stitched_hard
+        report['stitchedSeconds'] = time.perf_counter() - started
+
+        block_starts = [sum(len(block) for block in blocks[:i]) for i in range(1, len(blocks))]
+        refined = None
+        if deadline - time.perf_counter() > build_seconds + self.config.LNS_ITERATION_TIME_LIMIT:
+            refined = self.solver.solve_schedule(dict(
+                base,
+                incumbentSchedule={'shifts': shifts},
+                hintSchedule=data.get('hintSchedule'),
+                lnsTimeLimit=max(deadline - time.perf_counter() - build_seconds, 1),
+                lnsFocusDays=block_starts,
+                solverTimeLimit=max(deadline - time.perf_counter(), 1),
+                skipFeasibilityCheck=True
+            ))
+            report['refineSeconds'] = time.perf_counter() - started - report['stitchedSeconds']
+            if 'error' in refined and self.solver.stop_event is not None and self.solver.stop_event.is_set():
+                return refined
+
+        report['refined'] = refined is not None and 'error' not in refined
+        if not report['refined'] and stitched_hard:
+            return {
+                'error': f"ไม่สามารถหาคำตอบได้: ตารางที่ต่อจากช่วงย่อยละเมิดเงื่อนไขบังคับ {stitched_hard} จุด",
+                'hardViolations': stitched_hard,
+                'decomposition': report
+            }
+        if not report['refined']:
+            matrix = ScheduleMatrix.from_shift_dict(shifts, nurse_ids, days)
+            refined = {
+                'wardId': data['wardId'],
+                'month': days[0].strftime('%Y-%m'),
+                'shifts': matrix.to_shift_dict(),
+                'statistics': matrix.nurse_statistics(),
+                'solverStatus': 'FEASIBLE',
+                'objectiveValue': stitched_objective,
+                'objectiveBound': None,
+                'nextCarryOverFlags': {nurse_id: False for nurse_id in nurse_ids}
+            }
+            if compiled_requests.warnings:
+                refined['requestWarnings'] = compiled_requests.warnings
+
+        timings = refined.setdefault('solveTimings', {})
+        timings['firstFeasibleSeconds'] = report['stitchedSeconds']
+        timings['finalObjectiveSeconds'] = time.perf_counter() - started
+        refined['decomposition'] = report
+        return refined
+
+    def _solve_whole(self, data, base, hint_schedule, stability_penalty, deadline, block_error, report):
+        report['fallback'] = 'monolithic'
+        result = self.solver.solve_schedule(dict(
+            base,
+            hintSchedule=hint_schedule,
+            stabilityPenalty=stability_penalty,
+            explainInfeasibility=data.get('explainInfeasibility', False),
+            solverTimeLimit=max(deadline - time.perf_counter(), 1)
+        ))
+        if 'error' in result:
+            result['error'] = f"{block_error} และจัดตารางทั้งช่วงไม่สำเร็จ: {result['error']}"
+        result['decomposition'] = report
+        return result
@@ -0,0 +1,156 @@
+from config import Config
+
+
+def _runs(indices):
+    runs = []
+    for d in indices:
+        if runs and runs[-1][-1] == d - 1:
+            runs[-1].append(d)
+        else:
+            runs.append([d])
+    return runs
+
+
+def _max_shifts(num_days, hard_off_days, prev_consecutive):
+    max_run = Config.MAX_CONSECUTIVE_SHIFTS
+    best = {min(prev_consecutive, max_run + 1): 0}
+    for d in range(num_days):
+        next_best = {}
+        for run, total in best.items():
+            next_best[0] = max(next_best.get(0, -1), total)
+            if d in hard_off_days:
+                continue
+            for worked in (1, 2):
+                if run + worked <= max_run:
+                    next_best[run + worked] = max(next_best.get(run + worked, -1), total + worked)
+        best = next_best
+    return max(best.values()) if best else 0
+
+
+def _min_working_days(num_days, hard_off_days, absent_days=(), carried_off=0):
+    max_off = Config.MAX_CONSECUTIVE_OFF_DAYS
+    if max_off <= 0:
+        return 0
+    best = {min(carried_off, max_off): 0}
+    for d in range(num_days):
+        next_best = {}
+        for off_run, worked in best.items():
+            if d in absent_days:
+                next_best[0] = min(next_best.get(0, num_days + 1), worked)
+                continue
+            if off_run + 1 <= max_off:
+                next_best[off_run + 1] = min(next_best.get(off_run + 1, num_days + 1), worked)
+            if d not in hard_off_days:
+                next_best[0] = min(next_best.get(0, num_days + 1), worked + 1)
+        best = next_best
+    return min(best.values()) if best else None
+
+
+def _carried_off_run(recent_shifts):
+    run = 0
+    for day_shifts in reversed(recent_shifts or []):
+        if day_shifts:
+            break
+        run += 1
+    return run
+
+
+def check_feasibility(nurses, days, required_nurses, compiled_requests, previous_schedule=None):
+    num_days = len(days)
+    required = {s: int(required_nurses.get(str(s), 0)) for s in Config.SHIFTS}
+    morning, afternoon, night = (required[Config.SHIFT_MORNING], required[Config.SHIFT_AFTERNOON],
+                                 required[Config.SHIFT_NIGHT])
+    previous_schedule = previous_schedule or {}
+    last_day_shifts = previous_schedule.get('lastDayShifts', {})
+    prev_consecutive = previous_schedule.get('consecutiveShifts', {})
+    recent_shifts = previous_schedule.get('recentShifts', {})
+    conflicts = []
+
+    hard_off = {n: set(compiled_requests.hard_off.get(n, [])) for n in range(len(nurses))}
+    absent = {n: set(compiled_requests.absent.get(n, [])) for n in range(len(nurses))}
+    unavailable = {n: hard_off[n] | absent[n] for n in range(len(nurses))}
+    carried_off = {n: _carried_off_run(recent_shifts.get(nurse['id'])) for n, nurse in enumerate(nurses)}
+    blocked_day_zero = {n for n, nurse in enumerate(nurses)
+                        if prev_consecutive.get(nurse['id'], 0) >= Config.MAX_CONSECUTIVE_SHIFTS}
+    no_night_day_zero = {n for n, nurse in enumerate(nurses)
+                         if Config.SHIFT_AFTERNOON in last_day_shifts.get(nurse['id'], [])}
+
+    for n, nurse in enumerate(nurses):
+        for run in _runs(sorted(hard_off[n])):
+            carried = carried_off[n] if run[0] == 0 else 0
+            if Config.MAX_CONSECUTIVE_OFF_DAYS > 0 and len(run) + carried > Config.MAX_CONSECUTIVE_OFF_DAYS:
+                carried_note = f' รวมวันหยุดต่อเนื่องจากช่วงก่อนหน้า {carried} วัน' if carried else ''
+                conflicts.append({
+                    'type': 'hard_off_run',
+                    'nurses': [nurse['id']],
+                    'dates': [days[d].isoformat() for d in run],
+                    'message': f"{nurse['id']} ขอหยุดติดต่อกัน {len(run) + carried} วัน{carried_note} "
+                               f"เกินกว่าที่อนุญาต ({Config.MAX_CONSECUTIVE_OFF_DAYS} วัน)"
+                })
+
+    available = []
+    for d in range(num_days):
+        off_nurses = [n for n in range(len(nurses)) if d in unavailable[n] or (d == 0 and n in blocked_day_zero)]
+        available.append(set(range(len(nurses))) - set(off_nurses))
+        need = morning + max(afternoon, night)
+        night_supply = len(available[d] - no_night_day_zero) if d == 0 else len(available[d])
+        if len(available[d]) < need or night_supply < night:
+            conflicts.append({
+                'type': 'daily_supply',
+                'nurses': [nurses[n]['id'] for n in off_nurses],
+                'dates': [days[d].isoformat()],
+                'message': f'วันที่ {days[d].isoformat()} มีพยาบาลว่าง {len(available[d])} คน '
+                           f'แต่ต้องการอย่างน้อย {need} คน'
+            })
+
+    for d in range(num_days - 1):
+        pair_supply = available[d] | available[d + 1]
+        if len(pair_supply) < afternoon + night:
+            off_both = [nurses[n]['id'] for n in range(len(nurses)) if n not in pair_supply]
+            conflicts.append({
+                'type': 'afternoon_night_chain',
+                'nurses': off_both,
+                'dates': [days[d].isoformat(), days[d + 1].isoformat()],
+                'message': f'วันที่ {days[d].isoformat()} ถึง {days[d + 1].isoformat()} มีพยาบาลไม่พอสำหรับ'
+                           f'เวรบ่าย {afternoon} คนและเวรดึกวันถัดไป {night} คน'
+            })
+
+    demand = num_days * sum(required.values())
+    max_supply = sum(_max_shifts(num_days, unavailable[n], prev_consecutive.get(nurse['id'], 0))
+                     for n, nurse in enumerate(nurses))
+    if max_supply < demand:
+        conflicts.append({
+            'type': 'shift_capacity',
+            'nurses': [],
+            'dates': [],
+            'message': f'ต้องการ {demand} เวรแต่พยาบาลทั้งหมดรับได้สูงสุด {max_supply} เวร '
+                       f'(ทำงานติดต่อกันได้ไม่เกิน {Config.MAX_CONSECUTIVE_SHIFTS} เวร)'
+        })
+
+    if Config.MAX_CONSECUTIVE_SAME_SHIFT > 0:
+        window = Config.MAX_CONSECUTIVE_SAME_SHIFT + 1
+        per_nurse_limit = num_days - num_days // window
+        for s in Config.SHIFTS:
+            same_supply = sum(min(per_nurse_limit, num_days - len(unavailable[n])) for n in range(len(nurses)))
+            if same_supply < num_days * required[s]:
+                conflicts.append({
+                    'type': 'shift_type_capacity',
+                    'nurses': [],
+                    'dates': [],
+                    'message': f'ต้องการเวร{Config.SHIFT_NAMES_TH[s]} {num_days * required[s]} เวรแต่รับได้สูงสุด '
+                               f'{same_supply} เวร (เวรเดียวกันติดต่อกันได้ไม่เกิน {Config.MAX_CONSECUTIVE_SAME_SHIFT} วัน)'
+                })
+
+    min_working = [_min_working_days(num_days, hard_off[n], absent[n], carried_off[n]) for n in range(len(nurses))]
+    stuck = [nurses[n]['id'] for n, worked in enumerate(min_working) if worked is None]
+    if not stuck and sum(min_working) > demand:
+        conflicts.append({
+            'type': 'minimum_work',
+            'nurses': [],
+            'dates': [],
+            'message': f'พยาบาล {len(nurses)} คนต้องทำงานรวมอย่างน้อย {sum(min_working)} วัน '
+                       f'(หยุดติดต่อกันได้ไม่เกิน {Config.MAX_CONSECUTIVE_OFF_DAYS} วัน) '
+                       f'แต่มีเวรให้เพียง {demand} เวร'
+        })
+
+    return conflicts
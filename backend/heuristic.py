@@ -0,0 +1,406 @@
+import collections
+import math
+import random
+import time
+
+from config import Config
+
+M_BIT = 1 << (Config.SHIFT_MORNING - 1)
+A_BIT = 1 << (Config.SHIFT_AFTERNOON - 1)
+N_BIT = 1 << (Config.SHIFT_NIGHT - 1)
+SHIFT_BITS = {s: 1 << (s - 1) for s in Config.SHIFTS}
+NA_DOUBLE = A_BIT | N_BIT
+VALID_CODES = (0, M_BIT, A_BIT, N_BIT, NA_DOUBLE)
+POPCOUNT = [bin(code).count('1') for code in range(1 << len(Config.SHIFTS))]
+FILL_ORDER = [Config.SHIFT_NIGHT, Config.SHIFT_AFTERNOON, Config.SHIFT_MORNING]
+
+
+def _trailing_run(recent, predicate):
+    run = 0
+    for day_shifts in reversed(recent):
+        if not predicate(day_shifts):
+            break
+        run += 1
+    return run
+
+
+class RowStats:
+    __slots__ = ('hard', 'soft', 'off', 'shifts', 'by_type')
+
+    def __init__(self, hard, soft, off, shifts, by_type):
+        self.hard = hard
+        self.soft = soft
+        self.off = off
+        self.shifts = shifts
+        self.by_type = by_type
+
+
+class RangeTracker:
+    def __init__(self, values, ignored=()):
+        self.values = list(values)
+        self.ignored = set(ignored)
+        self.counts = collections.Counter(value for n, value in enumerate(self.values) if n not in self.ignored)
+
+    def set(self, n, value):
+        old = self.values[n]
+        if old == value:
+            return
+        if n in self.ignored:
+            self.values[n] = value
+            return
+        self.counts[old] -= 1
+        if not self.counts[old]:
+            del self.counts[old]
+        self.counts[value] += 1
+        self.values[n] = value
+
+    def spread(self):
+        return max(self.counts) - min(self.counts) if self.counts else 0
+
+
+class HeuristicScheduler:
+    def __init__(self, nurses, days, required_nurses, compiled_requests, target_off_days=8,
+                 previous_schedule=None, hint_schedule=None, stability_penalty=0, seed=0):
+        self.config = Config
+        self.nurses = nurses
+        self.days = days
+        self.num_nurses = len(nurses)
+        self.num_days = len(days)
+        self.required = {s: int(required_nurses.get(str(s), 0)) for s in Config.SHIFTS}
+        self.target_off_days = target_off_days
+        self.stability_penalty = stability_penalty
+        self.rng = random.Random(seed)
+
+        previous_schedule = previous_schedule or {}
+        last_day_shifts = previous_schedule.get('lastDayShifts', {})
+        prev_consecutive = previous_schedule.get('consecutiveShifts', {})
+        self.prev_consecutive = [prev_consecutive.get(nurse['id'], 0) for nurse in nurses]
+        self.prev_afternoon = [Config.SHIFT_AFTERNOON in last_day_shifts.get(nurse['id'], []) for nurse in nurses]
+        self.prev_na_double = [Config.SHIFT_AFTERNOON in last_day_shifts.get(nurse['id'], [])
+                               and Config.SHIFT_NIGHT in last_day_shifts.get(nurse['id'], []) for nurse in nurses]
+        recent_shifts = previous_schedule.get('recentShifts', {})
+        self.prev_off_run = []
+        self.prev_same_runs = []
+        for nurse in nurses:
+            recent = [set(day_shifts) for day_shifts in recent_shifts.get(nurse['id']) or []]
+            self.prev_off_run.append(_trailing_run(recent, lambda day_shifts: not day_shifts))
+            self.prev_same_runs.append([_trailing_run(recent, lambda day_shifts, s=s: s in day_shifts)
+                                        for s in Config.SHIFTS])
+
+        self.absent = [set(compiled_requests.absent.get(n, [])) for n in range(self.num_nurses)]
+        self.hard_off = [set(compiled_requests.hard_off.get(n, [])) | self.absent[n] for n in range(self.num_nurses)]
+        self.unfair = {n for n in range(self.num_nurses) if self.absent[n]}
+        self.soft = [compiled_requests.soft.get(n, []) for n in range(self.num_nurses)]
+        self.cell_penalty = [collections.defaultdict(int) for _ in range(self.num_nurses)]
+        for n, requests in enumerate(self.soft):
+            for req in requests:
+                if req['type'] == 'no_specific_days':
+                    for d in req['days']:
+                        for s in Config.SHIFTS:
+                            self.cell_penalty[n][(d, s)] += req['weight']
+                elif req['type'] == 'request_specific_shifts':
+                    for d, s in req['cells']:
+                        self.cell_penalty[n][(d, s)] -= req['weight']
+                elif 'shiftType' in req:
+                    for d in range(self.num_days):
+                        self.cell_penalty[n][(d, req['shiftType'])] += req['weight']
+
+        self.hint = None
+        if hint_schedule:
+            hint_shifts = hint_schedule.get('shifts', {})
+            self.hint = []
+            for nurse in nurses:
+                nurse_hints = hint_shifts.get(nurse['id']) or {}
+                row = []
+                for day in days:
+                    day_hint = nurse_hints.get(day.isoformat())
+                    row.append(None if day_hint is None else sum(SHIFT_BITS.get(int(s), 0) for s in set(day_hint)))
+                self.hint.append(row)
+
+    def row_stats(self, n, codes):
+        cfg = self.config
+        hard = 0
+        soft = 0
+        off = 0
+        shifts = 0
+        by_type = [0, 0, 0]
+        hard_off = self.hard_off[n]
+        absent = self.absent[n]
+
+        work_run = self.prev_consecutive[n]
+        off_run = self.prev_off_run[n]
+        same_runs = list(self.prev_same_runs[n])
+        previous = A_BIT if self.prev_afternoon[n] else 0
+        for d, code in enumerate(codes):
+            if code & M_BIT and code & NA_DOUBLE:
+                hard += 1
+            if previous & A_BIT and code & N_BIT:
+                hard += 1
+            if code:
+                if d in hard_off:
+                    hard += 1
+                count = POPCOUNT[code]
+                shifts += count
+                work_run += count
+                if work_run > cfg.MAX_CONSECUTIVE_SHIFTS:
+                    hard += 1
+                off_run = 0
+                if code == NA_DOUBLE:
+                    soft += cfg.PENALTY_PER_NA_DOUBLE
+            else:
+                off += 1
+                work_run = 0
+                off_run = 0 if d in absent else off_run + 1
+                if cfg.MAX_CONSECUTIVE_OFF_DAYS > 0 and off_run > cfg.MAX_CONSECUTIVE_OFF_DAYS:
+                    hard += 1
+            for i in range(3):
+                if code & (1 << i):
+                    by_type[i] += 1
+                    same_runs[i] += 1
+                    if cfg.MAX_CONSECUTIVE_SAME_SHIFT > 0 and same_runs[i] > cfg.MAX_CONSECUTIVE_SAME_SHIFT:
+                        hard += 1
+                else:
+                    same_runs[i] = 0
+            previous = code
+
+        if self.prev_na_double[n] and codes and codes[0] & M_BIT:
+            soft += cfg.PENALTY_NIGHT_TO_MORNING_TRANSITION
+
+        soft += self._request_cost(n, codes, by_type)
+
+        if self.target_off_days >= 0 and off < self.target_off_days and n not in self.unfair:
+            soft += cfg.PENALTY_OFF_DAY_UNDER_TARGET * (self.target_off_days - off)
+
+        soft += self._change_cost(n, codes)
+
+        return RowStats(hard, soft, off, shifts, by_type)
+
+    def _request_cost(self, n, codes, by_type):
+        cost = 0
+        for req in self.soft[n]:
+            weight = req['weight']
+            if req['type'] == 'no_specific_days':
+                cost += weight * sum(1 for d in req['days'] if codes[d])
+            elif req['type'] == 'request_specific_shifts':
+                cost += weight * sum(1 for d, s in req['cells'] if not codes[d] & SHIFT_BITS[s])
+            elif 'shiftType' in req:
+                cost += weight * by_type[req['shiftType'] - 1]
+            elif req['type'] == 'no_night_afternoon_double':
+                cost += weight * sum(1 for code in codes if code == NA_DOUBLE)
+        return cost
+
+    def _change_cost(self, n, codes):
+        if self.hint is None or self.stability_penalty <= 0:
+            return 0
+        return self.stability_penalty * sum(POPCOUNT[code ^ hinted] for code, hinted in zip(codes, self.hint[n])
+                                            if hinted is not None)
+
+    def breakdown(self, rows):
+        cfg = self.config
+        row_stats = [self.row_stats(n, rows[n]) for n in range(self.num_nurses)]
+        terms = collections.OrderedDict((key, 0) for key in (
+            'softRequests', 'offDayUnderTarget', 'offDayImbalance', 'totalShiftImbalance',
+            'shiftTypeImbalance', 'naDoubles', 'nightToMorning', 'scheduleChanges'))
+        for n, (codes, stats) in enumerate(zip(rows, row_stats)):
+            terms['softRequests'] += self._request_cost(n, codes, stats.by_type)
+            if self.target_off_days >= 0 and stats.off < self.target_off_days and n not in self.unfair:
+                terms['offDayUnderTarget'] += cfg.PENALTY_OFF_DAY_UNDER_TARGET * (self.target_off_days - stats.off)
+            terms['naDoubles'] += cfg.PENALTY_PER_NA_DOUBLE * sum(1 for code in codes if code == NA_DOUBLE)
+            if self.prev_na_double[n] and codes and codes[0] & M_BIT:
+                terms['nightToMorning'] += cfg.PENALTY_NIGHT_TO_MORNING_TRANSITION
+            terms['scheduleChanges'] += self._change_cost(n, codes)
+        if self.num_nurses > 1:
+            off_tracker, shift_tracker, type_trackers = self._trackers(row_stats)
+            terms['offDayImbalance'] = cfg.PENALTY_OFF_DAY_IMBALANCE * off_tracker.spread()
+            terms['totalShiftImbalance'] = cfg.PENALTY_TOTAL_SHIFT_IMBALANCE * shift_tracker.spread()
+            terms['shiftTypeImbalance'] = cfg.PENALTY_SHIFT_TYPE_IMBALANCE * sum(tracker.spread()
+                                                                                 for tracker in type_trackers)
+        terms['total'] = sum(terms.values())
+        terms['hardViolations'] = sum(stats.hard for stats in row_stats)
+        return terms
+
+    def _cell_score(self, n, d, s, code):
+        cfg = self.config
+        _, off_run, _, totals = self._state
+        score = totals[n] * 4 + self.cell_penalty[n].get((d, s), 0)
+        if code:
+            score += cfg.PENALTY_PER_NA_DOUBLE + 20
+        if off_run[n] >= cfg.MAX_CONSECUTIVE_OFF_DAYS > 0 and not code:
+            score -= 1000
+        if self.hint is not None and self.hint[n][d] is not None:
+            score -= (self.stability_penalty + 5) * (1 if self.hint[n][d] & SHIFT_BITS[s] else -1)
+        return score + self.rng.random()
+
+    def _eligible(self, n, d, s, code, rows, strict):
+        cfg = self.config
+        bit = SHIFT_BITS[s]
+        if code & bit or d in self.hard_off[n]:
+            return False
+        if s == Config.SHIFT_MORNING and code:
+            return False
+        if code & M_BIT:
+            return False
+        if not strict:
+            return True
+        previous = rows[n][d - 1] if d > 0 else (A_BIT if self.prev_afternoon[n] else 0)
+        if s == Config.SHIFT_NIGHT and previous & A_BIT:
+            return False
+        work_run, _, same_runs, _ = self._state
+        if work_run[n] + POPCOUNT[code | bit] > cfg.MAX_CONSECUTIVE_SHIFTS:
+            return False
+        if cfg.MAX_CONSECUTIVE_SAME_SHIFT > 0 and same_runs[n][s - 1] >= cfg.MAX_CONSECUTIVE_SAME_SHIFT:
+            return False
+        return True
+
+    def construct(self):
+        rows = [[0] * self.num_days for _ in range(self.num_nurses)]
+        work_run = list(self.prev_consecutive)
+        off_run = list(self.prev_off_run)
+        same_runs = [list(runs) for runs in self.prev_same_runs]
+        totals = [0] * self.num_nurses
+        self._state = (work_run, off_run, same_runs, totals)
+
+        for d in range(self.num_days):
+            for s in FILL_ORDER:
+                needed = self.required[s]
+                for strict in (True, False):
+                    if not needed:
+                        break
+                    candidates = [n for n in range(self.num_nurses)
+                                  if self._eligible(n, d, s, rows[n][d], rows, strict)]
+                    candidates.sort(key=lambda n: self._cell_score(n, d, s, rows[n][d]))
+                    for n in candidates[:needed]:
+                        rows[n][d] |= SHIFT_BITS[s]
+                        needed -= 1
+                if needed:
+                    busy = sorted((n for n in range(self.num_nurses)
+                                   if not rows[n][d] & SHIFT_BITS[s] and d not in self.hard_off[n]),
+                                  key=lambda n: (POPCOUNT[rows[n][d]], totals[n]))
+                    for n in busy[:needed]:
+                        rows[n][d] |= SHIFT_BITS[s]
+
+            for n in range(self.num_nurses):
+                code = rows[n][d]
+                totals[n] += POPCOUNT[code]
+                if code:
+                    work_run[n] += POPCOUNT[code]
+                    off_run[n] = 0
+                else:
+                    work_run[n] = 0
+                    off_run[n] = 0 if d in self.absent[n] else off_run[n] + 1
+                for i in range(3):
+                    same_runs[n][i] = same_runs[n][i] + 1 if code & (1 << i) else 0
+        return rows
+
+    def _global_cost(self, trackers):
+        cfg = self.config
+        if self.num_nurses <= 1:
+            return 0
+        off_tracker, shift_tracker, type_trackers = trackers
+        cost = cfg.PENALTY_OFF_DAY_IMBALANCE * off_tracker.spread()
+        cost += cfg.PENALTY_TOTAL_SHIFT_IMBALANCE * shift_tracker.spread()
+        cost += cfg.PENALTY_SHIFT_TYPE_IMBALANCE * sum(tracker.spread() for tracker in type_trackers)
+        return cost
+
+    def _apply_row(self, n, stats, trackers):
+        off_tracker, shift_tracker, type_trackers = trackers
+        off_tracker.set(n, stats.off)
+        shift_tracker.set(n, stats.shifts)
+        for i, tracker in enumerate(type_trackers):
+            tracker.set(n, stats.by_type[i])
+
+    def _trackers(self, row_stats):
+        return (RangeTracker((stats.off for stats in row_stats), self.unfair),
+                RangeTracker((stats.shifts for stats in row_stats), self.unfair),
+                [RangeTracker((stats.by_type[i] for stats in row_stats), self.unfair) for i in range(3)])
+
+    def evaluate(self, rows):
+        row_stats = [self.row_stats(n, rows[n]) for n in range(self.num_nurses)]
+        return self.objective(row_stats, self._trackers(row_stats))
+
+    def objective(self, row_stats, trackers):
+        hard = sum(stats.hard for stats in row_stats)
+        soft = sum(stats.soft for stats in row_stats) + self._global_cost(trackers)
+        return hard, soft
+
+    def _propose(self, rows, hard_nurses):
+        d = self.rng.randrange(self.num_days)
+        if hard_nurses and self.rng.random() < 0.5:
+            i = self.rng.choice(hard_nurses)
+        else:
+            i = self.rng.randrange(self.num_nurses)
+        j = self.rng.randrange(self.num_nurses - 1)
+        if j >= i:
+            j += 1
+        code_i, code_j = rows[i][d], rows[j][d]
+        if code_i == code_j:
+            return None
+        if self.rng.random() < 0.5 and code_i:
+            bits = [bit for bit in SHIFT_BITS.values() if code_i & bit and not code_j & bit]
+            if bits:
+                bit = self.rng.choice(bits)
+                new_i, new_j = code_i & ~bit, code_j | bit
+                if new_j in VALID_CODES:
+                    return d, i, j, new_i, new_j
+        return d, i, j, code_j, code_i
+
+    def search(self, rows, time_limit):
+        row_stats = [self.row_stats(n, rows[n]) for n in range(self.num_nurses)]
+        trackers = self._trackers(row_stats)
+        hard, soft = self.objective(row_stats, trackers)
+        hard_weight = self.config.HEURISTIC_HARD_PENALTY
+        current = hard * hard_weight + soft
+        best_cost, best_rows, best_hard = current, [list(row) for row in rows], hard
+
+        started = time.perf_counter()
+        moves = accepted = 0
+        temperature_start = self.config.HEURISTIC_START_TEMPERATURE
+        while self.num_nurses > 1:
+            elapsed = time.perf_counter() - started
+            if elapsed >= time_limit:
+                break
+            temperature = temperature_start * (1 - elapsed / time_limit) + 0.01
+            hard_nurses = [n for n, stats in enumerate(row_stats) if stats.hard]
+            for _ in range(200):
+                move = self._propose(rows, hard_nurses)
+                if move is None:
+                    continue
+                moves += 1
+                d, i, j, new_i, new_j = move
+                old_i, old_j = rows[i][d], rows[j][d]
+                old_stats_i, old_stats_j = row_stats[i], row_stats[j]
+                rows[i][d], rows[j][d] = new_i, new_j
+                stats_i, stats_j = self.row_stats(i, rows[i]), self.row_stats(j, rows[j])
+                old_global = self._global_cost(trackers)
+                self._apply_row(i, stats_i, trackers)
+                self._apply_row(j, stats_j, trackers)
+                delta_hard = stats_i.hard + stats_j.hard - old_stats_i.hard - old_stats_j.hard
+                delta = (delta_hard * hard_weight + stats_i.soft + stats_j.soft - old_stats_i.soft - old_stats_j.soft
+                         + self._global_cost(trackers) - old_global)
+                if delta <= 0 or self.rng.random() < math.exp(-delta / temperature):
+                    accepted += 1
+                    row_stats[i], row_stats[j] = stats_i, stats_j
+                    current += delta
+                    hard += delta_hard
+                    if current < best_cost:
+                        best_cost, best_rows, best_hard = current, [list(row) for row in rows], hard
+                else:
+                    rows[i][d], rows[j][d] = old_i, old_j
+                    self._apply_row(i, old_stats_i, trackers)
+                    self._apply_row(j, old_stats_j, trackers)
+
+        return best_rows, {
+            'hardViolations': best_hard,
+            'objective': best_cost - best_hard * hard_weight,
+            'moves': moves,
+            'accepted': accepted
+        }
+
+    def solve(self, time_limit):
+        started = time.perf_counter()
+        rows = self.construct()
+        construct_seconds = time.perf_counter() - started
+        rows, info = self.search(rows, max(time_limit - construct_seconds, 0))
+        info['constructSeconds'] = construct_seconds
+        info['searchSeconds'] = time.perf_counter() - started - construct_seconds
+        return rows, info
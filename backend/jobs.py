@@ -0,0 +1,316 @@
+import collections
+import multiprocessing
+import queue
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import metrics
+from cache import cache_hit_diagnostics, make_cache_key
+from config import Config
+from solver import ScheduleSolver
+from worker_budget import payload_cells
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+
+FINISHED_STATES = (JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED)
+
+
+class QueueFullError(Exception):
+    pass
+
+
+def run_solve_job(data, stop_event, progress_queue, num_workers):
+    started_at = time.time()
+    try:
+        solver = ScheduleSolver(stop_event=stop_event, progress_queue=progress_queue, num_workers=num_workers)
+        result = solver.solve_schedule(data)
+    except Exception as e:
+        print(traceback.format_exc())
+        result = {'error': f'Server error: {str(e)}'}
+    return started_at, time.time(), result
+
+
+class Job:
+    def __init__(self, job_id, data, queue_depth):
+        self.id = job_id
+        self.data = data
+        self.ward_id = data.get('wardId')
+        self.status = JOB_QUEUED
+        self.queue_depth = queue_depth
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.future = None
+        self.stop_event = None
+        self.stop_requested = False
+        self.progress_queue = None
+        self.progress_events = []
+        self.latest_schedule = None
+        self.progress_lock = threading.Lock()
+        self.cache_key = None
+        self.cache_hit = False
+        self.include_diagnostics = bool(data.get('diagnostics'))
+        self.diagnostics = None
+        self.cells = payload_cells(data)
+        self.allocation = None
+        self.num_workers = None
+
+    @property
+    def wait_seconds(self):
+        if self.started_at is not None:
+            return self.started_at - self.submitted_at
+        if self.status == JOB_QUEUED:
+            return time.time() - self.submitted_at
+        return None
+
+    @property
+    def run_seconds(self):
+        if self.started_at is None:
+            return None
+        end = self.finished_at if self.finished_at is not None else time.time()
+        return end - self.started_at
+
+    def to_dict(self):
+        info = {
+            'jobId': self.id,
+            'wardId': self.ward_id,
+            'status': self.status,
+            'queueDepthAtSubmit': self.queue_depth,
+            'submittedAt': self.submitted_at,
+            'startedAt': self.started_at,
+            'finishedAt': self.finished_at,
+            'waitSeconds': self.wait_seconds,
+            'runSeconds': self.run_seconds,
+            'cacheHit': self.cache_hit,
+            'numWorkers': self.num_workers
+        }
+        if self.stop_requested:
+            info['stopRequested'] = True
+        if self.progress_events:
+            info['latestIncumbent'] = dict(self.progress_events[-1])
+        if self.error:
+            info['error'] = self.error
+        return info
+
+
+class JobManager:
+    def __init__(self, max_workers=None, queue_size=None, history_size=None, cache=None, core_budget=None):
+        self.max_workers = max_workers or Config.JOB_MAX_WORKERS
+        self.queue_size = queue_size if queue_size is not None else Config.JOB_QUEUE_SIZE
+        self.history_size = history_size or Config.JOB_HISTORY_SIZE
+        self.cache = cache
+        self.core_budget = core_budget
+        self._lock = threading.Lock()
+        self._jobs = collections.OrderedDict()
+        self._pending = collections.deque()
+        self._running = 0
+        self._executor = None
+        self._manager = None
+        if core_budget is not None:
+            core_budget.add_release_listener(self._on_budget_release)
+
+    def _ensure_pool(self):
+        if self._executor is not None and getattr(self._executor, '_broken', False):
+            self._discard_pool(self._executor)
+        context = multiprocessing.get_context('spawn')
+        if self._manager is None:
+            self._manager = context.Manager()
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+
+    def _discard_pool(self, executor):
+        if executor is not None and executor is self._executor:
+            self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, data):
+        cache_key = make_cache_key(data) if self.cache is not None else None
+        cached, cache_age = self.cache.lookup(cache_key) if cache_key else (None, None)
+        if cache_key:
+            metrics.cache_lookups_total.inc(ward=data.get('wardId'), result='hit' if cached is not None else 'miss')
+        
+        with self._lock:
+            if cached is not None:
+                job = Job(uuid.uuid4().hex, data, 0)
+                job.status = JOB_COMPLETED
+                job.started_at = job.finished_at = job.submitted_at
+                job.result = cached
+                job.cache_hit = True
+                if job.include_diagnostics:
+                    job.diagnostics = cached['diagnostics'] = cache_hit_diagnostics(cache_key, cache_age)
+                job.data = None
+                self._jobs[job.id] = job
+                self._trim_history()
+                return job
+            
+            if len(self._pending) >= self.queue_size:
+                raise QueueFullError(f'Job queue is full ({self.queue_size} waiting)')
+            self._ensure_pool()
+            job = Job(uuid.uuid4().hex, data, len(self._pending))
+            job.stop_event = self._manager.Event()
+            job.progress_queue = self._manager.Queue()
+            job.cache_key = cache_key
+            self._jobs[job.id] = job
+            self._pending.append(job)
+            started, releases = self._dispatch()
+            self._trim_history()
+        self._after_dispatch(started, releases)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATES:
+                return job
+            if job.status == JOB_QUEUED:
+                self._pending.remove(job)
+                job.finished_at = time.time()
+            job.status = JOB_CANCELLED
+            job.stop_event.set()
+            return job
+
+    def stop(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != JOB_RUNNING:
+                return job
+            job.stop_requested = True
+            job.stop_event.set()
+            return job
+
+    def drain_progress(self, job):
+        with job.progress_lock:
+            while job.progress_queue is not None:
+                try:
+                    event = job.progress_queue.get_nowait()
+                except (queue.Empty, OSError, EOFError):
+                    break
+                job.latest_schedule = event.pop('schedule', None)
+                job.progress_events.append(event)
+            return list(job.progress_events), job.latest_schedule
+
+    def stats(self):
+        with self._lock:
+            counts = collections.Counter(job.status for job in self._jobs.values())
+            return {
+                'maxWorkers': self.max_workers,
+                'queueSize': self.queue_size,
+                'queued': len(self._pending),
+                'running': self._running,
+                'byStatus': dict(counts)
+            }
+
+    def _dispatch(self):
+        started = []
+        releases = []
+        while self._pending and self._running < self.max_workers:
+            job = self._pending[0]
+            if self.core_budget is not None:
+                job.allocation = self.core_budget.try_acquire(job.cells, job.id)
+                if job.allocation is None:
+                    break
+                job.num_workers = job.allocation.workers
+            self._pending.popleft()
+            job.status = JOB_RUNNING
+            job.started_at = time.time()
+            self._running += 1
+            executor = None
+            try:
+                self._ensure_pool()
+                executor = self._executor
+                job.future = executor.submit(run_solve_job, job.data, job.stop_event, job.progress_queue,
+                                             job.num_workers)
+            except Exception as e:
+                print(traceback.format_exc())
+                self._running -= 1
+                job.status = JOB_FAILED
+                job.error = f'Could not start solver: {str(e)}'
+                job.result = {'error': job.error}
+                job.finished_at = time.time()
+                job.data = None
+                if job.allocation is not None:
+                    releases.append(job.allocation)
+                    job.allocation = None
+                if isinstance(e, RuntimeError):
+                    self._discard_pool(executor)
+                continue
+            started.append(job)
+        return started, releases
+
+    def _after_dispatch(self, started, releases):
+        for job in started:
+            job.future.add_done_callback(lambda future, job=job: self._on_done(job, future))
+        for allocation in releases:
+            self.core_budget.release(allocation)
+
+    def _on_budget_release(self):
+        with self._lock:
+            if self._manager is None:
+                return
+            started, releases = self._dispatch()
+        self._after_dispatch(started, releases)
+
+    def _on_done(self, job, future):
+        started, releases = [], []
+        with self._lock:
+            self._running -= 1
+            job.finished_at = time.time()
+            try:
+                started_at, finished_at, result = future.result()
+                job.started_at = started_at
+                job.finished_at = finished_at
+            except BrokenProcessPool as e:
+                result = {'error': f'Solver process died: {str(e)}'}
+            except Exception as e:
+                result = {'error': f'Server error: {str(e)}'}
+
+            job.diagnostics = result.pop('diagnostics', None)
+            if job.diagnostics:
+                metrics.observe_solve(job.ward_id, job.diagnostics)
+
+            if job.status != JOB_CANCELLED:
+                if 'error' in result:
+                    job.status = JOB_FAILED
+                    job.error = result['error']
+                    job.result = result
+                else:
+                    job.status = JOB_COMPLETED
+                    job.result = result
+                    if job.cache_key and not job.stop_requested:
+                        self.cache.put(job.cache_key, result)
+                    if job.diagnostics and job.include_diagnostics:
+                        result['diagnostics'] = dict(job.diagnostics, cacheHit=False)
+            job.data = None
+            allocation, job.allocation = job.allocation, None
+            if allocation is None:
+                started, releases = self._dispatch()
+
+        self._after_dispatch(started, releases)
+        if allocation is not None:
+            self.core_budget.release(allocation)
+
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATES]
+        excess = len(self._jobs) - self.history_size
+        for job_id in finished[:max(excess, 0)]:
+            del self._jobs[job_id]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._manager is not None:
+            self._manager.shutdown()
@@ -0,0 +1,156 @@
+import collections
+import threading
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = collections.defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] += amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, _format_labels(self.labelnames, key), value) for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            series = self._series.setdefault(key, {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, series in self._series.items():
+                for bound, count in zip(self.buckets, series['buckets']):
+                    samples.append((f'{self.name}_bucket', _format_labels(self.labelnames, key, ('le', bound)), count))
+                samples.append((f'{self.name}_bucket', _format_labels(self.labelnames, key, ('le', '+Inf')), series['count']))
+                samples.append((f'{self.name}_sum', _format_labels(self.labelnames, key), series['sum']))
+                samples.append((f'{self.name}_count', _format_labels(self.labelnames, key), series['count']))
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = collections.OrderedDict()
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+solves_total = registry.counter(
+    'schedule_solves_total', 'Schedule solves by ward and CP-SAT status', ('ward', 'status'))
+solve_phase_seconds = registry.histogram(
+    'schedule_solve_phase_seconds', 'Time spent per solve phase', ('ward', 'phase'))
+model_build_seconds = registry.histogram(
+    'schedule_model_build_seconds', 'Time to compile requests and build the CP-SAT model', ('ward',))
+first_solution_seconds = registry.histogram(
+    'schedule_first_solution_seconds', 'CP-SAT wall time until the first feasible solution', ('ward',))
+solver_branches_total = registry.counter(
+    'schedule_solver_branches_total', 'CP-SAT search branches', ('ward',))
+solver_conflicts_total = registry.counter(
+    'schedule_solver_conflicts_total', 'CP-SAT search conflicts', ('ward',))
+solver_deterministic_seconds_total = registry.counter(
+    'schedule_solver_deterministic_seconds_total', 'CP-SAT deterministic time', ('ward',))
+objective_gap = registry.histogram(
+    'schedule_objective_gap', 'Relative gap between objective and bound at the end of a solve', ('ward',),
+    buckets=(0, 0.01, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1))
+http_phase_seconds = registry.histogram(
+    'schedule_http_phase_seconds', 'Time spent parsing requests and serializing responses', ('endpoint', 'phase'))
+cache_lookups_total = registry.counter(
+    'schedule_cache_lookups_total', 'Schedule cache lookups by result', ('ward', 'result'))
+http_response_bytes = registry.histogram(
+    'schedule_http_response_bytes', 'Response body size after encoding', ('endpoint', 'format', 'encoding'),
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304))
+schedule_save_seconds = registry.histogram(
+    'schedule_save_seconds', 'Time to write a schedule and its carry-over flags', ('ward',))
+schedule_save_batches = registry.histogram(
+    'schedule_save_batches', 'Batched writes committed per schedule save', ('ward',), buckets=(1, 2, 3, 5, 10))
+jobs_in_state = registry.gauge(
+    'schedule_jobs', 'Solve jobs currently queued or running', ('state',))
+solver_cores = registry.gauge(
+    'schedule_solver_cores', 'CP-SAT worker threads allocated from the core budget', ('state',))
+
+
+def observe_solve(ward_id, diagnostics):
+    solver_stats = diagnostics.get('solver', {})
+    solves_total.inc(ward=ward_id, status=diagnostics.get('status'))
+    for phase, stats in diagnostics.get('phases', {}).items():
+        solve_phase_seconds.observe(stats['seconds'], ward=ward_id, phase=phase)
+    model_build_seconds.observe(diagnostics.get('modelBuildSeconds', 0), ward=ward_id)
+    if solver_stats.get('firstSolutionSeconds') is not None:
+        first_solution_seconds.observe(solver_stats['firstSolutionSeconds'], ward=ward_id)
+    solver_branches_total.inc(solver_stats.get('numBranches', 0), ward=ward_id)
+    solver_conflicts_total.inc(solver_stats.get('numConflicts', 0), ward=ward_id)
+    solver_deterministic_seconds_total.inc(solver_stats.get('deterministicTime', 0), ward=ward_id)
+    if solver_stats.get('solutionsFound'):
+        objective = solver_stats.get('objectiveValue', 0)
+        bound = solver_stats.get('bestObjectiveBound', 0)
+        objective_gap.observe(abs(objective - bound) / max(1.0, abs(objective)), ward=ward_id)
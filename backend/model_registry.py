@@ -0,0 +1,112 @@
+import collections
+import contextlib
+import time
+
+from config import Config
+
+
+class AuxVarRegistry:
+    def __init__(self, model, shifts, is_off, num_shifts_on_day, num_days):
+        self.model = model
+        self.shifts = shifts
+        self.is_off = is_off
+        self.num_shifts_on_day = num_shifts_on_day
+        self.num_days = num_days
+        self._vars = {}
+        self.created = collections.Counter()
+        self.reused = collections.Counter()
+
+    def _memo(self, category, key, build):
+        full_key = (category,) + key
+        if full_key in self._vars:
+            self.reused[category] += 1
+            return self._vars[full_key]
+        var = build()
+        self._vars[full_key] = var
+        self.created[category] += 1
+        return var
+
+    def day_off(self, n, d):
+        return self.is_off[(n, d)]
+
+    def is_working(self, n, d):
+        return self.is_off[(n, d)].Not()
+
+    def na_double(self, n, d):
+        def build():
+            night = self.shifts[(n, d, Config.SHIFT_NIGHT)]
+            afternoon = self.shifts[(n, d, Config.SHIFT_AFTERNOON)]
+            na = self.model.NewBoolVar(f'na_double_n{n}_d{d}')
+            self.model.AddImplication(na, night)
+            self.model.AddImplication(na, afternoon)
+            self.model.AddBoolOr([night.Not(), afternoon.Not(), na])
+            return na
+        return self._memo('na_double', (n, d), build)
+
+    def total_off(self, n):
+        def build():
+            var = self.model.NewIntVar(0, self.num_days, f'total_off_n{n}')
+            self.model.Add(var == sum(self.is_off[(n, d)] for d in range(self.num_days)))
+            return var
+        return self._memo('total_off', (n,), build)
+
+    def total_shifts(self, n):
+        def build():
+            var = self.model.NewIntVar(0, self.num_days * 2, f'total_shifts_n{n}')
+            self.model.Add(var == sum(self.num_shifts_on_day[n, d] for d in range(self.num_days)))
+            return var
+        return self._memo('total_shifts', (n,), build)
+
+    def total_shift_type(self, n, s):
+        def build():
+            var = self.model.NewIntVar(0, self.num_days, f'total_s{s}_n{n}')
+            self.model.Add(var == sum(self.shifts[(n, d, s)] for d in range(self.num_days)))
+            return var
+        return self._memo('total_shift_type', (n, s), build)
+
+    def report(self):
+        return {
+            'created': dict(self.created),
+            'reused': dict(self.reused)
+        }
+
+
+class ModelStatsRecorder:
+    def __init__(self, model):
+        self.model = model
+        self.phases = collections.OrderedDict()
+
+    def _counts(self):
+        proto = self.model.Proto()
+        return len(proto.variables), len(proto.constraints)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        variables_before, constraints_before = self._counts()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            variables_after, constraints_after = self._counts()
+            self.phases[name] = {
+                'seconds': seconds,
+                'variables': variables_after - variables_before,
+                'constraints': constraints_after - constraints_before
+            }
+
+    def phase_seconds(self, *names):
+        return sum(self.phases[name]['seconds'] for name in names if name in self.phases)
+
+    def report(self, registry=None):
+        proto = self.model.Proto()
+        by_type = collections.Counter(constraint.WhichOneof('constraint') for constraint in proto.constraints)
+        stats = {
+            'variables': len(proto.variables),
+            'constraints': len(proto.constraints),
+            'constraintsByType': dict(by_type),
+            'phases': dict(self.phases)
+        }
+        if registry is not None:
+            stats['auxVars'] = registry.report()
+        return stats
@@ -0,0 +1,90 @@
+import datetime
+
+from config import Config
+from decomposition import boundary_state
+from request_compiler import trim_monthly_requests
+from schedule_matrix import ScheduleMatrix
+from wire_format import decode_compact
+
+
+def _sorted_shifts(shifts):
+    return sorted(int(s) for s in shifts or [])
+
+
+def clip_absences(absences, first_date):
+    clipped = []
+    for absence in absences or []:
+        if absence.get('endDate') and absence['endDate'] < first_date:
+            continue
+        clipped.append(dict(absence, startDate=max(absence.get('startDate') or first_date, first_date)))
+    return clipped
+
+
+class ScheduleRepairer:
+    def __init__(self, solver):
+        self.solver = solver
+        self.config = Config
+
+    def repair(self, data):
+        published = decode_compact(data.get('publishedSchedule') or {}).get('shifts') or {}
+        start_date = datetime.date.fromisoformat(data['startDate'])
+        end_date = datetime.date.fromisoformat(data['endDate'])
+        try:
+            change_date = datetime.date.fromisoformat(data['changeDate'])
+        except (TypeError, ValueError):
+            return {'error': f"รูปแบบวันที่เปลี่ยนแปลงไม่ถูกต้อง: {data['changeDate']}"}
+        if not start_date <= change_date <= end_date:
+            return {'error': f"วันที่เปลี่ยนแปลง {data['changeDate']} อยู่นอกช่วงตาราง"}
+
+        nurse_ids = [nurse['id'] for nurse in data['nurses']]
+        days = [start_date + datetime.timedelta(days=d) for d in range((end_date - start_date).days + 1)]
+        frozen = [day.isoformat() for day in days if day < change_date]
+        remaining = [day for day in days if day >= change_date]
+        remaining_dates = {day.isoformat() for day in remaining}
+        target_off_days = data.get('targetOffDays', 8)
+        absences = clip_absences(data.get('absences'), change_date.isoformat())
+
+        hint_shifts = {nurse_id: {date: shifts for date, shifts in (published.get(nurse_id) or {}).items()
+                                  if date in remaining_dates}
+                       for nurse_id in nurse_ids if published.get(nurse_id)}
+        result = self.solver.solve_schedule(dict(
+            data,
+            startDate=change_date.isoformat(),
+            endDate=end_date.isoformat(),
+            previousSchedule=boundary_state(published, nurse_ids, frozen, data.get('previousSchedule')),
+            hardRequests=[req for req in data.get('hardRequests') or [] if req.get('date') in remaining_dates],
+            absences=absences,
+            monthlyRequests=trim_monthly_requests(data.get('monthlyRequests'), {day.day for day in remaining}),
+            targetOffDays=round(target_off_days * len(remaining) / len(days)) if target_off_days >= 0 else target_off_days,
+            hintSchedule={'shifts': hint_shifts},
+            stabilityPenalty=data.get('stabilityPenalty', self.config.REPAIR_CHANGE_PENALTY),
+            solverTimeLimit=data.get('solverTimeLimit', self.config.REPAIR_TIME_LIMIT)
+        ))
+        if 'error' in result:
+            return result
+
+        merged = {nurse_id: dict({date: list((published.get(nurse_id) or {}).get(date) or []) for date in frozen},
+                                 **result['shifts'].get(nurse_id, {}))
+                  for nurse_id in nurse_ids}
+        matrix = ScheduleMatrix.from_shift_dict(merged, nurse_ids, days)
+        changes = []
+        for nurse_id, nurse_shifts in hint_shifts.items():
+            for date, before in sorted(nurse_shifts.items()):
+                before, after = _sorted_shifts(before), _sorted_shifts(merged[nurse_id].get(date))
+                if before != after:
+                    changes.append({'nurseId': nurse_id, 'date': date, 'before': before, 'after': after})
+
+        result.update({
+            'month': days[0].strftime('%Y-%m'),
+            'shifts': matrix.to_shift_dict(),
+            'statistics': matrix.nurse_statistics(),
+            'repair': {
+                'changeDate': change_date.isoformat(),
+                'frozenDays': len(frozen),
+                'repairedDays': len(remaining),
+                'absences': absences,
+                'changedCells': len(changes),
+                'changes': changes
+            }
+        })
+        return result
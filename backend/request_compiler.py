@@ -0,0 +1,178 @@
+import collections
+import datetime
+
+from config import Config
+
+SHIFT_AVOIDANCE_TYPES = {
+    'no_morning_shifts': Config.SHIFT_MORNING,
+    'no_afternoon_shifts': Config.SHIFT_AFTERNOON,
+    'no_night_shifts': Config.SHIFT_NIGHT
+}
+DAY_VALUE_REQUEST_TYPES = ('no_specific_days', 'request_specific_shifts')
+
+
+class CompiledRequests:
+    def __init__(self, days):
+        self.date_index = {day: d for d, day in enumerate(days)}
+        self.day_of_month_index = collections.defaultdict(list)
+        for d, day in enumerate(days):
+            self.day_of_month_index[day.day].append(d)
+        self.hard_off = collections.defaultdict(list)
+        self.absent = collections.defaultdict(list)
+        self.soft = collections.defaultdict(list)
+        self.warnings = []
+
+    def hard_off_count(self):
+        return sum(len(indices) for indices in self.hard_off.values())
+
+    def soft_count(self):
+        return sum(len(requests) for requests in self.soft.values())
+
+    def unavailable(self, n):
+        return set(self.hard_off.get(n, [])) | set(self.absent.get(n, []))
+
+
+def _soft_weight(req, nurse_id, carry_over_flags):
+    weight = Config.PENALTY_BASE_SOFT_VIOLATION
+    if req.get('is_high_priority'):
+        weight += Config.BONUS_HIGH_PRIORITY
+        if carry_over_flags.get(nurse_id):
+            weight += Config.BONUS_CARRY_OVER
+    return weight
+
+
+def _compile_soft_request(req, nurse_id, compiled):
+    req_type = req['type']
+
+    if req_type in ('no_specific_days', 'request_specific_shifts') and not isinstance(req.get('value') or [], list):
+        compiled.warnings.append(f'{nurse_id}: {req_type} value must be a list')
+        return None
+
+    if req_type == 'no_specific_days':
+        days = set()
+        for day_num in req.get('value') or []:
+            indices = compiled.day_of_month_index.get(day_num) if isinstance(day_num, int) else None
+            if not indices:
+                compiled.warnings.append(f'{nurse_id}: day {day_num} is outside the schedule')
+                continue
+            days.update(indices)
+        return {'type': req_type, 'days': sorted(days)} if days else None
+
+    if req_type == 'request_specific_shifts':
+        cells = set()
+        for shift_req in req.get('value') or []:
+            if not isinstance(shift_req, dict):
+                compiled.warnings.append(f'{nurse_id}: invalid shift request {shift_req}')
+                continue
+            day_num = shift_req.get('day')
+            shift_type = shift_req.get('shift_type')
+            if shift_type not in Config.SHIFTS:
+                compiled.warnings.append(f'{nurse_id}: invalid shift type {shift_type}')
+                continue
+            indices = compiled.day_of_month_index.get(day_num) if isinstance(day_num, int) else None
+            if not indices:
+                compiled.warnings.append(f'{nurse_id}: day {day_num} is outside the schedule')
+                continue
+            cells.update((d, shift_type) for d in indices)
+        return {'type': req_type, 'cells': sorted(cells)} if cells else None
+
+    if req_type in SHIFT_AVOIDANCE_TYPES:
+        return {'type': req_type, 'shiftType': SHIFT_AVOIDANCE_TYPES[req_type]}
+
+    if req_type == 'no_night_afternoon_double':
+        return {'type': req_type}
+
+    compiled.warnings.append(f'{nurse_id}: unknown request type {req_type}')
+    return None
+
+
+def _compile_absence(absence, nurse_id_to_index, days, compiled):
+    n = nurse_id_to_index.get(absence.get('nurseId'))
+    if n is None:
+        compiled.warnings.append(f"absence for unknown nurse {absence.get('nurseId')}")
+        return
+    try:
+        start = datetime.date.fromisoformat(absence['startDate'])
+        end = datetime.date.fromisoformat(absence['endDate']) if absence.get('endDate') else days[-1]
+    except (KeyError, TypeError, ValueError):
+        compiled.warnings.append(f"{absence['nurseId']}: invalid absence dates "
+                                 f"{absence.get('startDate')} - {absence.get('endDate')}")
+        return
+    compiled.absent[n].extend(d for d, day in enumerate(days) if start <= day <= end)
+
+
+def compile_requests(nurses, days, hard_requests, monthly_requests, carry_over_flags, absences=None):
+    compiled = CompiledRequests(days)
+    nurse_id_to_index = {nurse['id']: i for i, nurse in enumerate(nurses)}
+
+    for absence in absences or []:
+        _compile_absence(absence, nurse_id_to_index, days, compiled)
+    for n in list(compiled.absent):
+        compiled.absent[n] = sorted(set(compiled.absent[n]))
+        if not compiled.absent[n]:
+            del compiled.absent[n]
+
+    hard_seen = set()
+    for request in hard_requests or []:
+        n = nurse_id_to_index.get(request.get('nurseId'))
+        if n is None:
+            compiled.warnings.append(f"hard request for unknown nurse {request.get('nurseId')}")
+            continue
+        try:
+            d = compiled.date_index.get(datetime.date.fromisoformat(request['date']))
+        except (KeyError, TypeError, ValueError):
+            compiled.warnings.append(f"{request['nurseId']}: invalid hard request date {request.get('date')}")
+            continue
+        if d is None:
+            compiled.warnings.append(f"{request['nurseId']}: hard request date {request['date']} is outside the schedule")
+            continue
+        if (n, d) in hard_seen or d in compiled.absent.get(n, ()):
+            continue
+        hard_seen.add((n, d))
+        compiled.hard_off[n].append(d)
+
+    for n in compiled.hard_off:
+        compiled.hard_off[n].sort()
+
+    for nurse_id, requests in (monthly_requests or {}).items():
+        n = nurse_id_to_index.get(nurse_id)
+        if n is None:
+            continue
+
+        by_signature = {}
+        for req in requests:
+            if not req.get('type'):
+                continue
+            soft = _compile_soft_request(req, nurse_id, compiled)
+            if soft is None:
+                continue
+            soft['weight'] = _soft_weight(req, nurse_id, carry_over_flags or {})
+            signature = (soft['type'], tuple(soft.get('days', ())), tuple(soft.get('cells', ())), soft.get('shiftType'))
+            existing = by_signature.get(signature)
+            if existing is None or existing['weight'] < soft['weight']:
+                by_signature[signature] = soft
+
+        if by_signature:
+            compiled.soft[n] = list(by_signature.values())
+
+    return compiled
+
+
+def _request_day(value):
+    return value.get('day') if isinstance(value, dict) else value
+
+
+def trim_monthly_requests(monthly_requests, day_numbers):
+    trimmed = {}
+    for nurse_id, requests in (monthly_requests or {}).items():
+        kept = []
+        for req in requests:
+            if req.get('type') in DAY_VALUE_REQUEST_TYPES and isinstance(req.get('value'), list):
+                values = [value for value in req['value'] if _request_day(value) in day_numbers]
+                if not values:
+                    continue
+                req = dict(req, value=values)
+            kept.append(req)
+        if kept:
+            trimmed[nurse_id] = kept
+    return trimmed
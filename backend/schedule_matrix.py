@@ -0,0 +1,126 @@
+import datetime
+
+import numpy as np
+
+from config import Config
+
+SHIFT_BITS = np.array([1 << (s - 1) for s in Config.SHIFTS], dtype=np.uint8)
+SHIFT_STAT_KEYS = {
+    Config.SHIFT_MORNING: 'morning',
+    Config.SHIFT_AFTERNOON: 'afternoon',
+    Config.SHIFT_NIGHT: 'night'
+}
+CODE_SHIFTS = [[s for i, s in enumerate(Config.SHIFTS) if code & (1 << i)] for code in range(1 << len(Config.SHIFTS))]
+
+
+def shift_variable_indices(shifts, num_nurses, num_days):
+    return np.array([[[shifts[(n, d, s)].Index() for s in Config.SHIFTS] for d in range(num_days)]
+                     for n in range(num_nurses)], dtype=np.int64)
+
+
+def longest_runs(mask):
+    num_rows, num_cols = mask.shape
+    padded = np.zeros((num_rows, num_cols + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    start_rows, start_cols = np.nonzero(edges == 1)
+    _, end_cols = np.nonzero(edges == -1)
+    runs = np.zeros(num_rows, dtype=np.int64)
+    np.maximum.at(runs, start_rows, end_cols - start_cols)
+    return runs
+
+
+class ScheduleMatrix:
+    def __init__(self, nurse_ids, days, cells):
+        self.nurse_ids = list(nurse_ids)
+        self.days = list(days)
+        self.cells = np.asarray(cells, dtype=np.uint8).reshape(len(self.nurse_ids), len(self.days), len(Config.SHIFTS))
+
+    @classmethod
+    def from_response(cls, solution, variable_indices, nurses, days):
+        values = np.asarray(solution, dtype=np.int64)
+        return cls([nurse['id'] for nurse in nurses], days, values[variable_indices])
+
+    @classmethod
+    def from_solver(cls, solver, variable_indices, nurses, days):
+        return cls.from_response(solver.ResponseProto().solution, variable_indices, nurses, days)
+
+    @classmethod
+    def from_codes(cls, nurse_ids, days, codes):
+        codes = np.asarray(codes, dtype=np.uint8).reshape(len(nurse_ids), len(days))
+        return cls(nurse_ids, days, (codes[:, :, None] >> np.arange(len(Config.SHIFTS), dtype=np.uint8)) & 1)
+
+    @classmethod
+    def from_shift_dict(cls, shift_dict, nurse_ids=None, dates=None):
+        nurse_ids = list(nurse_ids if nurse_ids is not None else shift_dict)
+        if dates is None:
+            dates = sorted({date for nurse_id in nurse_ids for date in shift_dict.get(nurse_id, {})})
+        days = [date if isinstance(date, datetime.date) else datetime.date.fromisoformat(date) for date in dates]
+        date_index = {day.isoformat(): d for d, day in enumerate(days)}
+        shift_index = {s: i for i, s in enumerate(Config.SHIFTS)}
+        cells = np.zeros((len(nurse_ids), len(days), len(Config.SHIFTS)), dtype=np.uint8)
+        for n, nurse_id in enumerate(nurse_ids):
+            for date, day_shifts in (shift_dict.get(nurse_id) or {}).items():
+                d = date_index.get(date)
+                if d is None:
+                    continue
+                for s in day_shifts or []:
+                    i = shift_index.get(int(s))
+                    if i is not None:
+                        cells[n, d, i] = 1
+        return cls(nurse_ids, days, cells)
+
+    @property
+    def codes(self):
+        return (self.cells * SHIFT_BITS).sum(axis=2, dtype=np.uint8)
+
+    @property
+    def shifts_per_day(self):
+        return self.cells.sum(axis=2, dtype=np.int64)
+
+    def to_shift_dict(self):
+        dates = [day.isoformat() for day in self.days]
+        return {nurse_id: {date: list(CODE_SHIFTS[code]) for date, code in zip(dates, row)}
+                for nurse_id, row in zip(self.nurse_ids, self.codes.tolist())}
+
+    def to_rows(self):
+        return {
+            'dates': [day.isoformat() for day in self.days],
+            'rows': dict(zip(self.nurse_ids, self.codes.tolist()))
+        }
+
+    def nurse_statistics(self):
+        by_type = self.cells.sum(axis=1, dtype=np.int64)
+        per_day = self.shifts_per_day
+        totals = per_day.sum(axis=1)
+        off = (per_day == 0).sum(axis=1)
+        overtime = np.maximum(per_day - 1, 0).sum(axis=1)
+
+        columns = {SHIFT_STAT_KEYS[s]: by_type[:, i].tolist() for i, s in enumerate(Config.SHIFTS)}
+        columns.update({'total': totals.tolist(), 'off': off.tolist(), 'overtime': overtime.tolist()})
+        return {nurse_id: {key: values[n] for key, values in columns.items()}
+                for n, nurse_id in enumerate(self.nurse_ids)}
+
+    def run_statistics(self):
+        per_day = self.shifts_per_day
+        working = per_day > 0
+        longest_work = longest_runs(working)
+        longest_off = longest_runs(~working)
+        return {nurse_id: {'maxConsecutiveWorkDays': int(longest_work[n]), 'maxConsecutiveOffDays': int(longest_off[n])}
+                for n, nurse_id in enumerate(self.nurse_ids)}
+
+    def ward_statistics(self):
+        per_day = self.shifts_per_day
+        num_nurses = len(self.nurse_ids)
+        totals = per_day.sum(axis=1)
+        off = (per_day == 0).sum(axis=1)
+        coverage = self.cells.sum(axis=0, dtype=np.int64)
+        return {
+            'total_nurses': num_nurses,
+            'avg_shifts': float(totals.mean()) if num_nurses else 0,
+            'avg_off_days': float(off.mean()) if num_nurses else 0,
+            'total_overtime': int(np.maximum(per_day - 1, 0).sum()),
+            'by_shift': {SHIFT_STAT_KEYS[s]: int(coverage[:, i].sum()) for i, s in enumerate(Config.SHIFTS)},
+            'min_daily_coverage': {SHIFT_STAT_KEYS[s]: int(coverage[:, i].min()) if len(self.days) else 0
+                                   for i, s in enumerate(Config.SHIFTS)}
+        }
@@ -0,0 +1,176 @@
+import abc
+import collections
+import copy
+import datetime
+import threading
+import time
+
+from config import Config
+
+NEVER = datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+UNSTORED_FIELDS = ('diagnostics', 'modelStats', 'alternatives')
+
+
+def _created_at(doc):
+    return doc.get('createdAt') or NEVER
+
+
+def _latest(docs):
+    return max(docs, key=_created_at, default=None)
+
+
+def stored_schedule(schedule):
+    return {key: value for key, value in schedule.items() if key not in UNSTORED_FIELDS}
+
+
+def chunk_writes(writes, chunk_size):
+    chunks = [writes[i:i + chunk_size] for i in range(0, len(writes), chunk_size)] or [[]]
+    if len(chunks[-1]) == chunk_size:
+        chunks.append([])
+    return chunks
+
+
+class ScheduleRepository(abc.ABC):
+    def get(self, ward_id, month):
+        return self.get_many([(ward_id, month)]).get((ward_id, month))
+
+    @abc.abstractmethod
+    def get_many(self, keys):
+        pass
+
+    @abc.abstractmethod
+    def get_users(self, user_ids):
+        pass
+
+    @abc.abstractmethod
+    def save(self, schedule):
+        pass
+
+    @abc.abstractmethod
+    def save_with_carry_over(self, schedule, carry_over_flags):
+        pass
+
+
+class FirestoreScheduleRepository(ScheduleRepository):
+    def __init__(self, db, collection='schedules', batch_limit=None):
+        self.db = db
+        self.collection = collection
+        self.batch_limit = batch_limit or Config.FIRESTORE_BATCH_LIMIT
+        self.reads = 0
+
+    def get_many(self, keys):
+        wards_by_month = collections.defaultdict(set)
+        for ward_id, month in keys:
+            wards_by_month[month].add(ward_id)
+
+        found = collections.defaultdict(list)
+        schedules_ref = self.db.collection(self.collection)
+        for month, ward_ids in wards_by_month.items():
+            ward_ids = sorted(ward_ids)
+            for i in range(0, len(ward_ids), Config.FIRESTORE_IN_QUERY_LIMIT):
+                chunk = ward_ids[i:i + Config.FIRESTORE_IN_QUERY_LIMIT]
+                if len(chunk) == 1:
+                    query = schedules_ref.where('wardId', '==', chunk[0]).where('month', '==', month)
+                else:
+                    query = schedules_ref.where('month', '==', month).where('wardId', 'in', chunk)
+                self.reads += 1
+                for doc in query.stream():
+                    schedule = doc.to_dict()
+                    schedule['id'] = doc.id
+                    found[(schedule.get('wardId'), month)].append(schedule)
+
+        return {key: _latest(found[key]) for key in keys if found.get(key)}
+
+    def get_users(self, user_ids):
+        refs = [self.db.collection('users').document(user_id) for user_id in dict.fromkeys(user_ids)]
+        if not refs:
+            return {}
+        self.reads += 1
+        return {snapshot.id: snapshot.to_dict() for snapshot in self.db.get_all(refs) if snapshot.exists}
+
+    def save(self, schedule):
+        doc_ref = self.db.collection(self.collection).document()
+        doc_ref.set(stored_schedule(schedule))
+        return doc_ref.id
+
+    def save_with_carry_over(self, schedule, carry_over_flags):
+        started = time.perf_counter()
+        doc_ref = self.db.collection(self.collection).document()
+        writes = [(self.db.collection('users').document(nurse_id), {'carry_over_priority_flag': bool(flag)})
+                  for nurse_id, flag in carry_over_flags.items()]
+        chunks = chunk_writes(writes, self.batch_limit)
+
+        batch_seconds = []
+        for i, chunk in enumerate(chunks):
+            batch = self.db.batch()
+            for user_ref, fields in chunk:
+                batch.update(user_ref, fields)
+            if i == len(chunks) - 1:
+                batch.set(doc_ref, stored_schedule(schedule))
+            batch_started = time.perf_counter()
+            batch.commit()
+            batch_seconds.append(time.perf_counter() - batch_started)
+
+        return {
+            'id': doc_ref.id,
+            'writes': len(writes) + 1,
+            'batches': len(chunks),
+            'batchSeconds': batch_seconds,
+            'writeSeconds': time.perf_counter() - started
+        }
+
+
+class InMemoryScheduleRepository(ScheduleRepository):
+    def __init__(self, schedules=None, users=None, batch_limit=None):
+        self._schedules = collections.defaultdict(list)
+        self._lock = threading.Lock()
+        self.users = copy.deepcopy(users or {})
+        self.batch_limit = batch_limit or Config.FIRESTORE_BATCH_LIMIT
+        self.reads = 0
+        self.committed_batches = []
+        for schedule in schedules or []:
+            self.save(schedule)
+
+    def get_many(self, keys):
+        with self._lock:
+            self.reads += 1
+            return {key: copy.deepcopy(_latest(self._schedules[key])) for key in keys if self._schedules.get(key)}
+
+    def get_users(self, user_ids):
+        with self._lock:
+            self.reads += 1
+            return {user_id: copy.deepcopy(self.users[user_id]) for user_id in user_ids if user_id in self.users}
+
+    def save(self, schedule):
+        with self._lock:
+            return self._save(schedule)
+
+    def _save(self, schedule):
+        schedule = copy.deepcopy(stored_schedule(schedule))
+        key = (schedule.get('wardId'), schedule.get('month'))
+        schedule.setdefault('id', f'{key[0]}-{key[1]}-{len(self._schedules[key]) + 1}')
+        self._schedules[key].append(schedule)
+        return schedule['id']
+
+    def save_with_carry_over(self, schedule, carry_over_flags):
+        started = time.perf_counter()
+        writes = [(nurse_id, {'carry_over_priority_flag': bool(flag)}) for nurse_id, flag in carry_over_flags.items()]
+        chunks = chunk_writes(writes, self.batch_limit)
+        with self._lock:
+            missing = [nurse_id for nurse_id, _ in writes if nurse_id not in self.users]
+            if missing:
+                raise KeyError(f'User not found: {missing[0]}')
+            for i, chunk in enumerate(chunks):
+                for nurse_id, fields in chunk:
+                    self.users[nurse_id].update(fields)
+                if i == len(chunks) - 1:
+                    schedule_id = self._save(schedule)
+                self.committed_batches.append(len(chunk) + (i == len(chunks) - 1))
+        seconds = time.perf_counter() - started
+        return {
+            'id': schedule_id,
+            'writes': len(writes) + 1,
+            'batches': len(chunks),
+            'batchSeconds': [seconds / len(chunks)] * len(chunks),
+            'writeSeconds': seconds
+        }
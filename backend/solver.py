@@ -1,10 +1,51 @@
 from ortools.sat.python import cp_model
+import collections
 import datetime
+import json
+import random
+import threading
+import time
+import numpy as np
 from config import Config
+from model_registry import AuxVarRegistry, ModelStatsRecorder
+from request_compiler import compile_requests
+from feasibility import check_feasibility
+from schedule_matrix import ScheduleMatrix, shift_variable_indices
+from heuristic import HeuristicScheduler
+from decomposition import DecomposedSolver, wants_decomposition
+
+class SolutionProgressCallback(cp_model.CpSolverSolutionCallback):
+    def __init__(self, on_improvement=None, pool_indices=None):
+        super().__init__()
+        self.on_improvement = on_improvement
+        self.pool_indices = pool_indices
+        self.pool = []
+        self.solution_count = 0
+        self.first_solution_time = None
+        self.best_objective = None
+        self.best_objective_time = None
+    
+    def on_solution_callback(self):
+        elapsed = self.WallTime()
+        objective = self.ObjectiveValue()
+        self.solution_count += 1
+        if self.first_solution_time is None:
+            self.first_solution_time = elapsed
+        if self.pool_indices is not None:
+            self.pool.append((objective, np.asarray(self.Response().solution, dtype=np.int64)[self.pool_indices]))
+            del self.pool[:-Config.ALTERNATIVE_POOL_SIZE]
+        if self.best_objective is None or objective < self.best_objective:
+            self.best_objective = objective
+            self.best_objective_time = elapsed
+            if self.on_improvement is not None:
+                self.on_improvement(self, objective, elapsed)
 
 class ScheduleSolver:
-    def __init__(self):
+    def __init__(self, stop_event=None, progress_queue=None, num_workers=None):
         self.config = Config()
+        self.stop_event = stop_event
+        self.progress_queue = progress_queue
+        self.num_workers = num_workers or self.config.SOLVER_NUM_WORKERS
         
     def solve_schedule(self, data):
         nurses = data['nurses']
@@ -18,6 +59,37 @@ class ScheduleSolver:
         monthly_requests = data.get('monthlyRequests', {})
         hard_requests = data.get('hardRequests', [])
         carry_over_flags = data.get('carryOverFlags', {})
+        absences = data.get('absences') or []
+        hint_schedule = data.get('hintSchedule')
+        stability_penalty = data.get('stabilityPenalty', self.config.PENALTY_SCHEDULE_CHANGE)
+        stream_schedules = data.get('streamSchedules', False)
+        include_model_stats = data.get('modelStats', False)
+        explain_infeasibility = data.get('explainInfeasibility', False)
+        engine = data.get('engine', 'cpsat')
+        formulation = data.get('formulation', 'standard')
+        try:
+            num_alternatives = int(data.get('alternatives') or 0)
+            alternative_min_distance = int(data.get('alternativeMinDistance', self.config.ALTERNATIVE_MIN_DISTANCE))
+            alternatives_time_limit = float(data.get('alternativesTimeLimit', self.config.ALTERNATIVE_TIME_LIMIT))
+        except (TypeError, ValueError):
+            return {'error': 'ค่าตารางทางเลือก (alternatives) ไม่ถูกต้อง'}
+        lns_time_limit = data.get('lnsTimeLimit', 0)
+        incumbent_schedule = data.get('incumbentSchedule') or hint_schedule
+        
+        if engine not in ('cpsat', 'heuristic', 'hybrid'):
+            return {'error': f'ไม่รู้จัก engine: {engine}'}
+        
+        if formulation not in ('standard', 'lean'):
+            return {'error': f'ไม่รู้จัก formulation: {formulation}'}
+        lean = formulation == 'lean'
+        
+        if num_alternatives > 1 and engine == 'heuristic':
+            return {'error': 'engine heuristic ไม่รองรับการหาตารางทางเลือก (alternatives)'}
+        
+        if engine != 'heuristic' and wants_decomposition(data):
+            if num_alternatives > 1:
+                return {'error': 'การแบ่งช่วงตาราง (decomposition) ไม่รองรับการหาตารางทางเลือก (alternatives)'}
+            return DecomposedSolver(self).solve(data)
         
         days = []
         current = start_date
@@ -31,86 +103,481 @@ class ScheduleSolver:
         if num_nurses == 0 or num_days == 0:
             return {'error': 'ไม่มีพยาบาลหรือวันที่ในการจัดตาราง'}
         
+        build_started = time.perf_counter()
         model = cp_model.CpModel()
+        model_stats = ModelStatsRecorder(model)
         
-        shifts = {}
-        for n in range(num_nurses):
-            for d in range(num_days):
-                for s in self.config.SHIFTS:
-                    shifts[(n, d, s)] = model.NewBoolVar(f'shift_n{n}_d{d}_s{s}')
+        with model_stats.phase('compileRequests'):
+            compiled_requests = compile_requests(nurses, days, hard_requests, monthly_requests, carry_over_flags,
+                                                 absences)
         
-        is_off = {}
-        is_working = {}
-        for n in range(num_nurses):
-            for d in range(num_days):
-                is_off[(n, d)] = model.NewBoolVar(f'off_n{n}_d{d}')
-                is_working[(n, d)] = is_off[(n, d)].Not()
+        if not data.get('skipFeasibilityCheck'):
+            with model_stats.phase('feasibilityCheck'):
+                conflicts = check_feasibility(nurses, days, required_nurses, compiled_requests, previous_schedule)
+            if conflicts:
+                return {
+                    'error': f"ไม่สามารถจัดตารางได้: {conflicts[0]['message']}",
+                    'conflicts': conflicts,
+                    'diagnostics': {
+                        'status': 'PRECHECK_INFEASIBLE',
+                        'modelBuildSeconds': time.perf_counter() - build_started,
+                        'phases': model_stats.phases
+                    }
+                }
         
-        num_shifts_on_day = {}
-        for n in range(num_nurses):
-            for d in range(num_days):
-                num_shifts_on_day[n, d] = model.NewIntVar(0, 2, f'nshifts_n{n}_d{d}')
-                model.Add(num_shifts_on_day[n, d] == sum(shifts[(n, d, s)] for s in self.config.SHIFTS))
-                model.Add(num_shifts_on_day[n, d] >= 1).OnlyEnforceIf(is_working[(n, d)])
-                model.Add(num_shifts_on_day[n, d] == 0).OnlyEnforceIf(is_off[(n, d)])
+        if engine in ('heuristic', 'hybrid'):
+            with model_stats.phase('heuristic'):
+                heuristic_result = self._solve_heuristic(data, nurses, days, required_nurses, compiled_requests,
+                                                         target_off_days, previous_schedule, hint_schedule,
+                                                         stability_penalty)
+            if engine == 'heuristic':
+                diagnostics = {
+                    'status': heuristic_result['solverStatus'],
+                    'modelBuildSeconds': time.perf_counter() - build_started,
+                    'phases': model_stats.phases
+                }
+                if heuristic_result['hardViolations'] and not data.get('allowHardViolations'):
+                    return {
+                        'error': f"ไม่สามารถหาคำตอบได้: ตารางจากวิธีฮิวริสติกยังละเมิดเงื่อนไขบังคับ "
+                                 f"{heuristic_result['hardViolations']} จุด",
+                        'engine': 'heuristic',
+                        'hardViolations': heuristic_result['hardViolations'],
+                        'solveTimings': heuristic_result['solveTimings'],
+                        'diagnostics': diagnostics
+                    }
+                heuristic_result['diagnostics'] = diagnostics
+                return heuristic_result
+            if not hint_schedule:
+                hint_schedule = heuristic_result
+                stability_penalty = 0
         
-        for n in range(num_nurses):
-            for d in range(num_days):
-                model.Add(shifts[(n, d, self.config.SHIFT_MORNING)] + shifts[(n, d, self.config.SHIFT_AFTERNOON)] <= 1)
-                model.Add(shifts[(n, d, self.config.SHIFT_MORNING)] + shifts[(n, d, self.config.SHIFT_NIGHT)] <= 1)
+        with model_stats.phase('baseVariables'):
+            shifts = {}
+            for n in range(num_nurses):
+                for d in range(num_days):
+                    for s in self.config.SHIFTS:
+                        shifts[(n, d, s)] = model.NewBoolVar(f'shift_n{n}_d{d}_s{s}')
+            
+            is_off = {}
+            is_working = {}
+            for n in range(num_nurses):
+                for d in range(num_days):
+                    is_off[(n, d)] = model.NewBoolVar(f'off_n{n}_d{d}')
+                    is_working[(n, d)] = is_off[(n, d)].Not()
+            
+            num_shifts_on_day = {}
+            for n in range(num_nurses):
+                for d in range(num_days):
+                    num_shifts_on_day[n, d] = model.NewIntVar(0, 2, f'nshifts_n{n}_d{d}')
+                    model.Add(num_shifts_on_day[n, d] == sum(shifts[(n, d, s)] for s in self.config.SHIFTS))
+                    model.Add(num_shifts_on_day[n, d] >= 1).OnlyEnforceIf(is_working[(n, d)])
+                    model.Add(num_shifts_on_day[n, d] == 0).OnlyEnforceIf(is_off[(n, d)])
+            
+            for n in range(num_nurses):
+                for d in range(num_days):
+                    model.Add(shifts[(n, d, self.config.SHIFT_MORNING)] + shifts[(n, d, self.config.SHIFT_AFTERNOON)] <= 1)
+                    model.Add(shifts[(n, d, self.config.SHIFT_MORNING)] + shifts[(n, d, self.config.SHIFT_NIGHT)] <= 1)
         
-        for d in range(num_days):
-            for s in self.config.SHIFTS:
-                req = required_nurses.get(str(s), 0)
-                model.Add(sum(shifts[(n, d, s)] for n in range(num_nurses)) == req)
+        aux = AuxVarRegistry(model, shifts, is_off, num_shifts_on_day, num_days)
+        shift_indices = shift_variable_indices(shifts, num_nurses, num_days)
+        
+        with model_stats.phase('coverage'):
+            for d in range(num_days):
+                for s in self.config.SHIFTS:
+                    req = required_nurses.get(str(s), 0)
+                    model.Add(sum(shifts[(n, d, s)] for n in range(num_nurses)) == req)
         
-        self._apply_hard_requests(model, shifts, is_off, hard_requests, nurses, days)
+        with model_stats.phase('hardRequests'):
+            hard_request_literals = self._apply_hard_requests(model, shifts, is_off, compiled_requests,
+                                                              explain_infeasibility)
         
         penalty_terms = []
-        self._apply_consecutive_constraints(model, shifts, is_off, is_working, num_shifts_on_day, 
-                                           nurses, days, previous_schedule, penalty_terms)
+        with model_stats.phase('consecutive'):
+            self._apply_consecutive_constraints(model, shifts, is_off, is_working, num_shifts_on_day, 
+                                               nurses, days, previous_schedule, penalty_terms, aux, lean,
+                                               compiled_requests.absent)
         
-        self._apply_soft_requests(model, shifts, is_off, is_working, monthly_requests, 
-                                 nurses, days, carry_over_flags, penalty_terms)
+        with model_stats.phase('softRequests'):
+            self._apply_soft_requests(model, shifts, is_off, is_working, compiled_requests, 
+                                     nurses, days, penalty_terms, aux)
         
-        self._apply_fairness_objectives(model, shifts, is_off, num_shifts_on_day, 
-                                       nurses, days, target_off_days, penalty_terms)
+        with model_stats.phase('fairness'):
+            shift_demand = None
+            if lean and not compiled_requests.absent:
+                shift_demand = {s: num_days * int(required_nurses.get(str(s), 0)) for s in self.config.SHIFTS}
+            self._apply_fairness_objectives(model, shifts, is_off, num_shifts_on_day, 
+                                           nurses, days, target_off_days, penalty_terms, aux, shift_demand,
+                                           set(compiled_requests.absent))
+        
+        symmetry_pairs = 0
+        if lean and not hint_schedule and not (lns_time_limit and incumbent_schedule):
+            with model_stats.phase('symmetryBreaking'):
+                symmetry_pairs = self._apply_symmetry_breaking(model, shifts, nurses, days, compiled_requests,
+                                                               previous_schedule)
+        
+        hinted_cells = {}
+        if hint_schedule:
+            with model_stats.phase('hints'):
+                hinted_cells = self._apply_solution_hints(model, shifts, is_off, hint_schedule, nurses, days,
+                                                          stability_penalty, penalty_terms)
         
         if penalty_terms:
-            model.Minimize(sum(penalty * var for penalty, var in penalty_terms))
+            with model_stats.phase('objective'):
+                model.Minimize(sum(penalty * var for penalty, var in penalty_terms))
+        
+        model_build_seconds = time.perf_counter() - build_started
         
+        search_time_limit = solver_time_limit
+        if num_alternatives > 1:
+            alternatives_time_limit = min(alternatives_time_limit, solver_time_limit / 2)
+            search_time_limit -= alternatives_time_limit
         solver = cp_model.CpSolver()
-        solver.parameters.max_time_in_seconds = solver_time_limit
-        solver.parameters.num_workers = 4
+        solver.parameters.max_time_in_seconds = search_time_limit
+        solver.parameters.num_workers = self.num_workers
+        
+        if self.stop_event is not None and self.stop_event.is_set():
+            return {'error': 'การจัดตารางถูกยกเลิก'}
+        
+        finished = threading.Event()
+        if self.stop_event is not None:
+            threading.Thread(target=self._watch_stop_event, args=(solver, finished), daemon=True).start()
+        
+        on_improvement = None
+        if self.progress_queue is not None:
+            def publish(callback, objective, elapsed):
+                self._publish_incumbent(callback, objective, elapsed, shift_indices, nurses, days, stream_schedules)
+            on_improvement = publish
         
-        status = solver.Solve(model)
+        progress = SolutionProgressCallback(on_improvement, shift_indices if num_alternatives > 1 else None)
+        lns_stats = None
+        solve_deadline = time.perf_counter() + solver_time_limit
+        with model_stats.phase('solve'):
+            try:
+                if lns_time_limit and incumbent_schedule:
+                    incumbent = ScheduleMatrix.from_shift_dict(incumbent_schedule.get('shifts', {}),
+                                                               [nurse['id'] for nurse in nurses], days).cells
+                    lns_solver, lns_stats = self._solve_lns(model, shift_indices, incumbent, progress,
+                                                            min(lns_time_limit, search_time_limit),
+                                                            data.get('lnsFocusDays', []), data.get('lnsSeed', 0))
+                    if lns_solver is not None:
+                        solver, status = lns_solver, cp_model.FEASIBLE
+                    else:
+                        solver.parameters.max_time_in_seconds = max(search_time_limit - lns_stats['seconds'], 1)
+                        status = solver.Solve(model, progress)
+                else:
+                    status = solver.Solve(model, progress)
+            finally:
+                finished.set()
+        
+        diagnostics = self._build_diagnostics(solver, status, progress, model_stats, model_build_seconds)
+        diagnostics['formulation'] = {'name': formulation, 'symmetryPairs': symmetry_pairs}
         
         if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
-            return self._extract_solution(solver, shifts, nurses, days, ward_id, status)
+            with model_stats.phase('extractSolution'):
+                result = self._extract_solution(solver, shift_indices, nurses, days, ward_id, status)
+            result['diagnostics'] = diagnostics
+            if self.stop_event is not None and self.stop_event.is_set():
+                result['stoppedEarly'] = True
+            result['solveTimings'] = {
+                'hinted': bool(hinted_cells),
+                'firstFeasibleSeconds': progress.first_solution_time,
+                'finalObjectiveSeconds': progress.best_objective_time,
+                'solutionsFound': progress.solution_count,
+                'requestCompileSeconds': model_stats.phase_seconds('compileRequests'),
+                'modelBuildSeconds': model_build_seconds,
+                'solveSeconds': model_stats.phase_seconds('solve')
+            }
+            if compiled_requests.warnings:
+                result['requestWarnings'] = compiled_requests.warnings
+            if include_model_stats:
+                result['modelStats'] = model_stats.report(aux)
+            if hint_schedule:
+                result['warmStart'] = self._summarize_hint_changes(result['shifts'], hinted_cells, stability_penalty)
+            if lns_stats is not None:
+                result['objectiveBound'] = None
+                result['lns'] = lns_stats
+            if num_alternatives > 1:
+                with model_stats.phase('alternatives'):
+                    evaluator = HeuristicScheduler(nurses, days, required_nurses, compiled_requests, target_off_days,
+                                                   previous_schedule, hint_schedule, stability_penalty)
+                    best = np.asarray(solver.ResponseProto().solution, dtype=np.int64)[shift_indices]
+                    result['objectiveBreakdown'] = evaluator.breakdown(
+                        ScheduleMatrix([nurse['id'] for nurse in nurses], days, best).codes.tolist())
+                    result['alternatives'] = self._find_alternatives(
+                        model, shift_indices, progress, best, num_alternatives - 1, evaluator, nurses, days,
+                        alternative_min_distance,
+                        min(alternatives_time_limit, max(solve_deadline - time.perf_counter(), 0)))
+            return result
         else:
-            return {'error': f'ไม่สามารถหาคำตอบได้ (Status: {solver.StatusName(status)})'}
+            failure = {'error': f'ไม่สามารถหาคำตอบได้ (Status: {solver.StatusName(status)})', 'diagnostics': diagnostics}
+            if status == cp_model.INFEASIBLE and hard_request_literals:
+                core = self._shrink_conflict_core(model, solver.SufficientAssumptionsForInfeasibility(),
+                                                  hard_request_literals)
+                failure['conflictingRequests'] = [
+                    {'nurseId': nurses[n]['id'], 'date': days[d].isoformat()}
+                    for n, d in (hard_request_literals[index] for index in core if index in hard_request_literals)
+                ]
+            return failure
+    
+    def _build_diagnostics(self, solver, status, progress, model_stats, model_build_seconds):
+        response = solver.ResponseProto()
+        return {
+            'status': solver.StatusName(status),
+            'modelBuildSeconds': model_build_seconds,
+            'phases': model_stats.phases,
+            'solver': {
+                'numWorkers': solver.parameters.num_workers,
+                'wallTime': response.wall_time,
+                'userTime': response.user_time,
+                'deterministicTime': response.deterministic_time,
+                'numBranches': response.num_branches,
+                'numConflicts': response.num_conflicts,
+                'numBooleans': response.num_booleans,
+                'objectiveValue': response.objective_value,
+                'bestObjectiveBound': response.best_objective_bound,
+                'firstSolutionSeconds': progress.first_solution_time,
+                'solutionsFound': progress.solution_count
+            }
+        }
     
-    def _apply_hard_requests(self, model, shifts, is_off, hard_requests, nurses, days):
-        nurse_id_to_index = {nurse['id']: i for i, nurse in enumerate(nurses)}
+    def _apply_solution_hints(self, model, shifts, is_off, hint_schedule, nurses, days,
+                              stability_penalty, penalty_terms):
+        hint_shifts = hint_schedule.get('shifts', {})
+        hinted_cells = {}
+        changed_cells = []
         
-        for request in hard_requests:
-            if request['nurseId'] in nurse_id_to_index:
-                n = nurse_id_to_index[request['nurseId']]
-                request_date = datetime.date.fromisoformat(request['date'])
-                
-                d = None
-                for i, day in enumerate(days):
-                    if day == request_date:
-                        d = i
-                        break
+        for n, nurse in enumerate(nurses):
+            nurse_hints = hint_shifts.get(nurse['id'])
+            if not nurse_hints:
+                continue
+            
+            for d, day in enumerate(days):
+                day_hint = nurse_hints.get(day.isoformat())
+                if day_hint is None:
+                    continue
                 
-                if d is not None:
+                hinted_cells[(nurse['id'], day.isoformat())] = sorted(day_hint)
+                model.AddHint(is_off[(n, d)], 0 if day_hint else 1)
+                for s in self.config.SHIFTS:
+                    if s in day_hint:
+                        model.AddHint(shifts[(n, d, s)], 1)
+                        changed_cells.append(shifts[(n, d, s)].Not())
+                    else:
+                        model.AddHint(shifts[(n, d, s)], 0)
+                        changed_cells.append(shifts[(n, d, s)])
+        
+        if changed_cells and stability_penalty > 0:
+            penalty_terms.append((stability_penalty, sum(changed_cells)))
+        
+        return hinted_cells
+    
+    def _summarize_hint_changes(self, schedule_shifts, hinted_cells, stability_penalty):
+        changed = sum(1 for (nurse_id, day_str), day_hint in hinted_cells.items()
+                      if sorted(schedule_shifts[nurse_id][day_str]) != day_hint)
+        return {
+            'hintedCells': len(hinted_cells),
+            'changedCells': changed,
+            'stabilityPenalty': stability_penalty
+        }
+    
+    def _publish_incumbent(self, callback, objective, elapsed, shift_indices, nurses, days, include_schedule):
+        bound = callback.BestObjectiveBound()
+        event = {
+            'objective': objective,
+            'bound': bound,
+            'gap': abs(objective - bound) / max(1.0, abs(objective)),
+            'elapsedSeconds': elapsed,
+            'solutionCount': callback.solution_count
+        }
+        if include_schedule:
+            event['schedule'] = ScheduleMatrix.from_response(
+                callback.Response().solution, shift_indices, nurses, days).to_rows()
+        self.progress_queue.put(event)
+    
+    def _solve_lns(self, model, shift_indices, incumbent, progress, time_limit, focus_days=(), seed=0):
+        rng = random.Random(seed)
+        started = time.perf_counter()
+        deadline = started + time_limit
+        current = np.asarray(incumbent, dtype=np.int64)
+        best_solver = None
+        best_objective = None
+        stats = {'iterations': 0, 'improvements': 0, 'timeLimit': time_limit}
+        
+        while deadline - time.perf_counter() > 0.05:
+            if self.stop_event is not None and self.stop_event.is_set():
+                break
+            
+            free = self._lns_neighbourhood(current, rng, focus_days, stats['iterations'])
+            neighbourhood = model.Clone()
+            proto = neighbourhood.Proto()
+            for index, value in zip(shift_indices[~free].ravel().tolist(), current[~free].ravel().tolist()):
+                proto.variables[index].domain[:] = [value, value]
+            proto.ClearField('solution_hint')
+            proto.solution_hint.vars.extend(shift_indices[free].ravel().tolist())
+            proto.solution_hint.values.extend(current[free].ravel().tolist())
+            
+            sub_solver = cp_model.CpSolver()
+            sub_solver.parameters.max_time_in_seconds = min(self.config.LNS_ITERATION_TIME_LIMIT,
+                                                            deadline - time.perf_counter())
+            sub_solver.parameters.num_workers = self.num_workers
+            status = sub_solver.Solve(neighbourhood)
+            stats['iterations'] += 1
+            
+            if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                if best_solver is None and status == cp_model.INFEASIBLE:
+                    break
+                continue
+            
+            objective = sub_solver.ObjectiveValue()
+            current = np.asarray(sub_solver.ResponseProto().solution, dtype=np.int64)[shift_indices]
+            elapsed = time.perf_counter() - started
+            if progress.first_solution_time is None:
+                progress.first_solution_time = elapsed
+            if best_objective is None or objective < best_objective:
+                if best_objective is not None:
+                    stats['improvements'] += 1
+                best_solver, best_objective = sub_solver, objective
+                progress.solution_count += 1
+                progress.best_objective = objective
+                progress.best_objective_time = elapsed
+        
+        stats['objective'] = best_objective
+        stats['seconds'] = time.perf_counter() - started
+        return best_solver, stats
+    
+    def _find_alternatives(self, model, shift_indices, progress, best, count, evaluator, nurses, days,
+                           min_distance, time_limit):
+        nurse_ids = [nurse['id'] for nurse in nurses]
+        chosen = [(best, 'best')]
+        for _, cells in sorted(progress.pool, key=lambda item: item[0]):
+            if len(chosen) > count:
+                break
+            if all(np.count_nonzero(cells != other) >= min_distance for other, _ in chosen):
+                chosen.append((cells, 'pool'))
+        
+        diversify = model.Clone()
+        proto = diversify.Proto()
+        proto.ClearField('solution_hint')
+        proto.solution_hint.vars.extend(shift_indices.ravel().tolist())
+        proto.solution_hint.values.extend(best.ravel().tolist())
+        flat_vars = [diversify.GetBoolVarFromProtoIndex(index) for index in shift_indices.ravel().tolist()]
+        
+        deadline = time.perf_counter() + time_limit
+        constrained = 0
+        while len(chosen) <= count and deadline - time.perf_counter() > 0.05:
+            if self.stop_event is not None and self.stop_event.is_set():
+                break
+            for cells, _ in chosen[constrained:]:
+                diversify.Add(sum(var.Not() if value else var for var, value in zip(flat_vars, cells.ravel().tolist()))
+                              >= min_distance)
+            constrained = len(chosen)
+            
+            sub_solver = cp_model.CpSolver()
+            sub_solver.parameters.max_time_in_seconds = (deadline - time.perf_counter()) / (count + 1 - len(chosen))
+            sub_solver.parameters.num_workers = self.num_workers
+            status = sub_solver.Solve(diversify)
+            if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                if status == cp_model.INFEASIBLE:
+                    break
+                continue
+            chosen.append((np.asarray(sub_solver.ResponseProto().solution, dtype=np.int64)[shift_indices],
+                           'diversified'))
+        
+        alternatives = []
+        for cells, source in chosen[1:]:
+            matrix = ScheduleMatrix(nurse_ids, days, cells)
+            breakdown = evaluator.breakdown(matrix.codes.tolist())
+            alternatives.append({
+                'source': source,
+                'objectiveValue': breakdown['total'],
+                'objectiveBreakdown': breakdown,
+                'distanceFromBest': int(np.count_nonzero(cells != best)),
+                'shifts': matrix.to_shift_dict(),
+                'statistics': matrix.nurse_statistics()
+            })
+        alternatives.sort(key=lambda alternative: alternative['objectiveValue'])
+        for rank, alternative in enumerate(alternatives, start=2):
+            alternative['rank'] = rank
+        return alternatives
+    
+    def _lns_neighbourhood(self, current, rng, focus_days, iteration):
+        num_nurses, num_days, _ = current.shape
+        free = np.zeros((num_nurses, num_days), dtype=bool)
+        window = min(self.config.LNS_NEIGHBOURHOOD_DAYS, num_days)
+        
+        if iteration < len(focus_days):
+            start = min(max(focus_days[iteration] - window // 2, 0), num_days - window)
+            free[:, start:start + window] = True
+        elif iteration % 2:
+            start = rng.randrange(num_days - window + 1)
+            free[:, start:start + window] = True
+        else:
+            size = min(self.config.LNS_NEIGHBOURHOOD_NURSES, num_nurses)
+            order = np.argsort(current.sum(axis=(1, 2)), kind='stable').tolist()
+            chosen = set(order[:size // 4] + order[num_nurses - size // 4:])
+            others = [n for n in range(num_nurses) if n not in chosen]
+            chosen.update(rng.sample(others, size - len(chosen)))
+            free[sorted(chosen), :] = True
+        return free
+    
+    def _watch_stop_event(self, solver, finished):
+        while not finished.is_set():
+            if self.stop_event.wait(self.config.STOP_POLL_INTERVAL):
+                solver.StopSearch()
+                return
+    
+    def _shrink_conflict_core(self, model, core, hard_request_literals):
+        core = [index for index in core if index in hard_request_literals]
+        if len(core) > self.config.CONFLICT_SHRINK_MAX_REQUESTS:
+            return core
+        
+        feasibility_model = model.Clone()
+        feasibility_model.ClearObjective()
+        feasibility_model.ClearHints()
+        deadline = time.perf_counter() + self.config.CONFLICT_SHRINK_TIME_LIMIT
+        pending = list(core)
+        for position, index in enumerate(pending):
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            candidate = [other for other in core if other != index]
+            feasibility_model.ClearAssumptions()
+            feasibility_model.AddAssumptions([feasibility_model.GetBoolVarFromProtoIndex(other) for other in candidate])
+            probe = cp_model.CpSolver()
+            probe.parameters.max_time_in_seconds = remaining / (len(pending) - position)
+            probe.parameters.num_workers = self.num_workers
+            if probe.Solve(feasibility_model) == cp_model.INFEASIBLE:
+                core = candidate
+        return core
+    
+    def _apply_hard_requests(self, model, shifts, is_off, compiled_requests, use_assumptions=False):
+        literals = {}
+        for n, day_indices in compiled_requests.hard_off.items():
+            for d in day_indices:
+                if use_assumptions:
+                    literal = model.NewBoolVar(f'hard_req_n{n}_d{d}')
+                    model.Add(is_off[(n, d)] == 1).OnlyEnforceIf(literal)
+                    for s in self.config.SHIFTS:
+                        model.Add(shifts[(n, d, s)] == 0).OnlyEnforceIf(literal)
+                    literals[literal.Index()] = (n, d)
+                else:
                     model.Add(is_off[(n, d)] == 1)
                     for s in self.config.SHIFTS:
                         model.Add(shifts[(n, d, s)] == 0)
+        
+        for n, day_indices in compiled_requests.absent.items():
+            for d in day_indices:
+                model.Add(is_off[(n, d)] == 1)
+                for s in self.config.SHIFTS:
+                    model.Add(shifts[(n, d, s)] == 0)
+        
+        if literals:
+            model.AddAssumptions([model.GetBoolVarFromProtoIndex(index) for index in literals])
+        return literals
     
     def _apply_consecutive_constraints(self, model, shifts, is_off, is_working, num_shifts_on_day,
-                                      nurses, days, previous_schedule, penalty_terms):
+                                      nurses, days, previous_schedule, penalty_terms, aux, lean=False,
+                                      absent_days=None):
         nm_transition_penalties = []
         
         for n in range(len(nurses)):
@@ -130,148 +597,171 @@ class ScheduleSolver:
                     model.Add(shifts[(n, d, self.config.SHIFT_AFTERNOON)] + 
                              shifts[(n, d + 1, self.config.SHIFT_NIGHT)] <= 1)
                     
-                    na_double = model.NewBoolVar(f'na_double_n{n}_d{d}')
-                    model.AddMultiplicationEquality(na_double, 
-                        [shifts[(n, d, self.config.SHIFT_NIGHT)], shifts[(n, d, self.config.SHIFT_AFTERNOON)]])
+                    na_double = aux.na_double(n, d)
                     model.AddImplication(na_double, shifts[(n, d + 1, self.config.SHIFT_NIGHT)].Not())
                     
                     if self.config.PENALTY_NIGHT_TO_MORNING_TRANSITION > 0:
                         nm_indicator = model.NewBoolVar(f'nm_trans_n{n}_d{d}')
                         model.AddBoolAnd([na_double, shifts[(n, d + 1, self.config.SHIFT_MORNING)]]).OnlyEnforceIf(nm_indicator)
-                        model.AddImplication(nm_indicator, na_double)
-                        model.AddImplication(nm_indicator, shifts[(n, d + 1, self.config.SHIFT_MORNING)])
                         nm_transition_penalties.append(nm_indicator)
             
-            consecutive_shift_count = {}
-            for d in range(len(days)):
-                consecutive_shift_count[n, d] = model.NewIntVar(0, self.config.MAX_CONSECUTIVE_SHIFTS, 
-                                                               f'consec_n{n}_d{d}')
-            
-            if previous_schedule and nurses[n]['id'] in previous_schedule.get('consecutiveShifts', {}):
-                prev_consecutive = previous_schedule['consecutiveShifts'][nurses[n]['id']]
-                model.Add(consecutive_shift_count[n, 0] == 0).OnlyEnforceIf(is_off[n, 0])
-                model.Add(consecutive_shift_count[n, 0] == prev_consecutive + num_shifts_on_day[n, 0]).OnlyEnforceIf(is_working[n, 0])
+            if lean:
+                prev_consecutive = (previous_schedule or {}).get('consecutiveShifts', {}).get(nurses[n]['id'], 0)
+                self._apply_shift_run_windows(model, is_off, num_shifts_on_day, n, len(days), prev_consecutive)
             else:
-                model.Add(consecutive_shift_count[n, 0] == 0).OnlyEnforceIf(is_off[n, 0])
-                model.Add(consecutive_shift_count[n, 0] == num_shifts_on_day[n, 0]).OnlyEnforceIf(is_working[n, 0])
+                consecutive_shift_count = {}
+                for d in range(len(days)):
+                    consecutive_shift_count[n, d] = model.NewIntVar(0, self.config.MAX_CONSECUTIVE_SHIFTS, 
+                                                                   f'consec_n{n}_d{d}')
+            
+                if previous_schedule and nurses[n]['id'] in previous_schedule.get('consecutiveShifts', {}):
+                    prev_consecutive = previous_schedule['consecutiveShifts'][nurses[n]['id']]
+                    model.Add(consecutive_shift_count[n, 0] == 0).OnlyEnforceIf(is_off[n, 0])
+                    model.Add(consecutive_shift_count[n, 0] == prev_consecutive + num_shifts_on_day[n, 0]).OnlyEnforceIf(is_working[n, 0])
+                else:
+                    model.Add(consecutive_shift_count[n, 0] == 0).OnlyEnforceIf(is_off[n, 0])
+                    model.Add(consecutive_shift_count[n, 0] == num_shifts_on_day[n, 0]).OnlyEnforceIf(is_working[n, 0])
+            
+                model.Add(consecutive_shift_count[n, 0] <= self.config.MAX_CONSECUTIVE_SHIFTS)
             
-            model.Add(consecutive_shift_count[n, 0] <= self.config.MAX_CONSECUTIVE_SHIFTS)
+                for d in range(1, len(days)):
+                    model.Add(consecutive_shift_count[n, d] == 0).OnlyEnforceIf(is_off[n, d])
+                    model.Add(consecutive_shift_count[n, d] == num_shifts_on_day[n, d]).OnlyEnforceIf(is_working[n, d]).OnlyEnforceIf(is_off[n, d-1])
+                    model.Add(consecutive_shift_count[n, d] == consecutive_shift_count[n, d-1] + num_shifts_on_day[n, d]).OnlyEnforceIf(is_working[n, d]).OnlyEnforceIf(is_working[n, d-1])
+                    model.Add(consecutive_shift_count[n, d] <= self.config.MAX_CONSECUTIVE_SHIFTS)
             
-            for d in range(1, len(days)):
-                model.Add(consecutive_shift_count[n, d] == 0).OnlyEnforceIf(is_off[n, d])
-                model.Add(consecutive_shift_count[n, d] == num_shifts_on_day[n, d]).OnlyEnforceIf(is_working[n, d]).OnlyEnforceIf(is_off[n, d-1])
-                model.Add(consecutive_shift_count[n, d] == consecutive_shift_count[n, d-1] + num_shifts_on_day[n, d]).OnlyEnforceIf(is_working[n, d]).OnlyEnforceIf(is_working[n, d-1])
-                model.Add(consecutive_shift_count[n, d] <= self.config.MAX_CONSECUTIVE_SHIFTS)
+            recent_days = (previous_schedule or {}).get('recentShifts', {}).get(nurses[n]['id']) or []
             
             if self.config.MAX_CONSECUTIVE_SAME_SHIFT > 0:
                 for s in self.config.SHIFTS:
                     for d_start in range(len(days) - self.config.MAX_CONSECUTIVE_SAME_SHIFT):
-                        model.Add(sum(shifts[(n, d_start + k, s)] for k in range(self.config.MAX_CONSECUTIVE_SAME_SHIFT + 1)) 
-                                 <= self.config.MAX_CONSECUTIVE_SAME_SHIFT)
+                        window = [shifts[(n, d_start + k, s)] for k in range(self.config.MAX_CONSECUTIVE_SAME_SHIFT + 1)]
+                        if lean:
+                            model.AddBoolOr([var.Not() for var in window])
+                        else:
+                            model.Add(sum(window) <= self.config.MAX_CONSECUTIVE_SAME_SHIFT)
+                    self._apply_boundary_windows(model, [s in day_shifts for day_shifts in recent_days],
+                                                 [shifts[(n, d, s)] for d in range(len(days))],
+                                                 self.config.MAX_CONSECUTIVE_SAME_SHIFT)
             
             if self.config.MAX_CONSECUTIVE_OFF_DAYS > 0:
+                absent = set((absent_days or {}).get(n, []))
+                off_days = [None if d in absent else is_off[(n, d)] for d in range(len(days))]
                 for d_start in range(len(days) - self.config.MAX_CONSECUTIVE_OFF_DAYS):
-                    model.Add(sum(is_off[(n, d_start + k)] for k in range(self.config.MAX_CONSECUTIVE_OFF_DAYS + 1)) 
-                             <= self.config.MAX_CONSECUTIVE_OFF_DAYS)
+                    window = off_days[d_start:d_start + self.config.MAX_CONSECUTIVE_OFF_DAYS + 1]
+                    if None in window:
+                        continue
+                    if lean:
+                        model.AddBoolOr([var.Not() for var in window])
+                    else:
+                        model.Add(sum(window) <= self.config.MAX_CONSECUTIVE_OFF_DAYS)
+                self._apply_boundary_windows(model, [not day_shifts for day_shifts in recent_days],
+                                             off_days, self.config.MAX_CONSECUTIVE_OFF_DAYS)
         
         if nm_transition_penalties and self.config.PENALTY_NIGHT_TO_MORNING_TRANSITION > 0:
             penalty_terms.append((self.config.PENALTY_NIGHT_TO_MORNING_TRANSITION, sum(nm_transition_penalties)))
     
-    def _apply_soft_requests(self, model, shifts, is_off, is_working, monthly_requests,
-                            nurses, days, carry_over_flags, penalty_terms):
-        nurse_id_to_index = {nurse['id']: i for i, nurse in enumerate(nurses)}
+    def _apply_shift_run_windows(self, model, is_off, num_shifts_on_day, n, num_days, prev_consecutive):
+        limit = self.config.MAX_CONSECUTIVE_SHIFTS
+        for length in range(1, limit + 2):
+            slack = 2 * length - limit
+            if slack <= 0:
+                continue
+            for d_start in range(num_days - length + 1):
+                window = range(d_start, d_start + length)
+                model.Add(sum(num_shifts_on_day[n, d] for d in window)
+                          <= limit + slack * sum(is_off[(n, d)] for d in window))
         
-        for nurse_id, requests in monthly_requests.items():
-            if nurse_id not in nurse_id_to_index:
+        if prev_consecutive:
+            budget = limit - prev_consecutive
+            for length in range(1, min(max(budget + 1, 1), num_days) + 1):
+                slack = 2 * length - budget
+                if slack > 0:
+                    model.Add(sum(num_shifts_on_day[n, d] for d in range(length))
+                              <= budget + slack * sum(is_off[(n, d)] for d in range(length)))
+    
+    def _apply_symmetry_breaking(self, model, shifts, nurses, days, compiled_requests, previous_schedule):
+        previous_schedule = previous_schedule or {}
+        groups = collections.defaultdict(list)
+        for n, nurse in enumerate(nurses):
+            if compiled_requests.hard_off.get(n) or compiled_requests.soft.get(n) or compiled_requests.absent.get(n):
                 continue
-            
-            n = nurse_id_to_index[nurse_id]
-            
+            signature = json.dumps([previous_schedule.get(key, {}).get(nurse['id'])
+                                    for key in ('lastDayShifts', 'consecutiveShifts', 'recentShifts')])
+            groups[signature].append(n)
+        
+        prefix_days = min(self.config.SYMMETRY_BREAKING_DAYS, len(days))
+        cells = [(d, s) for d in range(prefix_days) for s in self.config.SHIFTS]
+        weights = [1 << i for i in reversed(range(len(cells)))]
+        pairs = 0
+        for members in groups.values():
+            for a, b in zip(members, members[1:]):
+                model.Add(sum(weight * (shifts[(a, d, s)] - shifts[(b, d, s)])
+                              for weight, (d, s) in zip(weights, cells)) >= 0)
+                pairs += 1
+        return pairs
+    
+    def _apply_boundary_windows(self, model, recent_flags, variables, limit):
+        for carried_days in range(1, min(limit, len(recent_flags)) + 1):
+            carried = sum(recent_flags[-carried_days:])
+            window = variables[:limit + 1 - carried_days]
+            if None in window:
+                continue
+            if carried and carried + len(window) > limit:
+                model.Add(sum(window) <= limit - carried)
+    
+    def _apply_soft_requests(self, model, shifts, is_off, is_working, compiled_requests,
+                            nurses, days, penalty_terms, aux):
+        for n, requests in compiled_requests.soft.items():
             for req in requests:
-                if not req.get('type'):
-                    continue
-                
-                penalty_weight = self.config.PENALTY_BASE_SOFT_VIOLATION
-                if req.get('is_high_priority'):
-                    penalty_weight += self.config.BONUS_HIGH_PRIORITY
-                    if carry_over_flags.get(nurse_id):
-                        penalty_weight += self.config.BONUS_CARRY_OVER
-                
                 violation_vars = []
                 
                 if req['type'] == 'no_specific_days':
-                    specific_days = req.get('value', [])
-                    for day_num in specific_days:
-                        for d, day in enumerate(days):
-                            if day.day == day_num:
-                                violation_vars.append(is_working[(n, d)])
+                    for d in req['days']:
+                        violation_vars.append(is_working[(n, d)])
                 
                 elif req['type'] == 'request_specific_shifts':
-                    shift_requests = req.get('value', [])
-                    for shift_req in shift_requests:
-                        day_num = shift_req.get('day')
-                        shift_type = shift_req.get('shift_type')
-                        
-                        for d, day in enumerate(days):
-                            if day.day == day_num and shift_type in self.config.SHIFTS:
-                                not_met = model.NewBoolVar(f'req_not_met_n{n}_d{d}_s{shift_type}')
-                                model.Add(shifts[(n, d, shift_type)] == 0).OnlyEnforceIf(not_met)
-                                model.Add(shifts[(n, d, shift_type)] == 1).OnlyEnforceIf(not_met.Not())
-                                violation_vars.append(not_met)
+                    for d, shift_type in req['cells']:
+                        violation_vars.append(shifts[(n, d, shift_type)].Not())
                 
-                elif req['type'] in ['no_morning_shifts', 'no_afternoon_shifts', 'no_night_shifts']:
-                    shift_map = {
-                        'no_morning_shifts': self.config.SHIFT_MORNING,
-                        'no_afternoon_shifts': self.config.SHIFT_AFTERNOON,
-                        'no_night_shifts': self.config.SHIFT_NIGHT
-                    }
-                    shift_type = shift_map[req['type']]
+                elif 'shiftType' in req:
                     for d in range(len(days)):
-                        violation_vars.append(shifts[(n, d, shift_type)])
+                        violation_vars.append(shifts[(n, d, req['shiftType'])])
                 
                 elif req['type'] == 'no_night_afternoon_double':
                     for d in range(len(days)):
-                        na_double = model.NewBoolVar(f'na_req_n{n}_d{d}')
-                        model.AddMultiplicationEquality(na_double,
-                            [shifts[(n, d, self.config.SHIFT_NIGHT)], shifts[(n, d, self.config.SHIFT_AFTERNOON)]])
-                        violation_vars.append(na_double)
+                        violation_vars.append(aux.na_double(n, d))
                 
-                if violation_vars:
-                    for var in violation_vars:
-                        penalty_terms.append((penalty_weight, var))
+                for var in violation_vars:
+                    penalty_terms.append((req['weight'], var))
+    
+    def _average_bounds(self, total, count, cap):
+        if total is None:
+            return cap, 0
+        return min(total // count, cap), min(-(-total // count), cap)
     
     def _apply_fairness_objectives(self, model, shifts, is_off, num_shifts_on_day,
-                                   nurses, days, target_off_days, penalty_terms):
+                                   nurses, days, target_off_days, penalty_terms, aux, shift_demand=None,
+                                   excluded=()):
         total_off = []
         total_shifts = []
         total_m = []
         total_a = []
         total_n = []
+        fair_nurses = [n for n in range(len(nurses)) if n not in excluded]
         
-        for n in range(len(nurses)):
-            off_var = model.NewIntVar(0, len(days), f'total_off_n{n}')
-            shifts_var = model.NewIntVar(0, len(days) * 2, f'total_shifts_n{n}')
-            m_var = model.NewIntVar(0, len(days), f'total_m_n{n}')
-            a_var = model.NewIntVar(0, len(days), f'total_a_n{n}')
-            n_var = model.NewIntVar(0, len(days), f'total_n_n{n}')
-            
-            model.Add(off_var == sum(is_off[(n, d)] for d in range(len(days))))
-            model.Add(shifts_var == sum(num_shifts_on_day[n, d] for d in range(len(days))))
-            model.Add(m_var == sum(shifts[(n, d, self.config.SHIFT_MORNING)] for d in range(len(days))))
-            model.Add(a_var == sum(shifts[(n, d, self.config.SHIFT_AFTERNOON)] for d in range(len(days))))
-            model.Add(n_var == sum(shifts[(n, d, self.config.SHIFT_NIGHT)] for d in range(len(days))))
-            
-            total_off.append(off_var)
-            total_shifts.append(shifts_var)
-            total_m.append(m_var)
-            total_a.append(a_var)
-            total_n.append(n_var)
+        for n in fair_nurses:
+            total_off.append(aux.total_off(n))
+            total_shifts.append(aux.total_shifts(n))
+            total_m.append(aux.total_shift_type(n, self.config.SHIFT_MORNING))
+            total_a.append(aux.total_shift_type(n, self.config.SHIFT_AFTERNOON))
+            total_n.append(aux.total_shift_type(n, self.config.SHIFT_NIGHT))
         
         if target_off_days >= 0 and self.config.PENALTY_OFF_DAY_UNDER_TARGET > 0:
             off_under = []
-            for n in range(len(nurses)):
+            for i, n in enumerate(fair_nurses):
                 under_var = model.NewIntVar(0, len(days), f'off_under_n{n}')
-                model.Add(under_var >= target_off_days - total_off[n])
+                model.Add(under_var >= target_off_days - total_off[i])
                 model.Add(under_var >= 0)
                 off_under.append(under_var)
             
@@ -279,7 +769,7 @@ class ScheduleSolver:
             model.Add(total_under == sum(off_under))
             penalty_terms.append((self.config.PENALTY_OFF_DAY_UNDER_TARGET, total_under))
         
-        if len(nurses) > 1:
+        if len(fair_nurses) > 1:
             if self.config.PENALTY_OFF_DAY_IMBALANCE > 0:
                 min_off = model.NewIntVar(0, len(days), 'min_off')
                 max_off = model.NewIntVar(0, len(days), 'max_off')
@@ -288,16 +778,22 @@ class ScheduleSolver:
                 penalty_terms.append((self.config.PENALTY_OFF_DAY_IMBALANCE, max_off - min_off))
             
             if self.config.PENALTY_TOTAL_SHIFT_IMBALANCE > 0:
-                min_shifts = model.NewIntVar(0, len(days) * 2, 'min_shifts')
-                max_shifts = model.NewIntVar(0, len(days) * 2, 'max_shifts')
+                low, high = self._average_bounds(sum(shift_demand.values()) if shift_demand else None,
+                                                 len(fair_nurses), len(days) * 2)
+                min_shifts = model.NewIntVar(0, low, 'min_shifts')
+                max_shifts = model.NewIntVar(high, len(days) * 2, 'max_shifts')
                 model.AddMinEquality(min_shifts, total_shifts)
                 model.AddMaxEquality(max_shifts, total_shifts)
                 penalty_terms.append((self.config.PENALTY_TOTAL_SHIFT_IMBALANCE, max_shifts - min_shifts))
             
             if self.config.PENALTY_SHIFT_TYPE_IMBALANCE > 0:
-                for shift_list, name in [(total_m, 'm'), (total_a, 'a'), (total_n, 'n')]:
-                    min_s = model.NewIntVar(0, len(days), f'min_{name}')
-                    max_s = model.NewIntVar(0, len(days), f'max_{name}')
+                for shift_list, name, s in [(total_m, 'm', self.config.SHIFT_MORNING),
+                                            (total_a, 'a', self.config.SHIFT_AFTERNOON),
+                                            (total_n, 'n', self.config.SHIFT_NIGHT)]:
+                    low, high = self._average_bounds(shift_demand[s] if shift_demand else None,
+                                                     len(fair_nurses), len(days))
+                    min_s = model.NewIntVar(0, low, f'min_{name}')
+                    max_s = model.NewIntVar(high, len(days), f'max_{name}')
                     model.AddMinEquality(min_s, shift_list)
                     model.AddMaxEquality(max_s, shift_list)
                     penalty_terms.append((self.config.PENALTY_SHIFT_TYPE_IMBALANCE, max_s - min_s))
@@ -306,58 +802,61 @@ class ScheduleSolver:
             na_doubles = []
             for n in range(len(nurses)):
                 for d in range(len(days)):
-                    na_var = model.NewBoolVar(f'na_double_obj_n{n}_d{d}')
-                    model.AddMultiplicationEquality(na_var,
-                        [shifts[(n, d, self.config.SHIFT_NIGHT)], shifts[(n, d, self.config.SHIFT_AFTERNOON)]])
-                    na_doubles.append(na_var)
+                    na_doubles.append(aux.na_double(n, d))
             
             if na_doubles:
                 penalty_terms.append((self.config.PENALTY_PER_NA_DOUBLE, sum(na_doubles)))
     
-    def _extract_solution(self, solver, shifts, nurses, days, ward_id, status):
+    def _solve_heuristic(self, data, nurses, days, required_nurses, compiled_requests, target_off_days,
+                         previous_schedule, hint_schedule, stability_penalty):
+        time_limit = min(data.get('heuristicTimeLimit', self.config.HEURISTIC_TIME_LIMIT),
+                         data.get('solverTimeLimit', 120))
+        scheduler = HeuristicScheduler(nurses, days, required_nurses, compiled_requests, target_off_days,
+                                       previous_schedule, hint_schedule, stability_penalty,
+                                       seed=data.get('heuristicSeed', 0))
+        rows, info = scheduler.solve(time_limit)
+        
+        matrix = ScheduleMatrix.from_codes([nurse['id'] for nurse in nurses], days, rows)
+        result = {
+            'wardId': data['wardId'],
+            'month': days[0].strftime('%Y-%m'),
+            'shifts': matrix.to_shift_dict(),
+            'statistics': matrix.nurse_statistics(),
+            'solverStatus': 'FEASIBLE' if not info['hardViolations'] else 'VIOLATES_CONSTRAINTS',
+            'objectiveValue': info['objective'],
+            'engine': 'heuristic',
+            'hardViolations': info['hardViolations'],
+            'nextCarryOverFlags': self._calculate_carry_over_flags(None, matrix, nurses, days),
+            'solveTimings': {
+                'firstFeasibleSeconds': info['constructSeconds'],
+                'finalObjectiveSeconds': info['constructSeconds'] + info['searchSeconds'],
+                'constructSeconds': info['constructSeconds'],
+                'searchSeconds': info['searchSeconds'],
+                'moves': info['moves'],
+                'acceptedMoves': info['accepted']
+            }
+        }
+        if compiled_requests.warnings:
+            result['requestWarnings'] = compiled_requests.warnings
+        return result
+    
+    def _extract_solution(self, solver, shift_indices, nurses, days, ward_id, status):
+        matrix = ScheduleMatrix.from_solver(solver, shift_indices, nurses, days)
         schedule_data = {
             'wardId': ward_id,
             'month': days[0].strftime('%Y-%m'),
-            'shifts': {},
-            'statistics': {},
+            'shifts': matrix.to_shift_dict(),
+            'statistics': matrix.nurse_statistics(),
             'solverStatus': solver.StatusName(status),
-            'objectiveValue': solver.ObjectiveValue() if hasattr(solver, 'ObjectiveValue') else 0
+            'objectiveValue': solver.ObjectiveValue() if hasattr(solver, 'ObjectiveValue') else 0,
+            'objectiveBound': solver.BestObjectiveBound()
         }
         
-        for n, nurse in enumerate(nurses):
-            nurse_id = nurse['id']
-            schedule_data['shifts'][nurse_id] = {}
-            stats = {'morning': 0, 'afternoon': 0, 'night': 0, 'total': 0, 'off': 0, 'overtime': 0}
-            
-            for d, day in enumerate(days):
-                day_str = day.isoformat()
-                day_shifts = []
-                
-                for s in self.config.SHIFTS:
-                    if solver.Value(shifts[(n, d, s)]) == 1:
-                        day_shifts.append(s)
-                        if s == self.config.SHIFT_MORNING:
-                            stats['morning'] += 1
-                        elif s == self.config.SHIFT_AFTERNOON:
-                            stats['afternoon'] += 1
-                        elif s == self.config.SHIFT_NIGHT:
-                            stats['night'] += 1
-                        stats['total'] += 1
-                
-                if not day_shifts:
-                    stats['off'] += 1
-                elif len(day_shifts) > 1:
-                    stats['overtime'] += len(day_shifts) - 1
-                
-                schedule_data['shifts'][nurse_id][day_str] = day_shifts
-            
-            schedule_data['statistics'][nurse_id] = stats
-        
         schedule_data['nextCarryOverFlags'] = self._calculate_carry_over_flags(
-            solver, shifts, nurses, days
+            solver, matrix, nurses, days
         )
         
         return schedule_data
     
-    def _calculate_carry_over_flags(self, solver, shifts, nurses, days):
+    def _calculate_carry_over_flags(self, solver, matrix, nurses, days):
         return {nurse['id']: False for nurse in nurses}
\ No newline at end of file
@@ -0,0 +1,106 @@
+import collections
+import copy
+import threading
+import time
+
+from config import Config
+from schedule_matrix import ScheduleMatrix
+from wire_format import decode_compact
+
+
+def compute_statistics(schedule_doc):
+    schedule_shifts = decode_compact(schedule_doc).get('shifts')
+    if schedule_shifts:
+        matrix = ScheduleMatrix.from_shift_dict(schedule_shifts)
+        summary = matrix.ward_statistics()
+        summary['by_nurse'] = matrix.nurse_statistics()
+        summary['runs'] = matrix.run_statistics()
+        return summary
+
+    stats = schedule_doc.get('statistics', {})
+    return {
+        'total_nurses': len(stats),
+        'avg_shifts': sum(s['total'] for s in stats.values()) / len(stats) if stats else 0,
+        'avg_off_days': sum(s['off'] for s in stats.values()) / len(stats) if stats else 0,
+        'total_overtime': sum(s['overtime'] for s in stats.values()),
+        'by_nurse': stats
+    }
+
+
+class StatisticsService:
+    def __init__(self, repository, ttl=None, max_entries=None):
+        self.repository = repository
+        self.ttl = ttl if ttl is not None else Config.STATISTICS_CACHE_TTL
+        self.max_entries = max_entries if max_entries is not None else Config.STATISTICS_CACHE_SIZE
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = collections.Counter()
+        self._ward_generations = collections.Counter()
+
+    def get(self, ward_id, month):
+        return self.get_many([(ward_id, month)]).get((ward_id, month))
+
+    def get_many(self, keys):
+        keys = list(dict.fromkeys(keys))
+        now = time.time()
+        found = {}
+        missing = []
+        with self._lock:
+            generations = {ward_id: self._ward_generations[ward_id] for ward_id, _ in keys}
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and now - entry[0] <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self._counters['hits'] += 1
+                    found[key] = copy.deepcopy(entry[1])
+                    continue
+                if entry is not None:
+                    del self._entries[key]
+                    self._counters['expirations'] += 1
+                self._counters['misses'] += 1
+                missing.append(key)
+
+        if missing:
+            schedules = self.repository.get_many(missing)
+            computed = {key: compute_statistics(schedule) for key, schedule in schedules.items()}
+            with self._lock:
+                self._counters['repositoryReads'] += 1
+                for key, summary in computed.items():
+                    if self._ward_generations[key[0]] != generations[key[0]]:
+                        continue
+                    self._entries[key] = (now, summary)
+                    self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._counters['evictions'] += 1
+            found.update({key: copy.deepcopy(summary) for key, summary in computed.items()})
+        return found
+
+    def invalidate(self, ward_id, month=None):
+        with self._lock:
+            self._ward_generations[ward_id] += 1
+            keys = [key for key in self._entries if key[0] == ward_id and (month is None or key[1] == month)]
+            for key in keys:
+                del self._entries[key]
+            self._counters['invalidations'] += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                'entries': len(self._entries),
+                'maxEntries': self.max_entries,
+                'ttlSeconds': self.ttl,
+                'hits': self._counters['hits'],
+                'misses': self._counters['misses'],
+                'repositoryReads': self._counters['repositoryReads'],
+                'evictions': self._counters['evictions'],
+                'expirations': self._counters['expirations'],
+                'invalidations': self._counters['invalidations'],
+                'hitRate': self._counters['hits'] / lookups if lookups else 0
+            }
@@ -0,0 +1,288 @@
+import collections
+import threading
+import time
+
+from config import Config
+from schedule_matrix import ScheduleMatrix
+from wire_format import decode_compact
+
+SHIFT_BIT = {s: 1 << (s - 1) for s in Config.SHIFTS}
+MORNING_BIT = SHIFT_BIT[Config.SHIFT_MORNING]
+AFTERNOON_BIT = SHIFT_BIT[Config.SHIFT_AFTERNOON]
+NIGHT_BIT = SHIFT_BIT[Config.SHIFT_NIGHT]
+SHIFT_COUNT = [bin(code).count('1') for code in range(1 << len(Config.SHIFTS))]
+
+RULE_MESSAGES = {
+    'not_assigned': '{nurse} ไม่มีเวร{shift}ในวันที่ {date}',
+    'already_assigned': '{nurse} มีเวร{shift}ในวันที่ {date} อยู่แล้ว',
+    'invalid_day': '{nurse} ไม่สามารถทำเวรเช้าควบกับเวรอื่นในวันที่ {date}',
+    'afternoon_night': '{nurse} ไม่สามารถทำเวรบ่ายแล้วต่อเวรดึกวันถัดไป ({date})',
+    'consecutive_shifts': '{nurse} ทำงานติดต่อกัน {length} เวร เกิน {limit} เวร (เริ่ม {date})',
+    'consecutive_same_shift': '{nurse} ทำเวร{shift}ติดต่อกัน {length} วัน เกิน {limit} วัน (เริ่ม {date})',
+    'consecutive_off_days': '{nurse} หยุดติดต่อกัน {length} วัน เกิน {limit} วัน (เริ่ม {date})'
+}
+
+RUN_LIMITS = {
+    'consecutive_shifts': Config.MAX_CONSECUTIVE_SHIFTS,
+    'consecutive_off_days': Config.MAX_CONSECUTIVE_OFF_DAYS,
+    'consecutive_same_shift': Config.MAX_CONSECUTIVE_SAME_SHIFT
+}
+RUN_RULES = [('consecutive_shifts', None, lambda code: SHIFT_COUNT[code]),
+             ('consecutive_off_days', None, lambda code: 1 if code == 0 else 0)]
+RUN_RULES += [('consecutive_same_shift', s, lambda code, bit=SHIFT_BIT[s]: 1 if code & bit else 0)
+              for s in Config.SHIFTS]
+RUN_RULES = [(rule, shift, weight) for rule, shift, weight in RUN_RULES if RUN_LIMITS[rule] > 0]
+
+
+def parse_shift(value):
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        raise ValueError(f'ประเภทเวรไม่ถูกต้อง: {value}')
+
+
+def check_swap_types(swap):
+    from_shift = parse_shift(swap.get('fromShift'))
+    to_shift = parse_shift(swap.get('toShift'))
+    
+    if from_shift == 0 and to_shift == 0:
+        return 'ไม่สามารถแลกวันหยุดกับวันหยุดได้'
+    
+    if from_shift != 0 and to_shift != 0 and from_shift != to_shift:
+        return 'ต้องแลกเวรประเภทเดียวกันเท่านั้น'
+    
+    return None
+
+
+def _forward_runs(values, weight):
+    runs, days, total, length = [], [], 0, 0
+    for value in values:
+        step = weight(value)
+        if step:
+            total += step
+            length += 1
+        else:
+            total, length = 0, 0
+        runs.append(total)
+        days.append(length)
+    return runs, days
+
+
+def _backward_runs(values, weight):
+    runs, _ = _forward_runs(values[::-1], weight)
+    return runs[::-1]
+
+
+class NurseRunState:
+    def __init__(self, codes):
+        self.codes = list(codes)
+        self.rebuild()
+
+    def rebuild(self):
+        self.runs = {}
+        for rule, shift, weight in RUN_RULES:
+            forward, forward_days = _forward_runs(self.codes, weight)
+            self.runs[(rule, shift)] = (forward, forward_days, _backward_runs(self.codes, weight))
+
+    def window_violations(self, start, end, changed):
+        codes = lambda d: changed.get(d, self.codes[d])
+        num_days = len(self.codes)
+        violations = {}
+
+        for d in range(max(start - 1, 0), min(end + 1, num_days)):
+            code = codes(d)
+            if code & MORNING_BIT and code & (AFTERNOON_BIT | NIGHT_BIT):
+                violations[('invalid_day', None, d)] = 1
+            if d + 1 < num_days and code & AFTERNOON_BIT and codes(d + 1) & NIGHT_BIT:
+                violations[('afternoon_night', None, d)] = 1
+
+        for rule, shift, weight in RUN_RULES:
+            forward, forward_days, backward = self.runs[(rule, shift)]
+            limit = RUN_LIMITS[rule]
+            total = forward[start - 1] if start > 0 else 0
+            run_start = start - forward_days[start - 1] if start > 0 else start
+            for d in range(start, end + 1):
+                step = weight(codes(d))
+                if step:
+                    if not total:
+                        run_start = d
+                    total += step
+                    continue
+                if total > limit:
+                    violations[(rule, shift, run_start)] = total
+                total = 0
+            if total and end + 1 < num_days:
+                total += backward[end + 1]
+            if total > limit:
+                violations[(rule, shift, run_start)] = total
+        return violations
+
+
+class SwapChecker:
+    def __init__(self, nurse_ids, dates, code_rows):
+        self.nurse_ids = list(nurse_ids)
+        self.dates = [date if isinstance(date, str) else date.isoformat() for date in dates]
+        self.date_index = {date: d for d, date in enumerate(self.dates)}
+        self.states = {nurse_id: NurseRunState(codes) for nurse_id, codes in zip(self.nurse_ids, code_rows)}
+        self.totals = {nurse_id: sum(SHIFT_COUNT[code] for code in state.codes)
+                       for nurse_id, state in self.states.items()}
+
+    @classmethod
+    def from_shift_dict(cls, shift_dict):
+        matrix = ScheduleMatrix.from_shift_dict(shift_dict)
+        return cls(matrix.nurse_ids, matrix.days, matrix.codes.tolist())
+
+    def _moves(self, swap):
+        moves = []
+        if swap.get('fromShift'):
+            moves.append((swap.get('fromNurseId'), swap.get('toNurseId'), swap.get('fromDate'),
+                          parse_shift(swap['fromShift'])))
+        if swap.get('toShift'):
+            moves.append((swap.get('toNurseId'), swap.get('fromNurseId'), swap.get('toDate'),
+                          parse_shift(swap['toShift'])))
+        return moves
+
+    def _error(self, rule, nurse_id, d=None, shift=None, length=None):
+        return {
+            'rule': rule,
+            'nurseId': nurse_id,
+            'date': self.dates[d] if d is not None else None,
+            'shift': shift,
+            'message': RULE_MESSAGES[rule].format(
+                nurse=nurse_id,
+                date=self.dates[d] if d is not None else '-',
+                shift=Config.SHIFT_NAMES_TH.get(shift, ''),
+                length=length,
+                limit=RUN_LIMITS.get(rule)
+            )
+        }
+
+    def _changes(self, swap):
+        changes = {}
+        errors = []
+        for giver, receiver, date, shift in self._moves(swap):
+            d = self.date_index.get(date)
+            for nurse_id in (giver, receiver):
+                if nurse_id not in self.states or d is None or shift not in SHIFT_BIT:
+                    raise ValueError(f'Unknown nurse, date or shift in swap: {nurse_id} {date} {shift}')
+            bit = SHIFT_BIT[shift]
+            giver_code = changes.get(giver, {}).get(d, self.states[giver].codes[d])
+            receiver_code = changes.get(receiver, {}).get(d, self.states[receiver].codes[d])
+            if not giver_code & bit:
+                errors.append(self._error('not_assigned', giver, d, shift))
+            if receiver_code & bit:
+                errors.append(self._error('already_assigned', receiver, d, shift))
+            changes.setdefault(giver, {})[d] = giver_code & ~bit
+            changes.setdefault(receiver, {})[d] = receiver_code | bit
+        return changes, errors
+
+    def check(self, swap):
+        reason = check_swap_types(swap)
+        if reason:
+            return {'valid': False, 'reason': reason}
+        
+        changes, errors = self._changes(swap)
+        if errors:
+            return {'valid': False, 'reason': errors[0]['message'], 'violations': errors}
+
+        violations = []
+        for nurse_id, changed in changes.items():
+            state = self.states[nurse_id]
+            start, end = min(changed), max(changed)
+            before = state.window_violations(start, end, {})
+            after = state.window_violations(start, end, changed)
+            for key, length in after.items():
+                if length > before.get(key, 0):
+                    rule, shift, d = key
+                    violations.append(self._error(rule, nurse_id, d, shift, length))
+
+        if violations:
+            return {'valid': False, 'reason': violations[0]['message'], 'violations': violations}
+        return {'valid': True, 'score': self.score(changes)}
+
+    def score(self, changes):
+        totals = dict(self.totals)
+        doubles_delta = 0
+        for nurse_id, changed in changes.items():
+            codes = self.states[nurse_id].codes
+            for d, code in changed.items():
+                totals[nurse_id] += SHIFT_COUNT[code] - SHIFT_COUNT[codes[d]]
+                doubles_delta += (SHIFT_COUNT[code] > 1) - (SHIFT_COUNT[codes[d]] > 1)
+        spread_before = max(self.totals.values()) - min(self.totals.values())
+        spread_after = max(totals.values()) - min(totals.values())
+        return (Config.PENALTY_TOTAL_SHIFT_IMBALANCE * (spread_after - spread_before)
+                + Config.PENALTY_PER_NA_DOUBLE * doubles_delta)
+
+    def check_many(self, swaps, rank=False):
+        results = []
+        for swap in swaps:
+            try:
+                results.append(self.check(swap))
+            except ValueError as e:
+                results.append({'valid': False, 'reason': str(e)})
+        ranking = None
+        if rank:
+            ranking = sorted((i for i, result in enumerate(results) if result['valid']),
+                             key=lambda i: results[i]['score'])
+        return results, ranking
+
+
+class SwapCheckerCache:
+    def __init__(self, repository, ttl=None, max_entries=None):
+        self.repository = repository
+        self.ttl = ttl if ttl is not None else Config.SWAP_CHECKER_CACHE_TTL
+        self.max_entries = max_entries if max_entries is not None else Config.SWAP_CHECKER_CACHE_SIZE
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = collections.Counter()
+        self._ward_generations = collections.Counter()
+
+    def get(self, ward_id, month):
+        key = (ward_id, month)
+        now = time.time()
+        with self._lock:
+            generation = self._ward_generations[ward_id]
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                self._counters['hits'] += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+                self._counters['expirations'] += 1
+            self._counters['misses'] += 1
+
+        schedule = self.repository.get(ward_id, month)
+        if not schedule:
+            return None
+        checker = SwapChecker.from_shift_dict(decode_compact(schedule).get('shifts') or {})
+        with self._lock:
+            if self._ward_generations[ward_id] == generation:
+                self._entries[key] = (now, checker)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._counters['evictions'] += 1
+        return checker
+
+    def invalidate(self, ward_id, month=None):
+        with self._lock:
+            self._ward_generations[ward_id] += 1
+            keys = [key for key in self._entries if key[0] == ward_id and (month is None or key[1] == month)]
+            for key in keys:
+                del self._entries[key]
+            self._counters['invalidations'] += len(keys)
+            return len(keys)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'maxEntries': self.max_entries,
+                'ttlSeconds': self.ttl,
+                'hits': self._counters['hits'],
+                'misses': self._counters['misses'],
+                'evictions': self._counters['evictions'],
+                'expirations': self._counters['expirations'],
+                'invalidations': self._counters['invalidations']
+            }
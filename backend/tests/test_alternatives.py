@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+from app import validate_schedule_payload
+from benchmark import generate_ward
+from solver import ScheduleSolver
+
+
+def ward(**fields):
+    return dict(generate_ward(8, num_days=7, seed=2, time_limit=5), **fields)
+
+
+@pytest.mark.parametrize('fields', [
+    {'alternatives': 'three'},
+    {'alternatives': -1},
+    {'alternatives': 2.5},
+    {'alternatives': True},
+    {'alternativeMinDistance': 0},
+    {'alternativeMinDistance': '12'},
+    {'alternativesTimeLimit': 0},
+    {'alternativesTimeLimit': 'soon'},
+    {'alternatives': 3, 'engine': 'heuristic'},
+    {'alternatives': 3, 'decomposition': 'blocks'}
+])
+def test_invalid_alternative_settings_are_rejected(fields):
+    assert validate_schedule_payload(ward(**fields))
+
+
+def test_valid_alternative_settings_pass():
+    assert validate_schedule_payload(ward(alternatives=3, alternativeMinDistance=4, alternativesTimeLimit=2.5)) is None
+    assert validate_schedule_payload(ward(alternatives=1, engine='heuristic')) is None
+
+
+@pytest.mark.parametrize('fields', [
+    {'alternatives': 'three'},
+    {'alternatives': 3, 'alternativesTimeLimit': 'soon'},
+    {'alternatives': 3, 'engine': 'heuristic'},
+    {'alternatives': 3, 'decomposition': 'blocks'}
+])
+def test_solver_returns_an_error_for_unusable_alternative_settings(fields):
+    result = ScheduleSolver(num_workers=1).solve_schedule(ward(**fields))
+    assert 'error' in result
+    assert 'shifts' not in result
+
+
+def test_alternatives_time_comes_out_of_the_solver_time_limit(monkeypatch):
+    granted = []
+
+    def find_alternatives(self, *args):
+        granted.append(args[-1])
+        return []
+
+    monkeypatch.setattr(ScheduleSolver, '_find_alternatives', find_alternatives)
+    started = time.perf_counter()
+    result = ScheduleSolver(num_workers=1).solve_schedule(
+        ward(solverTimeLimit=4, alternatives=3, alternativesTimeLimit=10))
+    assert 'error' not in result
+    assert 0 < granted[0] <= 2
+    assert time.perf_counter() - started - result['solveTimings']['modelBuildSeconds'] <= 4.5
@@ -0,0 +1,131 @@
+import copy
+
+import pytest
+
+import app as backend_app
+import cache as cache_module
+from benchmark import generate_ward
+from cache import ScheduleCache, make_cache_key
+from jobs import JOB_COMPLETED, JobManager
+
+
+def ward(**fields):
+    return dict(generate_ward(6, num_days=7, seed=1, time_limit=5), **fields)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, 'time', lambda: now[0])
+    return now
+
+
+def test_key_ignores_request_and_nurse_order():
+    data = ward(monthlyRequests={'nurse-1-000': [{'type': 'no_night_shifts'}, {'type': 'no_morning_shifts'}]},
+                hardRequests=[{'nurseId': 'nurse-1-000', 'date': '2026-01-02'},
+                              {'nurseId': 'nurse-1-001', 'date': '2026-01-03'}])
+    shuffled = copy.deepcopy(data)
+    shuffled['nurses'].reverse()
+    shuffled['hardRequests'].reverse()
+    shuffled['monthlyRequests']['nurse-1-000'].reverse()
+    assert make_cache_key(shuffled) == make_cache_key(data)
+
+
+def test_key_ignores_requests_for_unknown_nurses():
+    data = ward(monthlyRequests={}, hardRequests=[])
+    noisy = dict(data, monthlyRequests={'ghost': [{'type': 'no_night_shifts'}]},
+                 hardRequests=[{'nurseId': 'ghost', 'date': '2026-01-02'}], carryOverFlags={'ghost': True})
+    assert make_cache_key(noisy) == make_cache_key(dict(data, carryOverFlags={}))
+    assert make_cache_key(dict(data, hardRequests=[{'nurseId': 'nurse-1-000', 'date': '2026-01-02'}])) \
+        != make_cache_key(data)
+
+
+def test_lns_inputs_are_part_of_the_key():
+    plain = make_cache_key(ward())
+    incumbent = {'shifts': {'nurse-1-000': {'2026-01-01': [1]}}}
+    assert make_cache_key(ward(lnsTimeLimit=10)) != plain
+    assert make_cache_key(ward(incumbentSchedule=incumbent)) != plain
+    assert make_cache_key(ward(lnsTimeLimit=10, lnsFocusDays=[7])) != make_cache_key(ward(lnsTimeLimit=10))
+    assert make_cache_key(ward(lnsTimeLimit=10, lnsSeed=3)) != make_cache_key(ward(lnsTimeLimit=10))
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = ScheduleCache(max_entries=4, ttl=60, disk_dir='')
+    cache.put('a', {'shifts': {}})
+    clock[0] += 60
+    assert cache.lookup('a') == ({'shifts': {}}, 60)
+    clock[0] += 1
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ScheduleCache(max_entries=2, ttl=60, disk_dir='')
+    cache.put('a', {'n': 1})
+    cache.put('b', {'n': 2})
+    assert cache.get('a') == {'n': 1}
+    cache.put('c', {'n': 3})
+    assert cache.get('b') is None
+    assert cache.get('a') == {'n': 1}
+    assert cache.stats()['evictions'] == 1
+
+
+def test_disk_tier_survives_a_restart_and_expires(clock, tmp_path):
+    ScheduleCache(max_entries=1, ttl=60, disk_dir=str(tmp_path)).put('a', {'n': 1})
+    restarted = ScheduleCache(max_entries=1, ttl=60, disk_dir=str(tmp_path))
+    assert restarted.get('a') == {'n': 1}
+    assert restarted.stats()['diskHits'] == 1
+
+    clock[0] += 61
+    assert ScheduleCache(max_entries=1, ttl=60, disk_dir=str(tmp_path)).get('a') is None
+    assert not list(tmp_path.iterdir())
+
+
+def test_per_request_fields_are_not_cached():
+    cache = ScheduleCache(max_entries=4, ttl=60, disk_dir='')
+    result = {'shifts': {}, 'modelStats': {'variables': 10}, 'diagnostics': {'status': 'OPTIMAL'}}
+    cache.put('key', result)
+    assert cache.get('key') == {'shifts': {}}
+    assert result['modelStats'] == {'variables': 10}
+
+
+def test_cache_hit_returns_diagnostics_stub(clock, monkeypatch):
+    cache = ScheduleCache(max_entries=4, ttl=60, disk_dir='')
+    monkeypatch.setattr(backend_app, 'schedule_cache', cache)
+    data = ward()
+    key = make_cache_key(data)
+    cache.put(key, {'shifts': {}, 'solverStatus': 'OPTIMAL'})
+    clock[0] += 5
+
+    client = backend_app.app.test_client()
+    response = client.post('/generate-schedule', json=dict(data, diagnostics=True))
+    assert response.headers['X-Schedule-Cache'] == 'hit'
+    assert response.get_json()['diagnostics'] == {'cacheHit': True, 'cacheKey': key, 'cacheAgeSeconds': 5}
+    assert 'diagnostics' not in client.post('/generate-schedule', json=data).get_json()
+
+
+def test_cached_job_returns_diagnostics_stub(clock):
+    cache = ScheduleCache(max_entries=4, ttl=60, disk_dir='')
+    data = ward(diagnostics=True)
+    cache.put(make_cache_key(data), {'shifts': {}})
+    job = JobManager(cache=cache).submit(data)
+    assert job.status == JOB_COMPLETED
+    assert job.result['diagnostics']['cacheHit'] is True
+
+
+def test_clearing_caches_requires_an_id_token(monkeypatch):
+    cache = ScheduleCache(max_entries=4, ttl=60, disk_dir='')
+    cache.put('key', {'shifts': {}})
+    monkeypatch.setattr(backend_app, 'schedule_cache', cache)
+    monkeypatch.setattr(backend_app.firebase_auth, 'verify_id_token', lambda token: {'uid': 'admin1'})
+    client = backend_app.app.test_client()
+
+    assert client.delete('/cache').status_code == 401
+    assert client.delete('/statistics/w1/2026-01').status_code == 401
+    assert client.delete('/cache', headers={'Authorization': 'Basic abc'}).status_code == 401
+    assert cache.get('key') == {'shifts': {}}
+
+    headers = {'Authorization': 'Bearer token-admin1'}
+    assert client.delete('/cache', headers=headers).status_code == 200
+    assert client.delete('/statistics/w1/2026-01', headers=headers).status_code == 200
+    assert cache.get('key') is None
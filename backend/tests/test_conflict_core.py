@@ -0,0 +1,37 @@
+import datetime
+
+from feasibility import check_feasibility
+from request_compiler import compile_requests
+from solver import ScheduleSolver
+
+NURSES = [{'id': 'a'}, {'id': 'b'}]
+NIGHTS_ONLY = {'1': 0, '2': 0, '3': 1}
+CORE = [{'nurseId': 'a', 'date': '2026-01-01'}, {'nurseId': 'a', 'date': '2026-01-02'},
+        {'nurseId': 'b', 'date': '2026-01-04'}, {'nurseId': 'b', 'date': '2026-01-05'}]
+UNRELATED = {'nurseId': 'b', 'date': '2026-01-07'}
+
+
+def ward(**fields):
+    return dict({'wardId': 'w1', 'nurses': NURSES, 'startDate': '2026-01-01', 'endDate': '2026-01-07',
+                 'requiredNurses': NIGHTS_ONLY, 'hardRequests': CORE + [UNRELATED], 'targetOffDays': 2,
+                 'solverTimeLimit': 10}, **fields)
+
+
+def test_precheck_passes_requests_that_only_conflict_through_the_same_shift_limit():
+    days = [datetime.date(2026, 1, 1) + datetime.timedelta(days=d) for d in range(7)]
+    compiled = compile_requests(NURSES, days, CORE + [UNRELATED], {}, {})
+    assert check_feasibility(NURSES, days, NIGHTS_ONLY, compiled) == []
+
+
+def test_explain_infeasibility_names_the_conflicting_requests():
+    result = ScheduleSolver(num_workers=1).solve_schedule(ward(explainInfeasibility=True))
+    assert 'INFEASIBLE' in result['error']
+    assert sorted(result['conflictingRequests'], key=lambda req: (req['nurseId'], req['date'])) == CORE
+
+
+def test_dropping_any_core_request_makes_the_ward_feasible():
+    assert 'conflictingRequests' not in ScheduleSolver(num_workers=1).solve_schedule(ward())
+    for dropped in CORE:
+        result = ScheduleSolver(num_workers=1).solve_schedule(
+            ward(hardRequests=[req for req in CORE if req != dropped] + [UNRELATED]))
+        assert 'error' not in result
@@ -0,0 +1,92 @@
+import datetime
+
+import pytest
+
+import decomposition
+from benchmark import generate_ward
+from config import Config
+from solver import ScheduleSolver
+
+
+@pytest.fixture
+def stitched_only(monkeypatch):
+    monkeypatch.setattr(Config, 'LNS_ITERATION_TIME_LIMIT', 10 ** 6)
+
+
+def ward():
+    return dict(generate_ward(16, num_days=14, seed=5, coverage=0.5, time_limit=20), decomposition='blocks')
+
+
+def test_plan_blocks_merges_a_short_tail():
+    assert [len(block) for block in decomposition.plan_blocks(list(range(30)), 7)] == [7, 7, 7, 9]
+    assert [len(block) for block in decomposition.plan_blocks(list(range(11)), 7)] == [7, 4]
+
+
+def test_stitched_schedule_reports_its_hard_violations(stitched_only):
+    result = ScheduleSolver(num_workers=1).solve_schedule(ward())
+    assert result['solverStatus'] == 'FEASIBLE'
+    assert not result['decomposition']['refined']
+    assert result['decomposition']['stitchedHardViolations'] == 0
+
+
+def test_stitched_schedule_with_hard_violations_is_an_error(stitched_only, monkeypatch):
+    class ViolatingScheduler(decomposition.HeuristicScheduler):
+        def evaluate(self, rows):
+            return 3, super().evaluate(rows)[1]
+
+    monkeypatch.setattr(decomposition, 'HeuristicScheduler', ViolatingScheduler)
+    result = ScheduleSolver(num_workers=1).solve_schedule(ward())
+    assert 'error' in result
+    assert 'shifts' not in result
+    assert result['hardViolations'] == 3
+    assert result['decomposition']['stitchedHardViolations'] == 3
+
+
+def test_blocks_only_see_their_own_day_requests(stitched_only, monkeypatch):
+    data = ward()
+    block_warnings = []
+    original_solve = ScheduleSolver.solve_schedule
+
+    def solve_schedule(self, payload):
+        result = original_solve(self, payload)
+        if payload.get('skipFeasibilityCheck') and not payload.get('decomposition'):
+            block_warnings.append(result.get('requestWarnings', []))
+        return result
+
+    monkeypatch.setattr(ScheduleSolver, 'solve_schedule', solve_schedule)
+    assert any(req['type'] in ('no_specific_days', 'request_specific_shifts')
+               for requests in data['monthlyRequests'].values() for req in requests)
+    result = ScheduleSolver(num_workers=1).solve_schedule(data)
+    assert 'error' not in result
+    assert block_warnings == [[], []]
+
+
+def failing_second_block(monkeypatch, fail_whole=False):
+    data = ward()
+    second_block_start = (datetime.date.fromisoformat(data['startDate']) + datetime.timedelta(days=7)).isoformat()
+    original_solve = ScheduleSolver.solve_schedule
+
+    def solve_schedule(self, payload):
+        if payload.get('skipFeasibilityCheck') and payload['startDate'] == second_block_start:
+            return {'error': 'block failed'}
+        if fail_whole and not payload.get('decomposition') and payload.get('engine') == 'cpsat' \
+                and payload['startDate'] == data['startDate'] and not payload.get('skipFeasibilityCheck'):
+            return {'error': 'whole failed'}
+        return original_solve(self, payload)
+
+    monkeypatch.setattr(ScheduleSolver, 'solve_schedule', solve_schedule)
+    return ScheduleSolver(num_workers=1).solve_schedule(data)
+
+
+def test_failed_block_falls_back_to_a_monolithic_solve(monkeypatch):
+    result = failing_second_block(monkeypatch)
+    assert 'error' not in result
+    assert len(result['shifts']['nurse-5-000']) == 14
+    assert result['decomposition']['failedBlock'] == 2
+    assert result['decomposition']['fallback'] == 'monolithic'
+
+
+def test_failed_fallback_names_the_failed_block(monkeypatch):
+    result = failing_second_block(monkeypatch, fail_whole=True)
+    assert result['error'].startswith('ช่วงที่ 2 (2026-01-08 ถึง 2026-01-14)')
+    assert 'whole failed' in result['error']
@@ -0,0 +1,39 @@
+import datetime
+
+from feasibility import check_feasibility
+from request_compiler import compile_requests
+
+NURSES = [{'id': f'n{i}'} for i in range(6)]
+DAYS = [datetime.date(2026, 1, 1) + datetime.timedelta(days=d) for d in range(7)]
+REQUIRED = {'1': 1, '2': 1, '3': 1}
+
+
+def conflicts(hard_requests=(), absences=None, previous_schedule=None):
+    compiled = compile_requests(NURSES, DAYS, list(hard_requests), {}, {}, absences=absences)
+    return check_feasibility(NURSES, DAYS, REQUIRED, compiled, previous_schedule)
+
+
+def test_off_run_carried_from_recent_shifts_is_a_conflict():
+    hard_requests = [{'nurseId': 'n0', 'date': '2026-01-01'}, {'nurseId': 'n0', 'date': '2026-01-02'}]
+    assert conflicts(hard_requests) == []
+
+    found = conflicts(hard_requests, previous_schedule={'recentShifts': {'n0': [['1'], []]}})
+    assert [c['type'] for c in found] == ['hard_off_run']
+    assert found[0]['nurses'] == ['n0']
+
+
+def test_absence_is_exempt_from_off_run_limit():
+    found = conflicts(hard_requests=[{'nurseId': 'n0', 'date': day.isoformat()} for day in DAYS])
+    assert 'hard_off_run' in [c['type'] for c in found]
+
+    assert conflicts(absences=[{'nurseId': 'n0', 'startDate': '2026-01-01'}]) == []
+
+
+def test_compile_absences_defaults_to_the_last_day_and_warns_on_unknown_nurses():
+    compiled = compile_requests(NURSES, DAYS, [], {}, {}, absences=[
+        {'nurseId': 'n1', 'startDate': '2026-01-05'},
+        {'nurseId': 'ghost', 'startDate': '2026-01-01'}
+    ])
+    assert compiled.absent[1] == [4, 5, 6]
+    assert compiled.unavailable(1) == {4, 5, 6}
+    assert len(compiled.warnings) == 1
@@ -0,0 +1,45 @@
+import datetime
+
+from benchmark import generate_ward
+from heuristic import HeuristicScheduler
+from request_compiler import compile_requests
+from solver import ScheduleSolver
+
+
+def ward(**fields):
+    return dict(generate_ward(16, num_days=14, seed=3, time_limit=5), engine='heuristic', heuristicTimeLimit=1,
+                **fields)
+
+
+def test_heuristic_engine_returns_a_feasible_schedule():
+    result = ScheduleSolver(num_workers=1).solve_schedule(ward())
+    assert 'error' not in result
+    assert result['solverStatus'] == 'FEASIBLE'
+    assert result['hardViolations'] == 0
+
+
+def test_heuristic_schedule_with_hard_violations_is_an_error(monkeypatch):
+    original_search = HeuristicScheduler.search
+
+    def search(self, rows, time_limit):
+        rows, info = original_search(self, rows, time_limit)
+        return rows, dict(info, hardViolations=2)
+
+    monkeypatch.setattr(HeuristicScheduler, 'search', search)
+    result = ScheduleSolver(num_workers=1).solve_schedule(ward())
+    assert 'error' in result
+    assert result['hardViolations'] == 2
+    assert 'shifts' not in result
+
+    result = ScheduleSolver(num_workers=1).solve_schedule(ward(allowHardViolations=True))
+    assert result['solverStatus'] == 'VIOLATES_CONSTRAINTS'
+
+
+def test_construct_never_fills_coverage_from_hard_off_days():
+    nurses = [{'id': f'n{i}'} for i in range(4)]
+    days = [datetime.date(2026, 1, 1) + datetime.timedelta(days=d) for d in range(3)]
+    hard_requests = [{'nurseId': f'n{i}', 'date': '2026-01-02'} for i in range(3)]
+    compiled = compile_requests(nurses, days, hard_requests, {}, {})
+    scheduler = HeuristicScheduler(nurses, days, {'1': 2, '2': 2, '3': 2}, compiled, 1, None, None, 0)
+    rows = scheduler.construct()
+    assert [rows[n][1] for n in range(3)] == [0, 0, 0]
@@ -0,0 +1,153 @@
+import json
+import queue
+import threading
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import app as backend_app
+import jobs
+from jobs import JOB_COMPLETED, JOB_FAILED, JOB_QUEUED, JobManager
+from worker_budget import CoreBudget
+
+
+class FakeSyncManager:
+    def Event(self):
+        return threading.Event()
+
+    def Queue(self):
+        return queue.Queue()
+
+
+class FakeContext:
+    def Manager(self):
+        return FakeSyncManager()
+
+
+class FakeExecutor:
+    created = []
+
+    def __init__(self, max_workers=None, mp_context=None):
+        self.broken = False
+        self._broken = False
+        self.shut_down = False
+        FakeExecutor.created.append(self)
+
+    def submit(self, fn, *args):
+        if self.broken:
+            self._broken = True
+            raise BrokenProcessPool('A child process terminated abruptly')
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+def fake_solve_job(data, stop_event, progress_queue, num_workers):
+    return 1.0, 2.0, {'wardId': data['wardId'], 'shifts': {}}
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    FakeExecutor.created = []
+    monkeypatch.setattr(jobs.multiprocessing, 'get_context', lambda method: FakeContext())
+    monkeypatch.setattr(jobs, 'ProcessPoolExecutor', FakeExecutor)
+    monkeypatch.setattr(jobs, 'run_solve_job', fake_solve_job)
+    budget = CoreBudget(total_cores=8, min_workers=1, worker_tiers=[(None, 2)])
+    return JobManager(max_workers=2, queue_size=10, core_budget=budget), budget
+
+
+def payload(ward_id='w1'):
+    return {'wardId': ward_id, 'nurses': [{'id': 'n1'}], 'startDate': '2026-01-01', 'endDate': '2026-01-31'}
+
+
+def submit_with_timeout(manager, data):
+    submitted = []
+    thread = threading.Thread(target=lambda: submitted.append(manager.submit(data)), daemon=True)
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive(), 'submit deadlocked'
+    return submitted[0]
+
+
+def test_already_finished_future_does_not_deadlock(manager):
+    manager, budget = manager
+    job = submit_with_timeout(manager, payload())
+    assert job.status == JOB_COMPLETED
+    assert manager.stats()['running'] == 0
+    assert budget.snapshot()['allocated'] == 0
+
+
+def test_broken_pool_fails_the_job_and_is_replaced(manager):
+    manager, budget = manager
+    submit_with_timeout(manager, payload())
+    FakeExecutor.created[0].broken = True
+
+    job = submit_with_timeout(manager, payload())
+    assert job.status == JOB_FAILED
+    assert 'Could not start solver' in job.error
+    assert manager.stats()['running'] == 0
+    assert budget.snapshot()['allocated'] == 0
+    assert FakeExecutor.created[0].shut_down
+
+    job = submit_with_timeout(manager, payload())
+    assert job.status == JOB_COMPLETED
+    assert len(FakeExecutor.created) == 2
+
+
+def test_budget_release_dispatches_a_queued_job(manager):
+    manager, budget = manager
+    held = budget.try_acquire(100, 'sync:w1')
+    others = budget.try_acquire(100, 'sync:w2'), budget.try_acquire(100, 'sync:w3'), budget.try_acquire(100, 'sync:w4')
+    assert budget.snapshot()['free'] == 0
+
+    job = submit_with_timeout(manager, payload())
+    assert job.status == JOB_QUEUED
+    assert manager.stats()['queued'] == 1
+
+    budget.release(held)
+    assert job.status == JOB_COMPLETED
+    assert manager.stats()['queued'] == 0
+    for allocation in others:
+        budget.release(allocation)
+    assert budget.snapshot()['allocated'] == 0
+
+
+def progress_job(*events):
+    job = jobs.Job('job-1', payload(), 0)
+    job.progress_queue = queue.Queue()
+    for event in events:
+        job.progress_queue.put(dict(event))
+    return job
+
+
+def test_drain_keeps_the_schedule_only_for_the_newest_event():
+    job = progress_job({'solutionCount': 1, 'schedule': 'first'}, {'solutionCount': 2, 'schedule': 'second'})
+    events, latest_schedule = JobManager(max_workers=1).drain_progress(job)
+    assert events == [{'solutionCount': 1}, {'solutionCount': 2}]
+    assert latest_schedule == 'second'
+
+    job.progress_queue.put({'solutionCount': 3})
+    events, latest_schedule = JobManager(max_workers=1).drain_progress(job)
+    assert len(events) == 3 and latest_schedule is None
+    assert 'schedule' not in job.to_dict()['latestIncumbent']
+
+
+def test_event_streams_do_not_strip_schedules_from_each_other(monkeypatch):
+    manager = JobManager(max_workers=1)
+    job = progress_job({'solutionCount': 1, 'schedule': 'first'})
+    manager._jobs[job.id] = job
+    monkeypatch.setattr(backend_app, 'job_manager', manager)
+    manager.drain_progress(job)
+    job.progress_queue.put({'solutionCount': 2, 'schedule': 'second'})
+    job.status = JOB_COMPLETED
+
+    client = backend_app.app.test_client()
+    for _ in range(2):
+        body = client.get(f'/jobs/{job.id}/events').get_data(as_text=True)
+        incumbents = [json.loads(message.split('\ndata: ', 1)[1]) for message in body.split('\n\n')
+                      if message.startswith('event: incumbent')]
+        assert incumbents == [{'solutionCount': 1}, {'solutionCount': 2, 'schedule': 'second'}]
@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+from benchmark import generate_ward, interchangeable_ward
+from schedule_matrix import ScheduleMatrix
+from solver import ScheduleSolver
+
+
+class PinnedSolver(ScheduleSolver):
+    def _apply_solution_hints(self, model, shifts, is_off, hint_schedule, nurses, days, stability_penalty,
+                              penalty_terms):
+        for n, nurse in enumerate(nurses):
+            for d, day in enumerate(days):
+                pinned = hint_schedule['shifts'][nurse['id']][day.isoformat()]
+                for s in self.config.SHIFTS:
+                    model.Add(shifts[(n, d, s)] == (1 if s in pinned else 0))
+        return {}
+
+
+def solve_pinned(data, schedule, previous_schedule, formulation):
+    result = PinnedSolver(num_workers=1).solve_schedule(dict(
+        data, formulation=formulation, hintSchedule=schedule, previousSchedule=previous_schedule,
+        skipFeasibilityCheck=True, stabilityPenalty=0))
+    return 'error' not in result, result.get('objectiveValue')
+
+
+@pytest.mark.parametrize('seed', [1, 2])
+def test_lean_and_standard_agree_on_pinned_schedules(seed):
+    rng = random.Random(seed)
+    data = generate_ward(8, num_days=14, seed=seed, coverage=0.5, time_limit=5)
+    base = ScheduleSolver(num_workers=1).solve_schedule(data)
+    assert 'error' not in base
+    nurse_ids = [nurse['id'] for nurse in data['nurses']]
+    matrix = ScheduleMatrix.from_shift_dict(base['shifts'], nurse_ids)
+
+    outcomes = set()
+    for _ in range(12):
+        codes = matrix.codes.tolist()
+        for _ in range(rng.randint(0, 2)):
+            d = rng.randrange(len(matrix.days))
+            a, b = rng.sample(range(len(nurse_ids)), 2)
+            codes[a][d], codes[b][d] = codes[b][d], codes[a][d]
+        previous_schedule = {
+            'consecutiveShifts': {nurse_id: rng.choice([0] * 12 + [2, 4, 6, 7]) for nurse_id in nurse_ids},
+            'lastDayShifts': {nurse_id: rng.choice([[]] * 8 + [[1], [2], [2, 3]]) for nurse_id in nurse_ids},
+            'recentShifts': {nurse_id: [rng.choice([[1], [2], [3], [1], [3], []]) for _ in range(2)]
+                             for nurse_id in nurse_ids}
+        }
+        schedule = {'shifts': ScheduleMatrix.from_codes(nurse_ids, matrix.days, codes).to_shift_dict()}
+        standard = solve_pinned(data, schedule, previous_schedule, 'standard')
+        assert solve_pinned(data, schedule, previous_schedule, 'lean') == standard
+        outcomes.add(standard[0])
+    assert outcomes == {True, False}
+
+
+def test_interchangeable_nurses_get_symmetry_breaking():
+    data = interchangeable_ward(generate_ward(8, num_days=7, seed=4, coverage=0.5, time_limit=5), 0.5, 4)
+    result = ScheduleSolver(num_workers=1).solve_schedule(dict(data, formulation='lean'))
+    assert 'error' not in result
+    assert result['diagnostics']['formulation']['symmetryPairs'] > 0
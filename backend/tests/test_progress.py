@@ -0,0 +1,29 @@
+import queue
+
+from benchmark import generate_ward
+from solver import ScheduleSolver
+
+
+def drain(progress_queue):
+    events = []
+    while not progress_queue.empty():
+        events.append(progress_queue.get_nowait())
+    return events
+
+
+def test_improving_incumbents_are_published_to_the_progress_queue():
+    progress_queue = queue.Queue()
+    payload = dict(generate_ward(8, num_days=7, seed=2, time_limit=3), streamSchedules=True)
+    result = ScheduleSolver(progress_queue=progress_queue, num_workers=1).solve_schedule(payload)
+    events = drain(progress_queue)
+
+    assert 'error' not in result
+    assert events
+    assert [event['solutionCount'] for event in events] == sorted(event['solutionCount'] for event in events)
+    assert events[-1]['objective'] == result['objectiveValue']
+    assert sorted(events[-1]['schedule']['rows']) == sorted(nurse['id'] for nurse in payload['nurses'])
+
+
+def test_no_progress_queue_publishes_nothing():
+    payload = generate_ward(8, num_days=7, seed=2, time_limit=3)
+    assert 'error' not in ScheduleSolver(num_workers=1).solve_schedule(payload)
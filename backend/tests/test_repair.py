@@ -0,0 +1,58 @@
+import datetime
+
+from benchmark import generate_ward
+from repair import ScheduleRepairer, clip_absences
+from solver import ScheduleSolver
+
+
+def test_clip_absences_to_the_repaired_days():
+    absences = [{'nurseId': 'a', 'startDate': '2026-01-01', 'endDate': '2026-01-03'},
+                {'nurseId': 'b', 'startDate': '2026-01-02'},
+                {'nurseId': 'c', 'startDate': '2026-01-09', 'endDate': '2026-01-10'}]
+    assert clip_absences(absences, '2026-01-05') == [{'nurseId': 'b', 'startDate': '2026-01-05'},
+                                                     {'nurseId': 'c', 'startDate': '2026-01-09',
+                                                      'endDate': '2026-01-10'}]
+
+
+def test_absent_nurse_is_off_for_the_rest_of_the_schedule():
+    data = generate_ward(12, seed=12, time_limit=20)
+    published = ScheduleSolver(num_workers=1).solve_schedule(data)
+    assert 'error' not in published
+
+    start = datetime.date.fromisoformat(data['startDate'])
+    change_date = (start + datetime.timedelta(days=21)).isoformat()
+    sick = data['nurses'][0]['id']
+    result = ScheduleRepairer(ScheduleSolver(num_workers=1)).repair(dict(
+        data, publishedSchedule=published, changeDate=change_date, solverTimeLimit=20,
+        absences=[{'nurseId': sick, 'startDate': change_date}]))
+
+    assert 'error' not in result
+    assert result['repair']['absences'] == [{'nurseId': sick, 'startDate': change_date}]
+    for nurse_id, nurse_shifts in result['shifts'].items():
+        for date, shifts in nurse_shifts.items():
+            if date < change_date:
+                assert shifts == published['shifts'][nurse_id][date]
+            elif nurse_id == sick:
+                assert shifts == []
+
+
+class FixedSolver:
+    def __init__(self, shifts):
+        self.shifts = shifts
+
+    def solve_schedule(self, data):
+        return {'shifts': self.shifts, 'solverStatus': 'OPTIMAL'}
+
+
+def test_changes_compare_string_and_int_shifts_alike():
+    published = {'shifts': {'a': {'2026-01-01': ['1'], '2026-01-02': ['3', '2'], '2026-01-03': ['1']},
+                            'b': {'2026-01-01': [], '2026-01-02': ['1'], '2026-01-03': []}}}
+    repaired = {'a': {'2026-01-02': [2, 3], '2026-01-03': []}, 'b': {'2026-01-02': [1], '2026-01-03': [1]}}
+    result = ScheduleRepairer(FixedSolver(repaired)).repair({
+        'wardId': 'w1', 'nurses': [{'id': 'a'}, {'id': 'b'}], 'startDate': '2026-01-01', 'endDate': '2026-01-03',
+        'requiredNurses': {'1': 1}, 'publishedSchedule': published, 'changeDate': '2026-01-02'})
+
+    assert result['repair']['changes'] == [
+        {'nurseId': 'a', 'date': '2026-01-03', 'before': [1], 'after': []},
+        {'nurseId': 'b', 'date': '2026-01-03', 'before': [], 'after': [1]}
+    ]
@@ -0,0 +1,87 @@
+import pytest
+
+import app as backend_app
+from schedule_store import InMemoryScheduleRepository
+
+
+@pytest.fixture
+def repository(monkeypatch):
+    repository = InMemoryScheduleRepository(users={
+        'admin1': {'isAdmin': True, 'currentWard': 'w1'},
+        'admin2': {'isAdmin': True, 'currentWard': 'w2'},
+        'n1': {'currentWard': 'w1', 'carry_over_priority_flag': False},
+        'n2': {'currentWard': 'w1', 'carry_over_priority_flag': True},
+        'n3': {'currentWard': 'w2', 'carry_over_priority_flag': False}
+    })
+    monkeypatch.setattr(backend_app, 'schedule_repository', repository)
+    monkeypatch.setattr(backend_app.firebase_auth, 'verify_id_token', verify_id_token)
+    return repository
+
+
+def verify_id_token(token):
+    if not token.startswith('token-'):
+        raise ValueError('invalid token')
+    return {'uid': token[len('token-'):]}
+
+
+def post(payload, uid=None):
+    headers = {'Authorization': f'Bearer token-{uid}'} if uid else {}
+    return backend_app.app.test_client().post('/schedules', json=payload, headers=headers)
+
+
+def payload(shifts=None, flags=None, **fields):
+    shifts = shifts or {'n1': {'2026-01-01': [1]}, 'n2': {'2026-01-01': []}}
+    flags = flags or {'n1': True, 'n2': False}
+    return dict({'wardId': 'w1', 'month': '2026-01',
+                 'schedule': {'shifts': shifts, 'nextCarryOverFlags': flags}}, **fields)
+
+
+def test_save_requires_an_id_token(repository):
+    assert post(payload()).status_code == 401
+    response = backend_app.app.test_client().post('/schedules', json=payload(), headers={'Authorization': 'Bearer bad'})
+    assert response.status_code == 401
+    assert repository.get('w1', '2026-01') is None
+
+
+def test_save_requires_an_admin_of_the_ward(repository):
+    assert post(payload(), uid='admin2').status_code == 403
+    assert post(payload(), uid='n1').status_code == 403
+    assert post(payload(), uid='unknown').status_code == 403
+    assert repository.get('w1', '2026-01') is None
+
+
+def test_save_rejects_unknown_and_foreign_nurses(repository):
+    response = post(payload(flags={'n1': True, 'ghost': True}), uid='admin1')
+    assert response.status_code == 400
+    assert response.get_json()['nurseIds'] == ['ghost']
+    response = post(payload(nurseIds=['n1', 'n3']), uid='admin1')
+    assert response.status_code == 400
+    assert response.get_json()['nurseIds'] == ['n3']
+    assert 'ghost' not in repository.users
+    assert repository.get('w1', '2026-01') is None
+
+
+def test_save_writes_schedule_and_carry_over_flags(repository):
+    response = post(payload(createdBy='someone-else'), uid='admin1')
+    assert response.status_code == 201
+    assert response.get_json()['writes'] == 3
+
+    saved = repository.get('w1', '2026-01')
+    assert saved['createdBy'] == 'admin1'
+    assert saved['nurseIds'] == ['n1', 'n2']
+    assert repository.users['n1']['carry_over_priority_flag'] is True
+    assert repository.users['n2']['carry_over_priority_flag'] is False
+    assert repository.users['n3']['carry_over_priority_flag'] is False
+
+
+def test_save_drops_alternatives_and_per_request_fields(repository):
+    shifts = {'n1': {'2026-01-01': [1]}, 'n2': {'2026-01-01': []}}
+    schedule = {'shifts': shifts, 'nextCarryOverFlags': {'n1': True, 'n2': False},
+                'alternatives': [{'rank': 2, 'shifts': shifts}], 'modelStats': {'variables': 10},
+                'diagnostics': {'status': 'OPTIMAL'}}
+    response = post({'wardId': 'w1', 'month': '2026-01', 'schedule': schedule}, uid='admin1')
+    assert response.status_code == 201
+
+    saved = repository.get('w1', '2026-01')
+    assert saved['shifts'] == shifts
+    assert not {'alternatives', 'modelStats', 'diagnostics'} & set(saved)
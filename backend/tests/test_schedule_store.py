@@ -0,0 +1,81 @@
+import datetime
+
+import pytest
+
+from schedule_store import InMemoryScheduleRepository, ScheduleRepository, chunk_writes
+
+
+def at(day, hour=0):
+    return datetime.datetime(2026, 1, day, hour, tzinfo=datetime.timezone.utc)
+
+
+def test_repository_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        ScheduleRepository()
+
+
+def test_get_returns_latest_by_created_at():
+    repository = InMemoryScheduleRepository([
+        {'wardId': 'w1', 'month': '2026-01', 'createdAt': at(9), 'tag': 'older'},
+        {'wardId': 'w1', 'month': '2026-01', 'createdAt': at(10, 2), 'tag': 'latest'},
+        {'wardId': 'w1', 'month': '2026-01', 'createdAt': at(10, 1), 'tag': 'middle'},
+        {'wardId': 'w1', 'month': '2026-01', 'tag': 'undated'}
+    ])
+    assert repository.get('w1', '2026-01')['tag'] == 'latest'
+
+
+def test_latest_compares_datetimes_not_strings():
+    repository = InMemoryScheduleRepository([
+        {'wardId': 'w1', 'month': '2026-01', 'createdAt': at(10, 9), 'tag': 'utc'},
+        {'wardId': 'w1', 'month': '2026-01', 'tag': 'bangkok',
+         'createdAt': datetime.datetime(2026, 1, 10, 10, tzinfo=datetime.timezone(datetime.timedelta(hours=7)))}
+    ])
+    assert repository.get('w1', '2026-01')['tag'] == 'utc'
+
+
+def test_get_many_skips_missing_keys_in_one_read():
+    repository = InMemoryScheduleRepository([{'wardId': 'w1', 'month': '2026-01', 'createdAt': at(1)}])
+    found = repository.get_many([('w1', '2026-01'), ('w2', '2026-01')])
+    assert list(found) == [('w1', '2026-01')]
+    assert repository.reads == 1
+
+
+def test_get_returns_a_copy():
+    repository = InMemoryScheduleRepository([{'wardId': 'w1', 'month': '2026-01', 'shifts': {}}])
+    repository.get('w1', '2026-01')['shifts']['n1'] = {}
+    assert repository.get('w1', '2026-01')['shifts'] == {}
+
+
+@pytest.mark.parametrize('writes, expected', [
+    (0, [0]),
+    (3, [3]),
+    (4, [4, 0]),
+    (5, [4, 1]),
+    (8, [4, 4, 0]),
+    (9, [4, 4, 1])
+])
+def test_chunk_writes_leaves_room_for_the_schedule_document(writes, expected):
+    assert [len(chunk) for chunk in chunk_writes(list(range(writes)), 4)] == expected
+
+
+def test_save_with_carry_over_batches_flag_writes():
+    users = {f'n{i}': {'currentWard': 'w1', 'carry_over_priority_flag': False} for i in range(9)}
+    repository = InMemoryScheduleRepository(users=users, batch_limit=4)
+    flags = {f'n{i}': i % 2 == 0 for i in range(8)}
+    saved = repository.save_with_carry_over({'wardId': 'w1', 'month': '2026-01', 'shifts': {}}, flags)
+
+    assert (saved['writes'], saved['batches'], len(saved['batchSeconds'])) == (9, 3, 3)
+    assert repository.committed_batches == [4, 4, 1]
+    assert repository.get('w1', '2026-01')['id'] == saved['id']
+    assert {nurse_id: user['carry_over_priority_flag'] for nurse_id, user in repository.users.items()} == \
+        dict(flags, n8=False)
+    assert repository.users['n0']['currentWard'] == 'w1'
+
+
+def test_save_with_carry_over_rejects_unknown_users():
+    repository = InMemoryScheduleRepository(users={'n1': {}})
+    with pytest.raises(KeyError):
+        repository.save_with_carry_over({'wardId': 'w1', 'month': '2026-01'}, {'n1': True, 'ghost': True})
+    assert repository.get('w1', '2026-01') is None
+    assert 'ghost' not in repository.users
+    assert repository.users['n1'] == {}
@@ -0,0 +1,45 @@
+import datetime
+
+from schedule_store import InMemoryScheduleRepository
+from statistics_service import StatisticsService
+
+
+def schedule(ward_id, month, shifts):
+    return {'wardId': ward_id, 'month': month, 'shifts': shifts,
+            'createdAt': datetime.datetime.now(datetime.timezone.utc)}
+
+
+def make_service():
+    repository = InMemoryScheduleRepository([
+        schedule('w1', '2026-01', {'n1': {'2026-01-01': [1], '2026-01-02': []},
+                                   'n2': {'2026-01-01': [2, 3], '2026-01-02': [1]}}),
+        schedule('w2', '2026-01', {'n3': {'2026-01-01': [3]}})
+    ])
+    return repository, StatisticsService(repository, ttl=60, max_entries=10)
+
+
+def test_statistics_are_computed_from_the_latest_schedule():
+    _, service = make_service()
+    summary = service.get('w1', '2026-01')
+    assert summary['total_nurses'] == 2
+    assert summary['total_overtime'] == 1
+    assert summary['by_nurse']['n1'] == {'morning': 1, 'afternoon': 0, 'night': 0, 'total': 1, 'off': 1, 'overtime': 0}
+    assert summary['runs']['n2'] == {'maxConsecutiveWorkDays': 2, 'maxConsecutiveOffDays': 0}
+
+
+def test_cached_statistics_skip_the_repository():
+    repository, service = make_service()
+    service.get_many([('w1', '2026-01'), ('w2', '2026-01'), ('w3', '2026-01')])
+    service.get('w1', '2026-01')
+    stats = service.stats()
+    assert repository.reads == 1
+    assert (stats['hits'], stats['misses'], stats['repositoryReads']) == (1, 3, 1)
+
+
+def test_invalidate_reloads_after_a_save():
+    repository, service = make_service()
+    assert service.get('w2', '2026-01')['total_nurses'] == 1
+    repository.save(schedule('w2', '2026-01', {'n3': {'2026-01-01': [3]}, 'n4': {'2026-01-01': [1]}}))
+    assert service.invalidate('w2', '2026-01') == 1
+    assert service.get('w2', '2026-01')['total_nurses'] == 2
+    assert repository.reads == 2
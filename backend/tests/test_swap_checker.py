@@ -0,0 +1,66 @@
+import datetime
+
+import pytest
+
+import app as backend_app
+from schedule_store import InMemoryScheduleRepository
+from swap_checker import SwapChecker, SwapCheckerCache, check_swap_types
+
+SHIFTS = {
+    'n1': {'2026-01-01': [1], '2026-01-02': [2], '2026-01-03': []},
+    'n2': {'2026-01-01': [], '2026-01-02': [3], '2026-01-03': [1]}
+}
+
+
+def saved_at(day):
+    return datetime.datetime(2026, 1, day, tzinfo=datetime.timezone.utc)
+
+
+def swap(**fields):
+    return dict({'fromNurseId': 'n1', 'toNurseId': 'n2', 'fromDate': '2026-01-01', 'toDate': '2026-01-03',
+                 'fromShift': 1, 'toShift': 1}, **fields)
+
+
+def test_non_numeric_shift_is_a_value_error():
+    with pytest.raises(ValueError):
+        check_swap_types(swap(fromShift='morning'))
+    results, _ = SwapChecker.from_shift_dict(SHIFTS).check_many([swap(toShift='x'), swap()])
+    assert results[0]['valid'] is False
+    assert results[1]['valid'] is True
+
+
+def test_checker_cache_reuses_the_loaded_schedule():
+    repository = InMemoryScheduleRepository([{'wardId': 'w1', 'month': '2026-01', 'shifts': SHIFTS}])
+    cache = SwapCheckerCache(repository, ttl=60, max_entries=4)
+    checker = cache.get('w1', '2026-01')
+    assert checker.check(swap())['valid'] is True
+    assert cache.get('w1', '2026-01') is checker
+    assert cache.get('w2', '2026-01') is None
+    assert repository.reads == 2
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (1, 2)
+
+
+def test_checker_cache_invalidation_reloads_the_schedule():
+    repository = InMemoryScheduleRepository([{'wardId': 'w1', 'month': '2026-01', 'shifts': SHIFTS,
+                                              'createdAt': saved_at(1)}])
+    cache = SwapCheckerCache(repository, ttl=60, max_entries=4)
+    assert cache.get('w1', '2026-01').check(swap())['valid'] is True
+    repository.save({'wardId': 'w1', 'month': '2026-01', 'shifts': dict(SHIFTS, n1={'2026-01-01': []}),
+                     'createdAt': saved_at(2)})
+    assert cache.invalidate('w1', '2026-01') == 1
+    assert cache.get('w1', '2026-01').check(swap())['valid'] is False
+
+
+def test_validate_swap_rejects_non_numeric_shifts_with_400():
+    response = backend_app.app.test_client().post('/validate-swap', json=swap(fromShift='morning'))
+    assert response.status_code == 400
+
+
+def test_validate_swap_uses_the_cached_checker(monkeypatch):
+    repository = InMemoryScheduleRepository([{'wardId': 'w1', 'month': '2026-01', 'shifts': SHIFTS}])
+    monkeypatch.setattr(backend_app, 'swap_checkers', SwapCheckerCache(repository, ttl=60, max_entries=4))
+    client = backend_app.app.test_client()
+    for _ in range(3):
+        response = client.post('/validate-swap', json=swap(wardId='w1', month='2026-01'))
+        assert response.get_json() == {'valid': True, 'rulesChecked': True, 'score': 0}
+    assert repository.reads == 1
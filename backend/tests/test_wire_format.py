@@ -0,0 +1,91 @@
+import gzip
+import json
+
+import pytest
+
+import app as backend_app
+import wire_format
+from cache import ScheduleCache, make_cache_key
+from jobs import JobManager
+from wire_format import decode_compact, encode_compact, etag_matches, negotiate_encoding
+
+SCHEDULE = {
+    'wardId': 'w1',
+    'shifts': {
+        'n1': {'2026-01-01': [], '2026-01-02': [1, 2], '2026-01-03': [3]},
+        'n2': {'2026-01-01': [2, 3], '2026-01-02': [1], '2026-01-03': [1, 2, 3]}
+    },
+    'solverStatus': 'OPTIMAL'
+}
+
+
+def test_compact_round_trip_is_lossless():
+    encoded = encode_compact(dict(SCHEDULE, alternatives=[dict(SCHEDULE, rank=2)]))
+    assert encoded['compactShifts']['format'] == 'rows-v1'
+    assert encoded['compactShifts']['rows'] == {'n1': '034', 'n2': '617'}
+    assert 'shifts' not in encoded
+    decoded = decode_compact(json.loads(json.dumps(encoded)))
+    assert decoded == dict(SCHEDULE, alternatives=[dict(SCHEDULE, rank=2)])
+
+
+def test_gzip_compact_body_round_trips():
+    body = json.dumps(encode_compact(SCHEDULE)).encode('utf-8')
+    assert decode_compact(json.loads(gzip.decompress(wire_format.compress(body, 'gzip')))) == SCHEDULE
+
+
+def test_brotli_compact_body_round_trips():
+    brotli = pytest.importorskip('brotli')
+    body = json.dumps(encode_compact(SCHEDULE)).encode('utf-8')
+    assert decode_compact(json.loads(brotli.decompress(wire_format.compress(body, 'br')))) == SCHEDULE
+
+
+def test_decode_rejects_unknown_codes_and_formats():
+    encoded = encode_compact(SCHEDULE)
+    encoded['compactShifts']['rows']['n1'] = '09'
+    with pytest.raises(ValueError):
+        decode_compact(encoded)
+    encoded['compactShifts']['format'] = 'rows-v2'
+    with pytest.raises(ValueError):
+        decode_compact(encoded)
+
+
+def test_negotiate_encoding(monkeypatch):
+    monkeypatch.setattr(wire_format, 'brotli', None)
+    assert negotiate_encoding('gzip, br') == 'gzip'
+    assert negotiate_encoding('br') is None
+    assert negotiate_encoding('gzip;q=0, *;q=0.5') is None
+    assert negotiate_encoding('*') == 'gzip'
+    assert negotiate_encoding(None) is None
+
+    monkeypatch.setattr(wire_format, 'brotli', object())
+    assert negotiate_encoding('gzip, br') == 'br'
+    assert negotiate_encoding('gzip;q=1, br;q=0.5') == 'gzip'
+
+
+def test_etag_matches_weak_and_strong_validators():
+    assert etag_matches('"abc"', 'W/"abc"')
+    assert etag_matches('W/"x", W/"abc"', 'W/"abc"')
+    assert etag_matches('*', 'W/"abc"')
+    assert not etag_matches('"abd"', 'W/"abc"')
+    assert not etag_matches(None, 'W/"abc"')
+
+
+def test_job_result_returns_304_for_a_matching_etag(monkeypatch):
+    cache = ScheduleCache(max_entries=4, ttl=60, disk_dir='')
+    data = {'wardId': 'w1', 'nurses': [{'id': 'n1'}, {'id': 'n2'}], 'startDate': '2026-01-01',
+            'endDate': '2026-01-03', 'requiredNurses': {'1': 1}}
+    cache.put(make_cache_key(data), SCHEDULE)
+    manager = JobManager(cache=cache)
+    monkeypatch.setattr(backend_app, 'job_manager', manager)
+    job = manager.submit(data)
+
+    client = backend_app.app.test_client()
+    first = client.get(f'/jobs/{job.id}/result?format=compact')
+    assert first.status_code == 200
+    assert decode_compact(first.get_json()) == SCHEDULE
+    etag = first.headers['ETag']
+
+    repeat = client.get(f'/jobs/{job.id}/result?format=compact', headers={'If-None-Match': etag})
+    assert repeat.status_code == 304
+    assert repeat.data == b''
+    assert client.get(f'/jobs/{job.id}/result', headers={'If-None-Match': etag}).status_code == 200
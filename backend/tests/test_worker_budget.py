@@ -0,0 +1,49 @@
+import threading
+
+from worker_budget import CoreBudget, payload_cells
+
+TIERS = [(1500, 2), (None, 4)]
+
+
+def test_idle_budget_grants_the_largest_tier():
+    budget = CoreBudget(total_cores=8, min_workers=1, worker_tiers=TIERS)
+    assert budget.try_acquire(900, 'first').workers == 4
+    assert CoreBudget(total_cores=3, min_workers=1, worker_tiers=TIERS).try_acquire(900, 'small').workers == 3
+
+
+def test_busy_budget_uses_tiers_and_fair_share_until_exhausted():
+    budget = CoreBudget(total_cores=8, min_workers=1, worker_tiers=TIERS)
+    budget.try_acquire(900, 'first')
+    assert budget.try_acquire(900, 'second').workers == 2
+    assert budget.try_acquire(9000, 'third').workers == 2
+    assert budget.try_acquire(900, 'fourth') is None
+    assert budget.snapshot()['free'] == 0
+
+
+def test_release_frees_cores_and_notifies_listeners():
+    budget = CoreBudget(total_cores=2, min_workers=1, worker_tiers=TIERS)
+    released = []
+    budget.add_release_listener(lambda: released.append(budget.snapshot()['free']))
+    allocation = budget.try_acquire(900, 'first')
+    assert budget.try_acquire(900, 'second') is None
+
+    budget.release(allocation)
+    budget.release(allocation)
+    assert released == [2]
+    assert budget.try_acquire(900, 'second').workers == 2
+
+
+def test_acquire_waits_for_a_release():
+    budget = CoreBudget(total_cores=2, min_workers=1, worker_tiers=TIERS)
+    allocation = budget.try_acquire(900, 'first')
+    timer = threading.Timer(0.1, budget.release, [allocation])
+    timer.start()
+    assert budget.acquire(900, 'second', timeout=5).workers == 2
+    assert budget.acquire(900, 'third', timeout=0) is None
+    assert budget.snapshot()['rejections'] == 1
+
+
+def test_payload_cells():
+    data = {'nurses': [{'id': 'a'}, {'id': 'b'}], 'startDate': '2026-01-01', 'endDate': '2026-01-31'}
+    assert payload_cells(data) == 62
+    assert payload_cells(dict(data, endDate='bad')) == 0
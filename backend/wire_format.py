@@ -0,0 +1,105 @@
+import gzip
+import hashlib
+
+from config import Config
+from schedule_matrix import CODE_SHIFTS, ScheduleMatrix
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPACT_FORMAT = 'rows-v1'
+CODE_ALPHABET = '01234567'
+
+
+def is_compact(schedule):
+    return isinstance(schedule, dict) and isinstance(schedule.get('compactShifts'), dict)
+
+
+def encode_compact(schedule):
+    if 'shifts' not in schedule or is_compact(schedule):
+        return schedule
+    matrix = ScheduleMatrix.from_shift_dict(schedule['shifts'])
+    codes = matrix.codes + ord(CODE_ALPHABET[0])
+    encoded = {key: value for key, value in schedule.items() if key != 'shifts'}
+    encoded['compactShifts'] = {
+        'format': COMPACT_FORMAT,
+        'shiftBits': {str(s): 1 << i for i, s in enumerate(Config.SHIFTS)},
+        'dates': [day.isoformat() for day in matrix.days],
+        'rows': {nurse_id: row.tobytes().decode('ascii') for nurse_id, row in zip(matrix.nurse_ids, codes)}
+    }
+    if schedule.get('alternatives'):
+        encoded['alternatives'] = [encode_compact(alternative) for alternative in schedule['alternatives']]
+    return encoded
+
+
+def decode_compact(schedule):
+    if not is_compact(schedule):
+        return schedule
+    compact = schedule['compactShifts']
+    if compact.get('format') != COMPACT_FORMAT:
+        raise ValueError(f"Unsupported compact schedule format: {compact.get('format')}")
+    dates = compact['dates']
+    decoded = {key: value for key, value in schedule.items() if key != 'compactShifts'}
+    decoded['shifts'] = {
+        nurse_id: {date: list(CODE_SHIFTS[CODE_ALPHABET.index(code)]) for date, code in zip(dates, row)}
+        for nurse_id, row in compact['rows'].items()
+    }
+    if schedule.get('alternatives'):
+        decoded['alternatives'] = [decode_compact(alternative) for alternative in schedule['alternatives']]
+    return decoded
+
+
+def _accepted_encodings(accept_encoding):
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def negotiate_encoding(accept_encoding):
+    accepted = _accepted_encodings(accept_encoding)
+    candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best = None
+    for encoding in candidates:
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (encoding, quality)
+    return best[0] if best else None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=Config.WIRE_BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=Config.WIRE_GZIP_LEVEL)
+    return body
+
+
+def make_etag(body):
+    return 'W/"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        if (candidate[2:] if candidate.startswith('W/') else candidate) == opaque:
+            return True
+    return False
@@ -0,0 +1,111 @@
+import datetime
+import itertools
+import threading
+import time
+
+from config import Config
+
+
+def payload_cells(data):
+    try:
+        start_date = datetime.date.fromisoformat(data['startDate'])
+        end_date = datetime.date.fromisoformat(data['endDate'])
+    except (KeyError, TypeError, ValueError):
+        return 0
+    return len(data.get('nurses') or []) * max((end_date - start_date).days + 1, 0)
+
+
+class CoreAllocation:
+    def __init__(self, allocation_id, owner, workers, cells):
+        self.id = allocation_id
+        self.owner = owner
+        self.workers = workers
+        self.cells = cells
+        self.granted_at = time.time()
+
+    def to_dict(self):
+        return {
+            'owner': self.owner,
+            'workers': self.workers,
+            'cells': self.cells,
+            'heldSeconds': time.time() - self.granted_at
+        }
+
+
+class CoreBudget:
+    def __init__(self, total_cores=None, min_workers=None, worker_tiers=None):
+        self.total_cores = total_cores or Config.SOLVER_CORE_BUDGET
+        self.min_workers = min(min_workers or Config.SOLVER_MIN_WORKERS, self.total_cores)
+        self.worker_tiers = worker_tiers or Config.SOLVER_WORKER_TIERS
+        self._condition = threading.Condition()
+        self._allocations = {}
+        self._ids = itertools.count(1)
+        self._release_listeners = []
+        self.rejections = 0
+
+    @property
+    def allocated(self):
+        return sum(allocation.workers for allocation in self._allocations.values())
+
+    def desired_workers(self, cells):
+        for max_cells, workers in self.worker_tiers:
+            if max_cells is None or cells <= max_cells:
+                return min(workers, self.total_cores)
+        return self.total_cores
+
+    def _grant_size(self, cells):
+        free = self.total_cores - self.allocated
+        if free < self.min_workers:
+            return 0
+        if not self._allocations:
+            return min(max(workers for _, workers in self.worker_tiers), free)
+        fair_share = max(self.min_workers, self.total_cores // (len(self._allocations) + 1))
+        return min(self.desired_workers(cells), free, fair_share)
+
+    def try_acquire(self, cells, owner):
+        with self._condition:
+            workers = self._grant_size(cells)
+            if not workers:
+                return None
+            allocation = CoreAllocation(next(self._ids), owner, workers, cells)
+            self._allocations[allocation.id] = allocation
+            return allocation
+
+    def acquire(self, cells, owner, timeout=0):
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                allocation = self.try_acquire(cells, owner)
+                if allocation is not None:
+                    return allocation
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.rejections += 1
+                    return None
+                self._condition.wait(remaining)
+
+    def release(self, allocation):
+        with self._condition:
+            if self._allocations.pop(allocation.id, None) is None:
+                return
+            self._condition.notify_all()
+        for listener in list(self._release_listeners):
+            listener()
+
+    def add_release_listener(self, listener):
+        self._release_listeners.append(listener)
+
+    def snapshot(self):
+        with self._condition:
+            return {
+                'totalCores': self.total_cores,
+                'minWorkers': self.min_workers,
+                'allocated': self.allocated,
+                'free': self.total_cores - self.allocated,
+                'rejections': self.rejections,
+                'workerTiers': [{'maxCells': max_cells, 'workers': workers} for max_cells, workers in self.worker_tiers],
+                'allocations': [allocation.to_dict() for allocation in self._allocations.values()]
+            }
+
+
+core_budget = CoreBudget()
@@ -2,7 +2,7 @@ import { useState, useEffect } from 'react';
 import { useRouter } from 'next/router';
 import Layout from '../../../components/Layout';
 import { auth, db, WARDS, SHIFT_NAMES } from '../../../lib/firebase';
-import { collection, query, where, getDocs, doc, getDoc, addDoc, updateDoc } from 'firebase/firestore';
+import { collection, query, where, getDocs, doc, getDoc } from 'firebase/firestore';
 import axios from 'axios';
 import Head from 'next/head';
 
@@ -168,22 +168,16 @@ export default function CreateSchedule() {
     if (!generatedSchedule) return;
 
     try {
-      await addDoc(collection(db, 'schedules'), {
-        ...generatedSchedule,
+      const idToken = await auth.currentUser.getIdToken();
+      await axios.post(`${process.env.NEXT_PUBLIC_API_URL}/schedules`, {
+        schedule: generatedSchedule,
         wardId: user.currentWard,
         month: selectedMonth,
-        createdAt: new Date(),
-        createdBy: auth.currentUser.uid,
         nurseIds: nurses.map(n => n.id)
+      }, {
+        headers: { Authorization: `Bearer ${idToken}` }
       });
 
-      if (generatedSchedule.nextCarryOverFlags) {
-        for (const [nurseId, flag] of Object.entries(generatedSchedule.nextCarryOverFlags)) {
-          const nurseRef = doc(db, 'users', nurseId);
-          await updateDoc(nurseRef, { carry_over_priority_flag: flag });
-        }
-      }
-
       alert('บันทึกตารางเวรสำเร็จ');
       router.push('/admin/schedules');
     } catch (error) {
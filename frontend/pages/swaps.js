@@ -131,6 +131,8 @@ export default function Swaps() {
         const validation = await axios.post(
           `${process.env.NEXT_PUBLIC_API_URL}/validate-swap`,
           {
+            wardId: currentSchedule?.wardId,
+            month: currentSchedule?.month,
             fromNurseId: swapData.fromUserId,
             toNurseId: swapData.toUserId,
             fromDate: swapData.fromDate,